@@ -12,21 +12,154 @@ class Settings(BaseSettings):
 
     # MongoDB
     mongo_uri: str
+    # apply app/core/indexes.py when the app starts
+    create_indexes_on_startup: bool = True
 
     # JWT
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 10080
 
+    # password hashing: bcrypt cost, and the dedicated thread pool it runs in
+    # (requests beyond workers + queue get 503)
+    bcrypt_rounds: int = 12
+    kdf_max_workers: int = 4
+    kdf_max_queue: int = 64
+
+    # per-process cache of authenticated users (0 size disables); the users
+    # change stream evicts entries in every worker when it is available
+    user_cache_size: int = 10000
+    user_cache_ttl_seconds: float = 60
+    user_cache_watch: bool = True
+
     # mail.ru SMTP
     mail_host: str
     mail_port: int
     mail_username: str
     mail_password: str
+    # set both to False for a plain local SMTP server such as aiosmtpd
+    mail_use_ssl: bool = True
+    mail_login: bool = True
+
+    # email outbox: senders running in this process (0 = only via
+    # `python -m app.workers.email_worker`), SMTP connections kept open,
+    # messages claimed per connection, delivery attempts
+    email_senders_in_process: int = 1
+    email_smtp_pool_size: int = 2
+    email_smtp_idle_seconds: float = 60
+    email_batch_size: int = 20
+    email_max_attempts: int = 5
+    email_lease_seconds: int = 60
+    email_poll_interval_seconds: float = 1.0
 
     # llama ai model
     groq_api_key: str
     groq_model: str = "llama-3.3-70b-versatile"
+    # "groq", or "fake" for local runs and tests without an API key
+    llm_backend: str = "groq"
+    fake_llm_latency_ms: int = 0
+    # an OpenAI-compatible server to use instead of Groq (e.g. a local fake)
+    groq_base_url: str | None = None
+    # upstream limits per process: concurrent calls, requests/min and
+    # tokens/min (0 = unlimited; each call reserves its estimated prompt
+    # plus llm_reserved_output_tokens), retries of 429s / 5xx / timeouts
+    llm_max_concurrency: int = 8
+    # (defaults: Groq free tier for llama-3.3-70b-versatile; paid tiers
+    # allow far more). A map-reduce call reserves about
+    # summary_chunk_tokens + llm_reserved_output_tokens, so the free tier
+    # admits one every ~33s and a long document's chunks run one after
+    # another whatever summary_max_concurrency says; set these to the
+    # account's real limits
+    llm_requests_per_minute: int = 30
+    llm_tokens_per_minute: int = 12000
+    llm_reserved_output_tokens: int = 512
+    llm_max_retries: int = 3
+    llm_timeout_seconds: float = 120
+
+    # uploads
+    max_upload_mb: int = 200
+    upload_chunk_size: int = 1024 * 1024
+    # byte-identical re-uploads share the already stored file
+    dedupe_uploads: bool = True
+
+    # document downloads: how long browsers may reuse a download before
+    # revalidating it (the ETag makes revalidation a bodyless 304), and an
+    # optional nginx internal location mapped to uploads/ so nginx sends
+    # the file itself (X-Accel-Redirect, sendfile), e.g. "/protected-uploads/"
+    download_max_age_seconds: int = 3600
+    download_accel_redirect_prefix: str | None = None
+
+    # where downloads are served from: "local" (uploads/ through the app) or
+    # "s3" (a copy in an S3-compatible bucket such as MinIO, served through
+    # presigned URLs; needs boto3)
+    storage_backend: str = "local"
+    s3_bucket: str | None = None
+    s3_endpoint_url: str | None = None
+    s3_region: str | None = None
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    s3_presign_seconds: int = 3600
+
+    # text extraction process pool (0 workers = one per CPU)
+    extraction_workers: int = 0
+    extraction_pages_per_task: int = 25
+    extraction_timeout_seconds: float = 120
+    extraction_memory_limit_mb: int = 1024
+
+    # stored summaries (app/services/text_store.py): bodies from this many
+    # UTF-8 bytes are zlib-compressed, and compressed ones above
+    # text_spill_bytes move out of the record into `text_blobs`
+    text_compress_min_bytes: int = 1024
+    text_spill_bytes: int = 32 * 1024
+    # rows per cursor batch of GET /summaries/export.ndjson (one text_blobs
+    # query and one written chunk per batch)
+    summary_export_batch_size: int = 500
+
+    # summary cache (in-process LRU in front of Mongo; 0 disables the LRU)
+    summary_cache_lru_size: int = 256
+
+    # map-reduce summarization of long documents (sizes in estimated tokens)
+    summary_chunk_tokens: int = 6000
+    summary_chunk_overlap_tokens: int = 200
+    # chunks summarized at once, further capped by what
+    # llm_tokens_per_minute admits
+    summary_max_concurrency: int = 4
+    # documents summarized at once by /ai/summarize/batch
+    batch_summarize_concurrency: int = 4
+
+    # background summarization jobs (0 = run workers only via
+    # `python -m app.workers.summarize_worker`)
+    job_workers_in_process: int = 0
+    job_lease_seconds: int = 120
+    job_max_attempts: int = 3
+    job_poll_interval_seconds: float = 1.0
+
+    # /ai/summarize/stream: keep generating (and save the summary) after the
+    # client disconnects, instead of cancelling the upstream call
+    stream_finish_on_disconnect: bool = True
+
+    # near-duplicate uploads (MinHash over word 5-grams, 0..1): similarity
+    # reported by uploads, and similarity at which /ai/summarize reuses the
+    # cached summary of another document; reuse scope is "user" (your own
+    # documents), "global" (anyone's) or "off"
+    near_duplicate_threshold: float = 0.8
+    near_duplicate_reuse_threshold: float = 0.9
+    near_duplicate_reuse_scope: str = "user"
+
+    # full-text search: characters of each document / summary that are
+    # indexed (existing entries are recut by --reindex), and hits per page
+    # of GET /search
+    search_max_chars: int = 20_000
+    search_page_size: int = 20
+
+    # Prometheus: GET /metrics, and how often each worker samples its
+    # queue-depth gauges
+    metrics_enabled: bool = True
+    metrics_sample_interval_seconds: float = 5
+
+    # debug mode: X-DB-Ops / X-DB-Time-ms response headers, and a warning
+    # when a route goes over its round-trip budget (app/core/db_stats.py)
+    debug: bool = False
 
 
 # create your single shared settings instance
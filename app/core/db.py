@@ -1,5 +1,42 @@
+import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.db_stats import DbOpCounter
 
-client = AsyncIOMotorClient(settings.mongo_uri)
-db = client.diploma_app
\ No newline at end of file
+DB_NAME = "diploma_app"
+
+# One Motor client per process. It is created on first use, or by the app
+# lifespan, never at import time, so a client made before a gunicorn fork
+# is not shared with the workers.
+_client: AsyncIOMotorClient | None = None
+_client_pid: int | None = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = AsyncIOMotorClient(settings.mongo_uri, event_listeners=[DbOpCounter()])
+        _client_pid = os.getpid()
+    return _client
+
+
+def close_client() -> None:
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = _client_pid = None
+
+
+class _Database:
+    """
+    Stands in for the app database so modules can keep importing `db`;
+    every access goes to this process's client.
+    """
+    def __getattr__(self, name: str):
+        return getattr(get_client()[DB_NAME], name)
+
+    def __getitem__(self, name: str):
+        return get_client()[DB_NAME][name]
+
+
+db = _Database()
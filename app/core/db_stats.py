@@ -0,0 +1,113 @@
+# app/core/db_stats.py
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from pymongo import monitoring
+
+from app.core.metrics import MONGO_SECONDS
+
+# Counts MongoDB round trips per request. A pymongo CommandListener sees
+# every command (getMore batches included); Motor runs commands with the
+# caller's contextvars copied, so the listener can attribute each one to
+# the request that issued it. The same listener feeds the Mongo latency
+# histogram.
+
+
+class DbStats:
+    def __init__(self):
+        self.ops = 0
+        self.time_ms = 0.0
+        self.commands: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, command: str, duration_micros: int) -> None:
+        with self._lock:
+            self.ops += 1
+            self.time_ms += duration_micros / 1000
+            self.commands[command] += 1
+
+
+_current: ContextVar[DbStats | None] = ContextVar("db_stats", default=None)
+
+
+def _collection(event) -> str:
+    if event.command_name == "getMore":
+        name = event.command.get("collection")
+    else:
+        name = event.command.get(event.command_name)
+    return name if isinstance(name, str) else ""
+
+
+class DbOpCounter(monitoring.CommandListener):
+    def __init__(self):
+        # request_id -> collection; only started events carry the command
+        self._collections: dict[int, str] = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = _collection(event)
+
+    def _finished(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_SECONDS.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        stats = _current.get()
+        if stats is not None:
+            stats.record(event.command_name, event.duration_micros)
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+@contextmanager
+def track_db_ops() -> Iterator[DbStats]:
+    """
+    Count Mongo commands issued inside the block (also usable as a test
+    fixture around a request):
+
+        with track_db_ops() as stats:
+            await client.get("/summaries/")
+        assert stats.ops <= 1
+    """
+    stats = DbStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# Worst-case round trips per route with a cold user cache (the auth lookup
+# counts as one), spilled summary bodies included (one text_blobs query or
+# delete), as are folder counter updates (one bulk write). Exceeding one
+# logs a warning in debug mode.
+ROUTE_DB_BUDGETS: dict[tuple[str, str], int] = {
+    ("GET", "/users/me"): 1,
+    ("PUT", "/users/me"): 2,
+    ("GET", "/documents/"): 2,
+    ("GET", "/documents/{doc_id}/content"): 2,
+    ("GET", "/documents/{doc_id}/outline"): 3,
+    ("GET", "/documents/{doc_id}/summaries"): 3,
+    ("DELETE", "/documents/{doc_id}"): 9,
+    ("GET", "/summaries/"): 3,
+    ("GET", "/summaries/{summary_id}"): 3,
+    ("PUT", "/summaries/{summary_id}/folder"): 5,
+    ("PUT", "/summaries/{summary_id}/note"): 4,
+    ("DELETE", "/summaries/{summary_id}"): 5,
+    ("POST", "/summaries/bulk/folder"): 5,
+    ("POST", "/summaries/bulk/delete"): 6,
+    ("GET", "/folders/"): 2,
+    ("GET", "/folders/overview"): 2,
+    ("POST", "/folders/"): 2,
+    ("PUT", "/folders/{folder_id}"): 2,
+    ("DELETE", "/folders/{folder_id}"): 3,
+    ("GET", "/folders/{folder_id}/summaries"): 4,
+    ("DELETE", "/folders/{folder_id}/summaries/{summary_id}"): 3,
+    ("GET", "/ai/jobs/{job_id}"): 2,
+    ("GET", "/search"): 2,
+}
@@ -0,0 +1,217 @@
+# app/core/indexes.py
+#
+# Every index the app relies on, declared in one place. Applied at startup
+# (settings.create_indexes_on_startup) or from the command line:
+#
+#   python -m app.core.indexes            # create missing indexes
+#   python -m app.core.indexes --check    # also explain() each route query,
+#                                         # exit 1 on COLLSCAN / in-memory SORT
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.db import db
+from app.services import email_outbox, job_queue
+from app.utils.pagination import sort_spec
+
+log = logging.getLogger(__name__)
+
+INDEXES: dict[str, list[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASC)], name="email_unique", unique=True),
+    ],
+    "documents": [
+        IndexModel(
+            [("user_email", ASC), ("upload_date", DESC), ("_id", DESC)],
+            name="user_upload_date_id",
+        ),
+        IndexModel([("user_email", ASC), ("sha256", ASC)], name="user_sha256"),
+        # dedupe of re-uploads across users, shared-file check on delete
+        IndexModel([("sha256", ASC)], name="sha256"),
+        IndexModel([("path", ASC)], name="path"),
+        # near-duplicate candidates (multikey on the LSH band keys)
+        IndexModel([("user_email", ASC), ("lsh_bands", ASC)], name="user_lsh_bands"),
+        IndexModel([("lsh_bands", ASC)], name="lsh_bands"),
+    ],
+    "summaries": [
+        # keyset pagination sorts on (created_at, _id)
+        IndexModel(
+            [("user_email", ASC), ("created_at", DESC), ("_id", DESC)],
+            name="user_created_at_id",
+        ),
+        IndexModel(
+            [("doc_id", ASC), ("user_email", ASC), ("created_at", DESC), ("_id", DESC)],
+            name="doc_user_created_at_id",
+        ),
+        IndexModel(
+            [("folder_id", ASC), ("user_email", ASC), ("created_at", DESC), ("_id", DESC)],
+            name="folder_user_created_at_id",
+        ),
+    ],
+    "folders": [
+        IndexModel(
+            [("user_email", ASC), ("created_at", DESC), ("_id", DESC)],
+            name="user_created_at_id",
+        ),
+    ],
+    "pending_registrations": [
+        # _id is the email
+        IndexModel([("expires_at", ASC)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "password_resets": [
+        IndexModel([("code", ASC)], name="code"),
+        IndexModel([("expires_at", ASC)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "search_entries": [
+        # user_email first, so $text queries carry an equality on it and only
+        # read that user's postings; "none" = no stemming or stop words,
+        # since documents are not all in English
+        IndexModel(
+            [("user_email", ASC), ("filename", TEXT), ("note", TEXT), ("text", TEXT)],
+            name="user_text",
+            weights={"filename": 5, "note": 3, "text": 1},
+            default_language="none",
+            language_override="search_language",
+        ),
+        # cascade delete of a document's summaries
+        IndexModel([("doc_id", ASC), ("user_email", ASC)], name="doc_user"),
+    ],
+    "email_outbox": [
+        # claims filter status (equality), sort on created_at and range on
+        # run_after / lease_until: equality, sort, range, so the index
+        # returns rows already in claim order
+        IndexModel([("status", ASC), ("created_at", ASC), ("run_after", ASC)], name="claim_queued_esr"),
+        IndexModel([("status", ASC), ("created_at", ASC), ("lease_until", ASC)], name="claim_expired_esr"),
+        # delivered and failed messages (they carry codes) are kept for a week
+        IndexModel([("sent_at", ASC)], name="sent_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+        IndexModel([("failed_at", ASC)], name="failed_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "text_blobs": [
+        # cascade delete of a document's spilled summary bodies
+        IndexModel([("doc_id", ASC)], name="doc_id"),
+    ],
+    "files": [
+        # claiming a stored copy of an upload's bytes (_id is the path)
+        IndexModel([("sha256", ASC)], name="sha256"),
+    ],
+    "jobs": [
+        # same shape as the email_outbox claims
+        IndexModel([("status", ASC), ("created_at", ASC), ("run_after", ASC)], name="claim_queued_esr"),
+        IndexModel([("status", ASC), ("created_at", ASC), ("lease_until", ASC)], name="claim_expired_esr"),
+    ],
+}
+
+# indexes an entry above replaced; dropped by ensure_indexes
+REPLACED: dict[str, list[str]] = {
+    # (status, run_after | lease_until, created_at) needed an in-memory sort
+    "email_outbox": ["claim_queued", "claim_expired"],
+    "jobs": ["claim_queued", "claim_expired"],
+}
+
+# (name, collection, filter, sort) for every query a route or worker runs;
+# the ids and dates are placeholders, only the shape matters to the planner.
+# Queries built by a function are explained exactly as that function
+# builds them.
+_EMAIL = "plan-check@example.com"
+_OID = ObjectId()
+QUERIES: list[tuple[str, str, dict, list | None]] = [
+    ("get_current_user", "users", {"email": _EMAIL}, None),
+    ("list_docs", "documents", {"user_email": _EMAIL}, sort_spec("upload_date")),
+    ("upload_doc duplicate", "documents", {"user_email": _EMAIL, "sha256": "0" * 64}, None),
+    ("upload_doc dedupe", "documents", {"sha256": "0" * 64}, None),
+    ("upload_doc near duplicates", "documents",
+     {"user_email": _EMAIL, "lsh_bands": {"$in": ["0:0"]}, "sha256": {"$ne": "0" * 64}}, None),
+    ("delete_document shared file", "documents", {"path": "uploads/x.pdf"}, None),
+    ("upload_doc claim file", "files", {"sha256": "0" * 64, "refs": {"$gt": 0}}, None),
+    ("list_all_summaries", "summaries", {"user_email": _EMAIL}, sort_spec("created_at")),
+    ("get_summaries", "summaries", {"doc_id": _OID, "user_email": _EMAIL}, sort_spec("created_at")),
+    ("get_folder_summaries", "summaries", {"folder_id": _OID, "user_email": _EMAIL}, sort_spec("created_at")),
+    ("delete_folder", "summaries", {"folder_id": _OID}, None),
+    ("delete_document folder counts", "summaries", {"doc_id": _OID, "user_email": _EMAIL}, None),
+    ("delete_document spilled summaries", "text_blobs", {"doc_id": _OID}, None),
+    ("list_folders", "folders", {"user_email": _EMAIL}, sort_spec("created_at")),
+    ("reconcile folder counts", "summaries", {"folder_id": {"$in": [_OID]}}, None),
+    ("search", "search_entries", {"user_email": _EMAIL, "$text": {"$search": "plan"}}, None),
+    ("consume_reset_code", "password_resets",
+     {"code": "000000", "expires_at": {"$gt": datetime.utcnow()}}, None),
+    ("claim_job", "jobs", job_queue.claim_filter(datetime.utcnow()), job_queue.CLAIM_SORT),
+    ("claim_batch", "email_outbox", email_outbox.claim_filter(datetime.utcnow()), email_outbox.CLAIM_SORT),
+]
+
+
+async def ensure_indexes() -> None:
+    """
+    Create every declared index. Existing ones are left alone, so this is
+    safe to run on every startup.
+    """
+    for collection, names in REPLACED.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. duplicate emails blocking the unique index, or an older
+            # index with the same name but different options
+            log.error("could not create indexes on %s: %s", collection, e)
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def check_query_plans() -> list[str]:
+    """
+    explain() every route query; returns a description of each one whose
+    winning plan scans the collection or sorts in memory.
+    """
+    problems = []
+    for name, collection, filter_, sort in QUERIES:
+        cursor = db[collection].find(filter_)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = set(_stages(explain["queryPlanner"]["winningPlan"]))
+        bad = stages & {"COLLSCAN", "SORT"}
+        if bad:
+            problems.append(f"{name} ({collection}): {', '.join(sorted(bad))}")
+    return problems
+
+
+async def _main(check: bool) -> int:
+    await ensure_indexes()
+    print("indexes ensured")
+    if not check:
+        return 0
+    problems = await check_query_plans()
+    for p in problems:
+        print(f"BAD PLAN  {p}")
+    print(f"{len(QUERIES) - len(problems)}/{len(QUERIES)} queries use an index")
+    return 1 if problems else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes.")
+    parser.add_argument("--check", action="store_true",
+                        help="explain() route queries and fail on COLLSCAN or in-memory SORT")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(args.check)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# app/core/metrics.py
+#
+# Prometheus metrics, served at GET /metrics. With several workers set
+# PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) so every process writes
+# its samples to shared files and any worker can answer a scrape.
+
+import asyncio
+import os
+
+import anyio.to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+    generate_latest, multiprocess,
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+EXTRACTION_SECONDS = Histogram(
+    "extraction_duration_seconds",
+    "Text extraction time by file type",
+    ["ext", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+EXTRACTION_BYTES = Counter(
+    "extraction_bytes",
+    "Bytes of files parsed, by file type",
+    ["ext"],
+)
+
+LLM_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency (whole stream for streamed calls)",
+    ["model", "mode"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+LLM_PROMPT_TOKENS = Counter(
+    "llm_prompt_tokens", "Prompt tokens sent to the LLM", ["model", "mode"],
+)
+LLM_COMPLETION_TOKENS = Counter(
+    "llm_completion_tokens", "Completion tokens received from the LLM", ["model", "mode"],
+)
+LLM_ERRORS = Counter(
+    "llm_errors", "Failed LLM calls (retried ones included)", ["model", "mode", "error"],
+)
+
+MONGO_SECONDS = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+# sampled every metrics_sample_interval_seconds by each worker
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads", "Starlette/anyio worker threads in use",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_waiting_tasks", "Calls waiting for a Starlette/anyio worker thread",
+    multiprocess_mode="livesum",
+)
+KDF_QUEUE = Gauge(
+    "kdf_queue_depth", "Password hashes waiting for the KDF pool",
+    multiprocess_mode="livesum",
+)
+EXTRACTION_IN_FLIGHT = Gauge(
+    "extraction_tasks_in_flight", "Parse tasks queued or running in the extraction pool",
+    multiprocess_mode="livesum",
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_calls_in_flight", "LLM calls holding a concurrency slot",
+    multiprocess_mode="livesum",
+)
+
+
+def render() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+async def sample_queue_depths(interval: float) -> None:
+    """
+    Keep this worker's queue gauges current; reading the counters is
+    cheap, but it is kept off the request path anyway.
+    """
+    # imported here to keep this module free of import cycles
+    from app.core.security import kdf_queue_depth
+    from app.services.extraction_service import tasks_in_flight
+    from app.services.llm_client import calls_in_flight
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    while True:
+        stats = limiter.statistics()
+        THREADPOOL_BUSY.set(stats.borrowed_tokens)
+        THREADPOOL_WAITING.set(stats.tasks_waiting)
+        KDF_QUEUE.set(kdf_queue_depth())
+        EXTRACTION_IN_FLIGHT.set(tasks_in_flight())
+        LLM_IN_FLIGHT.set(calls_in_flight())
+        await asyncio.sleep(interval)
@@ -0,0 +1,107 @@
+# app/core/middleware.py
+
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db_stats import ROUTE_DB_BUDGETS, track_db_ops
+from app.core.metrics import HTTP_REQUEST_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects requests whose declared Content-Length is over `max_bytes`
+    with 413 before any of the body is read. Uploads without a length
+    (chunked) are still capped while they are streamed to disk.
+    """
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length":
+                    if value.isdigit() and int(value) > self.max_bytes:
+                        response = JSONResponse(
+                            {"detail": "Request body too large"}, status_code=413
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+
+class DbStatsMiddleware:
+    """
+    Debug only: counts the Mongo round trips each request makes, reports
+    them in X-DB-Ops / X-DB-Time-ms and warns when a route goes over its
+    budget in ROUTE_DB_BUDGETS. Streamed bodies are counted up to the
+    response start.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_db_ops() as stats:
+            async def send_with_stats(message: Message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Ops"] = str(stats.ops)
+                    headers["X-DB-Time-ms"] = f"{stats.time_ms:.1f}"
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        # the router leaves the matched route in the scope
+        route = scope.get("route")
+        if route is None:
+            return
+        budget = ROUTE_DB_BUDGETS.get((scope["method"], route.path))
+        if budget is not None and stats.ops > budget:
+            log.warning(
+                "%s %s made %d Mongo round trips (budget %d): %s",
+                scope["method"], route.path, stats.ops, budget, dict(stats.commands),
+            )
+
+
+class MetricsMiddleware:
+    """
+    Observes every HTTP request in the latency histogram, labelled by route
+    template (not the raw path, which would explode the label set).
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status),
+            ).observe(time.perf_counter() - start)
@@ -1,5 +1,8 @@
 # app/core/security.py
 
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
@@ -8,9 +11,16 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import settings
 from app.core.db import db
+from app.core.user_cache import user_cache, token_cache
 
-# hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashing; hashes with any other cost are flagged for rehash on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -18,6 +28,40 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+# bcrypt costs 100+ ms of CPU and releases the GIL, so it gets its own
+# bounded pool instead of running on the event loop
+_kdf_executor = ThreadPoolExecutor(
+    max_workers=settings.kdf_max_workers, thread_name_prefix="kdf"
+)
+_kdf_inflight = 0
+
+def kdf_queue_depth() -> int:
+    return max(0, _kdf_inflight - settings.kdf_max_workers)
+
+async def _run_kdf(fn, *args):
+    global _kdf_inflight
+    if _kdf_inflight >= settings.kdf_max_workers + settings.kdf_max_queue:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _kdf_inflight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_kdf_executor, fn, *args)
+    finally:
+        _kdf_inflight -= 1
+
+async def hash_password(password: str) -> str:
+    return await _run_kdf(get_password_hash, password)
+
+async def check_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """
+    Verify off the event loop. Returns (ok, new_hash); new_hash is set
+    when the stored hash uses an outdated cost and should be replaced.
+    """
+    return await _run_kdf(pwd_context.verify_and_update, plain, hashed)
+
 # token
 def create_access_token(subject: str, expires_delta: timedelta | None = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.jwt_expire_minutes))
@@ -36,14 +80,25 @@ async def get_current_user(
         detail="Invalid or missing token",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        email: str = payload.get("sub")
-        if not email:
+    # 1) Decode the token, unless this exact token was seen recently
+    email = token_cache.get(token)
+    if email is None:
+        try:
+            payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+            email = payload.get("sub")
+            if not email:
+                raise exc
+        except JWTError:
+            raise exc
+        # never cache a token past its own expiry
+        ttl = payload["exp"] - time.time() if "exp" in payload else None
+        token_cache.set(token, email, ttl=ttl)
+
+    # 2) Load the user, from the cache when possible
+    user = user_cache.get(email)
+    if user is None:
+        user = await db.users.find_one({"email": email})
+        if not user:
             raise exc
-    except JWTError:
-        raise exc
-    user = await db.users.find_one({"email": email})
-    if not user:
-        raise exc
+        user_cache.set(email, user)
     return user
@@ -0,0 +1,97 @@
+# app/core/user_cache.py
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.config import settings
+from app.core.db import db
+
+log = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Bounded LRU whose entries also expire after `ttl` seconds.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# email -> users record
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+# bearer token -> email, so repeat requests skip JWT verification
+token_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+
+def invalidate_user(email: str) -> None:
+    """
+    Drop a user from this process's cache; call after any write to `users`.
+    Other workers hear about it through watch_user_changes, or at the
+    latest when the TTL runs out.
+    """
+    user_cache.pop(email)
+
+
+async def watch_user_changes() -> None:
+    """
+    Follow the `users` change stream and evict changed users, so caches in
+    every worker stay fresh. Needs a replica set (Atlas always is); on a
+    standalone server we log once and rely on the TTL.
+    """
+    delay = 1.0
+    while True:
+        try:
+            async with db.users.watch(full_document="updateLookup") as stream:
+                delay = 1.0
+                async for change in stream:
+                    doc = change.get("fullDocument") or {}
+                    if doc.get("email"):
+                        invalidate_user(doc["email"])
+                    else:
+                        # deletes only carry the _id; drop everything
+                        user_cache.clear()
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == 40573:  # change streams need a replica set
+                log.info("users change stream unavailable, user cache relies on TTL")
+                return
+            log.warning("users change stream failed: %s", e)
+        except PyMongoError as e:
+            log.warning("users change stream failed: %s", e)
+        user_cache.clear()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
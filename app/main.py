@@ -1,6 +1,8 @@
 # app/main.py
 
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Depends, Response
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
 from app.routes.documents import router as docs_router
@@ -10,6 +12,17 @@ from app.routes.users import router as users_router
 from app.routes.ai import router as ai_router
 from app.routes.folders import router as folders_router
 from app.routes.summaries import router as summaries_router
+from app.routes.search import router as search_router
+from app.core.config import settings
+from app.core.middleware import BodySizeLimitMiddleware, DbStatsMiddleware, MetricsMiddleware
+from app.core.metrics import render as render_metrics, sample_queue_depths
+from app.core.user_cache import watch_user_changes
+from app.core.indexes import ensure_indexes
+from app.core.db import get_client, close_client
+from app.workers.summarize_worker import WorkerPool
+from app.workers.email_worker import SenderPool
+from app.services.extraction_service import shutdown_pool as shutdown_extraction_pool
+from app.services.llm_client import close_backend as close_llm_backend
 
 middleware = [
     Middleware(
@@ -21,7 +34,52 @@ middleware = [
     )
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # this worker process's Motor client
+    get_client()
+    if settings.create_indexes_on_startup:
+        await ensure_indexes()
+    # optional in-process summarization workers
+    workers = WorkerPool(settings.job_workers_in_process)
+    workers.start()
+    # deliver queued email
+    senders = SenderPool(settings.email_senders_in_process)
+    senders.start()
+    # evict cached users changed by other workers
+    watcher = asyncio.create_task(watch_user_changes()) if settings.user_cache_watch else None
+    sampler = (
+        asyncio.create_task(sample_queue_depths(settings.metrics_sample_interval_seconds))
+        if settings.metrics_enabled else None
+    )
+    yield
+    for task in (watcher, sampler):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await workers.stop()
+    await senders.stop()
+    shutdown_extraction_pool()
+    await close_llm_backend()
+    close_client()
+
+app = FastAPI(lifespan=lifespan)
+# multipart framing adds a little on top of the file itself
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=(settings.max_upload_mb + 1) * 1024 * 1024,
+)
+if settings.debug:
+    app.add_middleware(DbStatsMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        body, content_type = render_metrics()
+        return Response(body, media_type=content_type)
+
 @app.get("/")
 def read_root():
     return {"message": "FastAPI is working!"}
@@ -32,6 +90,7 @@ app.include_router(docs_router)
 app.include_router(ai_router)
 app.include_router(summaries_router)
 app.include_router(folders_router)
+app.include_router(search_router)
 
 
 
@@ -3,8 +3,24 @@
 from pydantic import BaseModel
 from datetime import datetime
 
+class NearDuplicate(BaseModel):
+    id: str
+    filename: str
+    similarity: float  # estimated, 0..1
+
+class OutlineSection(BaseModel):
+    title: str
+    level: int  # 1 = top level
+    # pages (PDF) or slides (PPTX), 1-based and inclusive
+    start: int
+    end: int
+
 class DocumentOut(BaseModel):
     id: str
     filename: str
     upload_date: datetime
+    # id of an earlier upload of the same bytes by this user, if any
+    duplicate_of: str | None = None
+    # your other documents with nearly the same text (uploads only)
+    near_duplicates: list[NearDuplicate] = []
 
@@ -1,64 +1,251 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.concurrency import run_in_threadpool
+import asyncio
+import json
+import logging
+from collections import Counter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from bson import ObjectId
-from datetime import datetime
-from pathlib import Path
 
-from app.schemas.ai import SummarizeIn, SummarizeOut
+from app.schemas.ai import SummarizeIn, SummarizeOut, JobOut, BatchSummarizeIn, BatchSummarizeItem
 from app.core.security import get_current_user
+from app.core.config import settings
 from app.core.db import db
-from app.utils.file_utils import extract_text
-from app.services.ai_service import summarize_text
+from app.services.summary_service import (
+    create_summary, insert_summary, summarize_doc, build_summary_record, stored_summary,
+    summary_out, select_pages, selection_hash, selection_text,
+)
+from app.services.search_service import index_summaries
+from app.services.similarity_service import near_duplicate_summary
+from app.services.summary_cache import get_or_create_summary
+from app.services.summarization_engine import stream_document
+from app.services.text_service import get_document_hash
+from app.services import job_queue
+from app.services.folder_stats import adjust_counts
 
 router = APIRouter(prefix="/ai", tags=["ai"])
+log = logging.getLogger(__name__)
 
-@router.post("/summarize", response_model=SummarizeOut)
+# strong refs to stream producers, which may outlive their client
+_producers: set[asyncio.Task] = set()
+
+def _job_out(job: dict) -> JobOut:
+    return JobOut(
+        id=str(job["_id"]),
+        status=job["status"],
+        doc_id=str(job["doc_id"]),
+        mode=job["mode"],
+        attempts=job["attempts"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        summary_id=str(job["summary_id"]) if job.get("summary_id") else None,
+        error=job.get("error"),
+    )
+
+async def _get_owned_doc(doc_id: str, user_email: str) -> dict:
+    doc = await db.documents.find_one({
+        "_id": ObjectId(doc_id),
+        "user_email": user_email
+    })
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
+
+def _parse_folder_id(folder_id: str | None) -> ObjectId | None:
+    if not folder_id:
+        return None
+    try:
+        return ObjectId(folder_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid folder_id")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@router.post(
+    "/summarize",
+    response_model=SummarizeOut,
+    responses={202: {"model": JobOut, "description": "Queued (background=true)"}},
+)
 async def ai_summarize(
     req: SummarizeIn,
     folder_id: str | None = None,
+    background: bool = Query(False, description="Queue the job and return 202 with a job id"),
     user=Depends(get_current_user)
 ):
     # 1) Fetch the already-uploaded document
-    doc = await db.documents.find_one({
-        "_id": ObjectId(req.doc_id),
-        "user_email": user["email"]
-    })
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
+    doc = await _get_owned_doc(req.doc_id, user["email"])
+
+    fid = _parse_folder_id(folder_id)
+    # only these pages, when a range or section is given
+    selection = await select_pages(doc, req.pages, req.section)
+
+    # 2) Background mode: hand off to the job workers
+    if background:
+        job = await job_queue.enqueue_summarize(user["email"], doc["_id"], req.mode.value, fid, selection)
+        return JSONResponse(status_code=202, content=jsonable_encoder(_job_out(job)))
+
+    # 3) Summarize and persist right away
+    rec = await create_summary(user["email"], doc, req.mode.value, fid, selection)
+
+    # 4) Return it
+    return summary_out(rec)
+
+@router.post(
+    "/summarize/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def ai_summarize_stream(
+    req: SummarizeIn,
+    folder_id: str | None = None,
+    user=Depends(get_current_user)
+):
+    """
+    Server-sent events: `token` events ({"text": ...}) as the summary is
+    generated, then one `done` event carrying the saved summary, or an
+    `error` event ({"detail": ...}).
+    """
+    doc = await _get_owned_doc(req.doc_id, user["email"])
+    fid = _parse_folder_id(folder_id)
+    selection = await select_pages(doc, req.pages, req.section)
+
+    mode = req.mode.value
+    content_hash = await get_document_hash(doc)
+    cache_hash = selection_hash(content_hash, selection)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        # runs as its own task so it can outlive the client connection
+        streamed = False
+
+        async def generate() -> str:
+            # only runs for the one request generating this summary; tokens
+            # go out as they arrive
+            nonlocal streamed
+            if selection is None:
+                reused = await near_duplicate_summary(doc, mode)
+                if reused is not None:
+                    return reused
+            text = await selection_text(doc, selection)
+            if not text.strip():
+                raise HTTPException(status_code=400, detail="No extractable text in document")
+            parts = []
+            async for piece in stream_document(text, mode):
+                parts.append(piece)
+                streamed = True
+                queue.put_nowait(("token", {"text": piece}))
+            return "".join(parts).strip()
 
-    # 2) Extract text (including tables)
-    text = extract_text(Path(doc["path"]))
-    if not text:
-        raise HTTPException(status_code=400, detail="No extractable text in document")
-
-    # 3) Generate summary off the event loop
-    summary = await run_in_threadpool(summarize_text, text, req.mode.value)
-
-    # 4) Persist it, optionally assigning to a folder
-    created_at = datetime.utcnow()
-    rec = {
-        "doc_id": ObjectId(req.doc_id),
-        "user_email": user["email"],
-        "filename": doc["filename"],
-        "mode": req.mode.value,
-        "summary": summary,
-        "created_at": created_at,
-    }
-    if folder_id:
         try:
-            rec["folder_id"] = ObjectId(folder_id)
+            # identical streams running at once share one LLM call
+            summary = await get_or_create_summary(cache_hash, mode, generate)
+            if not streamed:
+                # cached, reused, or generated by a concurrent request
+                queue.put_nowait(("token", {"text": summary}))
+
+            rec = await insert_summary(user["email"], doc, mode, content_hash, summary, fid, selection)
+            queue.put_nowait(("done", summary_out(rec)))
+        except HTTPException as e:
+            queue.put_nowait(("error", {"detail": e.detail}))
         except Exception:
-            raise HTTPException(status_code=400, detail="Invalid folder_id")
-
-    result = await db.summaries.insert_one(rec)
-
-    # 5) Return it
-    return SummarizeOut(
-        id=str(result.inserted_id),
-        doc_id=req.doc_id,
-        filename=doc["filename"],
-        mode=req.mode,
-        summary=summary,
-        created_at=created_at,
-        folder_id=folder_id
+            log.exception("streaming summary of %s failed", req.doc_id)
+            queue.put_nowait(("error", {"detail": "Summarization failed"}))
+
+    producer = asyncio.create_task(produce())
+    _producers.add(producer)
+    producer.add_done_callback(_producers.discard)
+
+    async def events():
+        finished = False
+        try:
+            while not finished:
+                event, data = await queue.get()
+                finished = event in ("done", "error")
+                yield _sse(event, data)
+        finally:
+            # client disconnected mid-stream
+            if not finished and not settings.stream_finish_on_disconnect:
+                producer.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+@router.post("/summarize/batch", response_model=list[BatchSummarizeItem])
+async def ai_summarize_batch(
+    req: BatchSummarizeIn,
+    folder_id: str | None = None,
+    user=Depends(get_current_user)
+):
+    """
+    Summarize several documents in one request. Every document gets its
+    own result item; one failure does not fail the batch.
+    """
+    fid = _parse_folder_id(folder_id)
+    if fid and not await db.folders.find_one({"_id": fid, "user_email": user["email"]}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    # 1) Check ownership of every document in one query
+    doc_ids = list(dict.fromkeys(req.doc_ids))
+    items: dict[str, BatchSummarizeItem] = {}
+    oids: dict[str, ObjectId] = {}
+    for raw in doc_ids:
+        try:
+            oids[raw] = ObjectId(raw)
+        except Exception:
+            items[raw] = BatchSummarizeItem(doc_id=raw, status_code=400, error="Invalid doc_id")
+    docs = {
+        d["_id"]: d
+        async for d in db.documents.find({
+            "_id": {"$in": list(oids.values())},
+            "user_email": user["email"],
+        })
+    }
+
+    # 2) Summarize with a bounded number of LLM calls at once
+    sem = asyncio.Semaphore(settings.batch_summarize_concurrency)
+    records: dict[str, dict] = {}
+
+    async def run(raw: str, oid: ObjectId):
+        doc = docs.get(oid)
+        if not doc:
+            items[raw] = BatchSummarizeItem(doc_id=raw, status_code=404, error="Document not found")
+            return
+        async with sem:
+            try:
+                content_hash, summary = await summarize_doc(doc, req.mode.value)
+            except HTTPException as e:
+                items[raw] = BatchSummarizeItem(doc_id=raw, status_code=e.status_code, error=e.detail)
+                return
+            except Exception:
+                log.exception("batch summary of %s failed", raw)
+                items[raw] = BatchSummarizeItem(doc_id=raw, status_code=502, error="Summarization failed")
+                return
+        records[raw] = build_summary_record(user["email"], doc, req.mode.value, content_hash, summary, fid)
+
+    await asyncio.gather(*(run(raw, oid) for raw, oid in oids.items()))
+
+    # 3) Persist every new summary in one write
+    if records:
+        await db.summaries.insert_many([await stored_summary(rec) for rec in records.values()])
+        if fid:
+            await adjust_counts(user["email"], Counter({fid: len(records)}))
+        for raw, rec in records.items():
+            items[raw] = BatchSummarizeItem(doc_id=raw, status_code=200, summary=summary_out(rec))
+        await index_summaries(list(records.values()))
+
+    return [items[raw] for raw in doc_ids]
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job_status(job_id: str, user=Depends(get_current_user)):
+    try:
+        oid = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job_id")
+    job = await job_queue.get_job(oid, user["email"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_out(job)
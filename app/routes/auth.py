@@ -1,17 +1,17 @@
 from fastapi import APIRouter, HTTPException, status, Response, Depends
-from datetime import datetime, timedelta
+from datetime import datetime
 import random
 from app.schemas.auth import RegisterIn, VerifyIn, LoginIn, TokenOut, ChangePasswordIn, ForgotPasswordIn, ResetPasswordIn
-from app.utils.email_utils import send_verification_email
-from app.core.security import get_current_user, get_password_hash, create_access_token, verify_password
+from app.utils.email_utils import verification_email
+from app.services.email_outbox import queue_email
+from app.core.security import get_current_user, hash_password, create_access_token, check_password
 from app.core.config import settings
 from app.core.db import db
+from app.core.user_cache import invalidate_user
 from app.services.reset_service import create_reset_code, consume_reset_code
+from app.services.registration_service import store_pending_registration, consume_pending_registration
 router = APIRouter()
 
-verification_store: dict[str, dict] = {}
-CODE_EXPIRY_MINUTES = 30
-
 @router.post("/register", status_code=201)
 async def register(data: RegisterIn):
     # 1) check if user exists
@@ -20,26 +20,24 @@ async def register(data: RegisterIn):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # 2) hash password
-    hashed = get_password_hash(data.password)
+    hashed = await hash_password(data.password)
 
     # 3) generate 6-digit code
     code = f"{random.randint(0, 999999):06d}"
-    expire_at = datetime.utcnow() + timedelta(minutes=CODE_EXPIRY_MINUTES)
-    # temporarily store
-    verification_store[data.email] = {"code": code, "expires": expire_at, "hashed_password": hashed}
+    # store it where every worker can see it
+    await store_pending_registration(data.email, code, hashed)
 
-    # 4) send email
-    send_verification_email(data.email, code)
+    # 4) queue the email; the outbox senders deliver it
+    await queue_email(data.email, *verification_email(code))
 
     return {"msg": "Verification code sent"}
 
 @router.post("/verify")
 async def verify(data: VerifyIn):
-    record = verification_store.get(data.email)
-    if not record or record["code"] != data.code:
+    record = await consume_pending_registration(data.email, data.code)
+    if not record:
         raise HTTPException(status_code=400, detail="Invalid code")
-    if datetime.utcnow() > record["expires"]:
-        verification_store.pop(data.email, None)
+    if datetime.utcnow() > record["expires_at"]:
         raise HTTPException(status_code=400, detail="Code expired")
 
     # insert into DB
@@ -50,8 +48,7 @@ async def verify(data: VerifyIn):
         "first_name": "User",
         "last_name": "User"
     })
-    # clean up
-    verification_store.pop(data.email, None)
+    invalidate_user(data.email)
     return {"msg": "Email verified, registration complete"}
 
 @router.post("/login", response_model=TokenOut)
@@ -59,8 +56,16 @@ async def login(data: LoginIn):
     user = await db.users.find_one({"email": data.email})
     if not user or not user.get("is_verified", False):
         raise HTTPException(status_code=400, detail="Invalid credentials or unverified")
-    if not verify_password(data.password, user["hashed_password"]):
+    ok, new_hash = await check_password(data.password, user["hashed_password"])
+    if not ok:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash:
+        # bcrypt cost changed since this hash was made
+        await db.users.update_one(
+            {"email": user["email"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        invalidate_user(user["email"])
     token = create_access_token(subject=user["email"])
     return {"access_token": token, "token_type": "bearer"}
 
@@ -82,7 +87,7 @@ async def forgot_password(data: ForgotPasswordIn):
         raise HTTPException(status_code=404, detail="No such user")
 
     code = await create_reset_code(data.email)
-    send_verification_email(data.email, code)
+    await queue_email(data.email, *verification_email(code))
     return {"msg": "Reset code sent"}
 
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
@@ -98,11 +103,12 @@ async def reset_password(data: ResetPasswordIn):
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired code")
 
-    hashed = get_password_hash(data.new_password)
+    hashed = await hash_password(data.new_password)
     await db.users.update_one(
         {"email": email},
         {"$set": {"hashed_password": hashed}}
     )
+    invalidate_user(email)
     return {"msg": "Password has been reset"}
 
 @router.post("/change-password")
@@ -121,17 +127,19 @@ async def change_password(
         )
 
     # 2) Verify old password is correct
-    if not verify_password(data.old_password, user["hashed_password"]):
+    ok, _ = await check_password(data.old_password, user["hashed_password"])
+    if not ok:
         raise HTTPException(
             status_code=400,
             detail="Old password is incorrect."
         )
 
     # 3) Hash & persist the new password
-    new_hashed = get_password_hash(data.new_password)
+    new_hashed = await hash_password(data.new_password)
     await db.users.update_one(
         {"email": user["email"]},
         {"$set": {"hashed_password": new_hashed}}
     )
+    invalidate_user(user["email"])
 
     return {"msg": "Password changed successfully."}
\ No newline at end of file
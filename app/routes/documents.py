@@ -1,16 +1,29 @@
+import os
+from collections import Counter
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from fastapi import Query, Response
-from fastapi.responses import JSONResponse
+from fastapi import Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from pathlib import Path
-from fastapi.responses import FileResponse
+from urllib.parse import quote
 
 from app.core.security import get_current_user
 from app.core.db import db
-from app.models.document import DocumentOut
-from app.utils.file_utils import save_upload, extract_text
+from app.models.document import DocumentOut, NearDuplicate, OutlineSection
+from app.core.config import settings
+from app.utils.file_utils import DocumentFileResponse, MEDIA_TYPES, content_disposition, save_upload
+from app.services.text_service import ensure_extracted, get_document_outline, load_text
+from app.services.similarity_service import find_near_duplicates, lsh_bands, signature
+from app.services.search_service import index_document, remove_document
+from app.services.folder_stats import adjust_counts, count_by_folder
+from app.services.storage import RemoteStorage, claim_file, get_storage, register_file, release_file
 from app.schemas.ai import SummarizeOut
+from app.services.summary_service import parsed, summaries_response, summary_list_projection
+from app.services.text_store import delete_blobs
+from app.utils.pagination import fetch_page, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -19,73 +32,224 @@ async def upload_doc(
     file: UploadFile = File(...),
     user=Depends(get_current_user)
 ):
-    # 1) Save & validate extension
-    saved_path = save_upload(file)
+    # 1) Validate, stream to disk and hash
+    saved = await save_upload(file)
+    saved_path, sha256 = saved.path, saved.sha256
 
-    # 2) Insert metadata
-    rec = {
-        "user_email": user["email"],
-        "filename": file.filename,
-        "path": str(saved_path),
-        "upload_date": datetime.utcnow(),
-    }
-    res = await db.documents.insert_one(rec)
+    # 2) Byte-identical re-upload: report it and optionally share the file
+    duplicate = await db.documents.find_one(
+        {"user_email": user["email"], "sha256": sha256}, {"minhash": 1}
+    )
+    # an earlier upload of these bytes, whose signature is reused
+    same = duplicate
+    shared = None
+    if settings.dedupe_uploads:
+        same = duplicate or await db.documents.find_one({"sha256": sha256}, {"minhash": 1})
+        # a reference on a stored copy (yours or anyone's) keeps it from
+        # being deleted, so our own file can go
+        shared = await claim_file(sha256)
+        if shared:
+            saved_path.unlink(missing_ok=True)
+            saved_path = Path(shared["_id"])
+    storage_key = shared.get("storage_key") if shared else None
+    registered = shared is not None
+
+    try:
+        # 3) Extract text once per unique file
+        try:
+            text = await ensure_extracted(saved_path, sha256)
+        except Exception:
+            raise HTTPException(400, "Could not read document")
+
+        # 4) Similarity signature (copied from an earlier upload of the same
+        #    bytes when there is one), and your near-identical documents
+        sig = same.get("minhash") if same else None
+        if sig is None:
+            if text is None:
+                text = await load_text(sha256) or ""
+            sig = await signature(text)
+        near = []
+        if not duplicate:
+            near = await find_near_duplicates(
+                sig, sha256, settings.near_duplicate_threshold, user_email=user["email"]
+            )
+
+        # 5) A newly stored file: copy it to the bucket, if downloads come
+        #    from one, and start counting its references
+        if not registered:
+            storage_key = await get_storage().put(saved_path, MEDIA_TYPES[saved_path.suffix.lower()])
+            await register_file(saved_path, sha256, storage_key)
+            registered = True
+
+        # 6) Insert metadata
+        rec = {
+            "user_email": user["email"],
+            "filename": file.filename,
+            "path": str(saved_path),
+            "sha256": sha256,
+            "size": saved.size,
+            "minhash": sig,
+            "lsh_bands": lsh_bands(sig),
+            "upload_date": datetime.utcnow(),
+        }
+        if storage_key:
+            rec["storage_key"] = storage_key
+        res = await db.documents.insert_one(rec)
+        rec["_id"] = res.inserted_id
+    except Exception:
+        # no document uses the file (or our reference to it) after all
+        if registered:
+            await release_file(str(saved_path), storage_key)
+        else:
+            saved_path.unlink(missing_ok=True)
+        raise
+
+    # 7) Make the extracted text searchable
+    await index_document(rec, text)
     return DocumentOut(
         id=str(res.inserted_id),
         filename=rec["filename"],
         upload_date=rec["upload_date"],
+        duplicate_of=str(duplicate["_id"]) if duplicate else None,
+        near_duplicates=[
+            NearDuplicate(id=str(d["_id"]), filename=d["filename"], similarity=score)
+            for score, d in near
+        ],
     )
 
 @router.get("/", response_model=list[DocumentOut])
-async def list_docs(user=Depends(get_current_user)):
-    docs = []
-    async for d in db.documents.find({"user_email": user["email"]}):
-        docs.append(DocumentOut(
+async def list_docs(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    user=Depends(get_current_user),
+):
+    rows, next_cursor = await fetch_page(
+        db.documents,
+        {"user_email": user["email"]},
+        "upload_date",
+        limit=limit,
+        cursor=cursor,
+        projection={"filename": 1, "upload_date": 1},
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        DocumentOut(
             id=str(d["_id"]),
             filename=d["filename"],
             upload_date=d["upload_date"],
-        ))
-    return docs
+        )
+        for d in rows
+    ]
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified.replace(microsecond=0) <= since
 
 @router.get("/{doc_id}/content")
 async def get_document_content(
     doc_id: str,
+    request: Request,
     user=Depends(get_current_user),
 ):
     # 1) fetch the metadata
     doc = await db.documents.find_one({
         "_id": ObjectId(doc_id),
         "user_email": user["email"],
-    })
+    }, {"path": 1, "filename": 1, "sha256": 1, "upload_date": 1, "storage_key": 1})
     if not doc:
         raise HTTPException(404, "Document not found")
-
-    # 2) stream the file
-    path = doc["path"]        # e.g. "uploads/… .docx"
     filename = doc["filename"]
-    return FileResponse(
+    media_type = MEDIA_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream")
+
+    # 2) In the bucket: send the client there (the bucket handles ranges
+    #    and revalidation); the redirect is cacheable while the URL lasts
+    storage = get_storage()
+    if isinstance(storage, RemoteStorage) and doc.get("storage_key"):
+        url, ttl = storage.download_url(doc["storage_key"], filename, media_type)
+        return RedirectResponse(url, status_code=307, headers={
+            "cache-control": f"private, max-age={ttl}",
+        })
+
+    # 3) A document's bytes never change, so their hash is a strong ETag
+    #    and a repeat view is answered without reading the file
+    headers = {"cache-control": f"private, max-age={settings.download_max_age_seconds}"}
+    if doc.get("sha256"):
+        etag = f'"{doc["sha256"]}"'
+        headers["etag"] = etag
+        headers["last-modified"] = format_datetime(
+            doc["upload_date"].replace(tzinfo=timezone.utc), usegmt=True
+        )
+        if _not_modified(request, etag, doc["upload_date"]):
+            return Response(status_code=304, headers=headers)
+
+    # 4) Let nginx send the file, when it is in front of us
+    path = Path(doc["path"])        # e.g. "uploads/… .docx"
+    if settings.download_accel_redirect_prefix:
+        return Response(media_type=media_type, headers={
+            **headers,
+            "x-accel-redirect": settings.download_accel_redirect_prefix + quote(path.name),
+            "content-disposition": content_disposition(filename),
+        })
+
+    # 5) Otherwise stream it ourselves; FileResponse answers Range with 206
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(404, "Document file is missing")
+    return DocumentFileResponse(
         path,
-        media_type="application/octet-stream",
+        media_type=media_type,
         filename=filename,
+        headers=headers,
+        stat_result=stat_result,
     )
 
+@router.get("/{doc_id}/outline", response_model=list[OutlineSection])
+async def get_outline(doc_id: str, user=Depends(get_current_user)):
+    """
+    Named sections of a PDF (its outline) or PPTX (slide titles), to pick
+    from for /ai/summarize's `section`. Other documents have none.
+    """
+    doc = await db.documents.find_one({
+        "_id": ObjectId(doc_id),
+        "user_email": user["email"],
+    }, {"path": 1, "outline": 1})
+    if not doc:
+        raise HTTPException(404, "Document not found")
+    return await parsed(get_document_outline(doc))
+
 @router.get("/{doc_id}/summaries", response_model=list[SummarizeOut])
-async def get_summaries(doc_id: str, user=Depends(get_current_user)):
-    docs = []
-    cursor = db.summaries.find({
-        "doc_id": ObjectId(doc_id),
-        "user_email": user["email"]
-    }).sort("created_at", -1)
-    async for s in cursor:
-        docs.append(SummarizeOut(
-            id=str(s["_id"]),
-            doc_id=doc_id,
-            filename=s["filename"],
-            mode=s["mode"],
-            summary=s["summary"],
-            created_at=s["created_at"],
-        ))
-    return docs
+async def get_summaries(
+    doc_id: str,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    preview: bool = False,
+    user=Depends(get_current_user),
+):
+    rows, next_cursor = await fetch_page(
+        db.summaries,
+        {"doc_id": ObjectId(doc_id), "user_email": user["email"]},
+        "created_at",
+        limit=limit,
+        cursor=cursor,
+        projection=summary_list_projection(preview),
+    )
+    return await summaries_response(rows, next_cursor)
 
 @router.delete("/{doc_id}", status_code=204)
 async def delete_document(
@@ -97,25 +261,26 @@ async def delete_document(
     Deletes a document. If ?cascade=true, also deletes all summaries for that document.
     """
     oid = ObjectId(doc_id)
-    # 1) Verify ownership
-    doc = await db.documents.find_one({"_id": oid, "user_email": user["email"]})
+    # 1) Delete the document record, if you own it
+    doc = await db.documents.find_one_and_delete(
+        {"_id": oid, "user_email": user["email"]},
+        projection={"path": 1, "storage_key": 1},
+    )
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # 2) Delete file from disk (ignore if already gone)
-    try:
-        Path(doc["path"]).unlink()
-    except Exception:
-        pass
-
-    # 3) Delete the document record
-    await db.documents.delete_one({"_id": oid})
+    # 2) Delete file from disk (and bucket) unless a re-upload shares it
+    await release_file(doc["path"], doc.get("storage_key"))
 
-    # 4) Optionally delete all its summaries
+    # 3) Optionally delete all its summaries
     if cascade:
+        in_folders = await count_by_folder({"doc_id": oid, "user_email": user["email"]})
         await db.summaries.delete_many({
             "doc_id": oid,
             "user_email": user["email"]
         })
+        await delete_blobs({"doc_id": oid})
+        await adjust_counts(user["email"], Counter({fid: -row["count"] for fid, row in in_folders.items()}))
+    await remove_document(oid, user["email"], with_summaries=cascade)
 
     return Response(status_code=204)
\ No newline at end of file
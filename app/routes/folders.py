@@ -1,71 +1,104 @@
 # app/routes/folders.py
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from datetime import datetime
 from bson import ObjectId
-from app.schemas.folder import FolderCreate, FolderOut
+from pymongo import ReturnDocument
+from app.schemas.folder import FolderCreate, FolderOut, FolderOverview
 from app.core.security import get_current_user
 from app.core.db import db
 from app.schemas.ai import SummarizeOut
+from app.services.folder_stats import adjust_counts, moved
+from app.services.summary_service import summaries_response, summary_list_projection
+from app.utils.pagination import fetch_page, sort_spec, NEXT_CURSOR_HEADER
 router = APIRouter(prefix="/folders", tags=["folders"])
 
+def _folder_out(f: dict) -> FolderOut:
+    return FolderOut(
+        id=str(f["_id"]),
+        name=f["name"],
+        created_at=f["created_at"],
+        summary_count=f.get("summary_count", 0),
+        updated_at=f.get("updated_at"),
+    )
+
 @router.post("/", response_model=FolderOut)
 async def create_folder(data: FolderCreate, user=Depends(get_current_user)):
+    now = datetime.utcnow()
     rec = {
         "user_email": user["email"],
         "name": data.name,
-        "created_at": datetime.utcnow(),
+        "created_at": now,
+        "summary_count": 0,
+        "updated_at": now,
     }
-    result = await db.folders.insert_one(rec)
-    # Cast the ObjectId to str:
-    return FolderOut(
-        id=str(result.inserted_id),
-        name=rec["name"],
-        created_at=rec["created_at"],
-    )
+    await db.folders.insert_one(rec)
+    return _folder_out(rec)
 
 @router.get("/", response_model=list[FolderOut])
-async def list_folders(user=Depends(get_current_user)):
-    out = []
-    async for f in db.folders.find({"user_email": user["email"]}).sort("created_at", -1):
-        out.append(
-            FolderOut(
-                id=str(f["_id"]),
-                name=f["name"],
-                created_at=f["created_at"],
-            )
-        )
-    return out
+async def list_folders(
+    response: Response,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    user=Depends(get_current_user),
+):
+    rows, next_cursor = await fetch_page(
+        db.folders,
+        {"user_email": user["email"]},
+        "created_at",
+        limit=limit,
+        cursor=cursor,
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [_folder_out(f) for f in rows]
+
+@router.get("/overview", response_model=FolderOverview)
+async def folders_overview(user=Depends(get_current_user)):
+    """
+    Every folder with its summary count and last change, newest folder
+    first, in one query (the counts are stored on the folders).
+    """
+    rows = await db.folders.find(
+        {"user_email": user["email"]},
+        {"name": 1, "created_at": 1, "summary_count": 1, "updated_at": 1},
+    ).sort(sort_spec("created_at")).to_list(length=None)
+    folders = [_folder_out(f) for f in rows]
+    return FolderOverview(
+        folders=folders,
+        total_summaries=sum(f.summary_count for f in folders),
+        updated_at=max((f.updated_at for f in folders if f.updated_at), default=None),
+    )
 
 
 @router.get("/{folder_id}/summaries", response_model=list[SummarizeOut])
-async def get_folder_summaries(folder_id: str, user=Depends(get_current_user)):
+async def get_folder_summaries(
+    folder_id: str,
+    limit: int | None = Query(None, ge=1, le=500),
+    cursor: str | None = None,
+    preview: bool = False,
+    user=Depends(get_current_user),
+):
     # Validate folder ownership
     try:
         fid = ObjectId(folder_id)
     except:
         raise HTTPException(400, "Invalid folder_id")
 
-    folder = await db.folders.find_one({"_id": fid, "user_email": user["email"]})
+    folder = await db.folders.find_one({"_id": fid, "user_email": user["email"]}, {"_id": 1})
     if not folder:
         raise HTTPException(404, "Folder not found")
 
     # Fetch summaries assigned to this folder
-    out = []
-    async for s in db.summaries.find({
-        "folder_id": fid,
-        "user_email": user["email"]
-    }).sort("created_at", -1):
-        out.append(SummarizeOut(
-            id=str(s["_id"]),
-            doc_id=str(s["doc_id"]),
-            filename=s["filename"],
-            mode=s["mode"],
-            summary=s["summary"],
-            created_at=s["created_at"],
-            folder_id=folder_id,
-        ))
-    return out
+    rows, next_cursor = await fetch_page(
+        db.summaries,
+        {"folder_id": fid, "user_email": user["email"]},
+        "created_at",
+        limit=limit,
+        cursor=cursor,
+        projection=summary_list_projection(preview),
+    )
+    return await summaries_response(rows, next_cursor)
 
 @router.delete("/{folder_id}/summaries/{summary_id}", status_code=204)
 async def remove_summary_from_folder(
@@ -76,12 +109,9 @@ async def remove_summary_from_folder(
     """
     Un‐assign one summary from this folder (does not delete the summary).
     """
-    # 1) verify folder ownership
+    # clear the summary’s folder_id; matching on user_email and folder_id
+    # covers ownership of both, so the folder needs no lookup of its own
     fid = ObjectId(folder_id)
-    folder = await db.folders.find_one({"_id": fid, "user_email": user["email"]})
-    if not folder:
-        raise HTTPException(404, "Folder not found")
-    # 2) clear the summary’s folder_id
     sid = ObjectId(summary_id)
     res = await db.summaries.update_one(
         {"_id": sid, "user_email": user["email"], "folder_id": fid},
@@ -89,23 +119,20 @@ async def remove_summary_from_folder(
     )
     if res.modified_count == 0:
         raise HTTPException(404, "Summary not found in folder")
+    await adjust_counts(user["email"], moved(fid, None))
     return Response(status_code=204)
 
 @router.put("/{folder_id}", response_model=FolderOut)
 async def rename_folder(folder_id: str, data: FolderCreate, user=Depends(get_current_user)):
     oid = ObjectId(folder_id)
-    res = await db.folders.update_one(
+    f = await db.folders.find_one_and_update(
         {"_id": oid, "user_email": user["email"]},
-        {"$set": {"name": data.name}}
+        {"$set": {"name": data.name}},
+        return_document=ReturnDocument.AFTER,
     )
-    if not res.modified_count:
+    if not f:
         raise HTTPException(404, "Folder not found")
-    f = await db.folders.find_one({"_id": oid})
-    return FolderOut(
-        id=str(f["_id"]),
-        name=f["name"],
-        created_at=f["created_at"],
-    )
+    return _folder_out(f)
 
 @router.delete("/{folder_id}", status_code=204)
 async def delete_folder(folder_id: str, user=Depends(get_current_user)):
@@ -113,7 +140,7 @@ async def delete_folder(folder_id: str, user=Depends(get_current_user)):
     res = await db.folders.delete_one({"_id": oid, "user_email": user["email"]})
     if not res.deleted_count:
         raise HTTPException(404, "Folder not found")
-    # Optionally clear folder_id on summaries
+    # Optionally clear folder_id on summaries (its counters went with it)
     await db.summaries.update_many(
         {"folder_id": oid},
         {"$set": {"folder_id": None}}
@@ -0,0 +1,47 @@
+# app/routes/search.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from app.core.config import settings
+from app.core.security import get_current_user
+from app.schemas.search import SearchHit
+from app.services.search_service import search
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("", response_model=list[SearchHit])
+async def search_all(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.search_page_size, ge=1, le=100),
+    cursor: str | None = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    user=Depends(get_current_user),
+):
+    """
+    Search your documents, summaries and notes, best match first.
+    `q` takes words, "exact phrases" and -excluded words.
+    """
+    # hits are ranked, not ordered by a field, so the cursor is an offset
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    hits, more = await search(user["email"], q, limit, offset)
+    if more:
+        response.headers[NEXT_CURSOR_HEADER] = str(offset + limit)
+    return [
+        SearchHit(
+            kind=h["kind"],
+            id=str(h["_id"]),
+            doc_id=str(h["doc_id"]),
+            filename=h["filename"],
+            score=h["score"],
+            snippet=h["snippet"],
+            highlights=h["highlights"],
+            created_at=h["created_at"],
+        )
+        for h in hits
+    ]
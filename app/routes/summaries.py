@@ -1,30 +1,113 @@
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi import Response
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
 from bson import ObjectId
+from collections import Counter
+from pymongo import ReturnDocument
 from app.core.security import get_current_user
 from app.core.db import db
 from app.schemas.ai import SummarizeOut
-from app.schemas.summary import SummaryFolderUpdate
+from app.schemas.summary import SummaryFolderUpdate, SummaryBulkFolderUpdate, SummaryBulkDelete, BulkResult
 from app.models.note import SummaryNoteUpdate
+from app.services.summary_service import (
+    export_summaries, summaries_out, summaries_response, summary_list_projection,
+)
+from app.services.folder_stats import adjust_counts, moved
+from app.services.text_store import delete_blobs
+from app.services.search_service import remove_entries, set_note
+from app.utils.fast_json import NDJSON_MEDIA_TYPE, ndjson_stream
+from app.utils.pagination import fetch_page, NEXT_CURSOR_HEADER
 
 router = APIRouter(prefix="/summaries", tags=["summaries"])
 
+def _parse_ids(ids: list[str]) -> dict[str, ObjectId]:
+    try:
+        return {raw: ObjectId(raw) for raw in dict.fromkeys(ids)}
+    except Exception:
+        raise HTTPException(400, "Invalid summary id")
+
+async def _owned_ids(
+    oids: dict[str, ObjectId], user_email: str
+) -> tuple[dict[ObjectId, ObjectId | None], list[str]]:
+    """
+    Split ids into the ones this user owns (with the folder each is in)
+    and the rest, in one query.
+    """
+    owned = {
+        s["_id"]: s.get("folder_id")
+        async for s in db.summaries.find(
+            {"_id": {"$in": list(oids.values())}, "user_email": user_email},
+            {"folder_id": 1},
+        )
+    }
+    missing = [raw for raw, oid in oids.items() if oid not in owned]
+    return owned, missing
+
+@router.post("/bulk/folder", response_model=BulkResult)
+async def bulk_update_summary_folder(
+    data: SummaryBulkFolderUpdate,
+    user=Depends(get_current_user)
+):
+    """
+    Move many summaries into a folder (or out of any folder with null).
+    """
+    oids = _parse_ids(data.summary_ids)
+
+    # 1) Validate the target folder
+    fid = None
+    if data.folder_id is not None:
+        try:
+            fid = ObjectId(data.folder_id)
+        except Exception:
+            raise HTTPException(400, "Invalid folder_id")
+        if not await db.folders.find_one({"_id": fid, "user_email": user["email"]}, {"_id": 1}):
+            raise HTTPException(404, "Folder not found")
+
+    # 2) Ownership of all summaries in one query, then one write
+    owned, missing = await _owned_ids(oids, user["email"])
+    updated = 0
+    if owned:
+        res = await db.summaries.update_many(
+            {"_id": {"$in": list(owned)}, "user_email": user["email"]},
+            {"$set": {"folder_id": fid}}
+        )
+        updated = res.matched_count
+        # 3) Folder counters, from the folders the summaries were just in
+        changes = Counter()
+        for old in owned.values():
+            changes.update(moved(old, fid))
+        await adjust_counts(user["email"], changes)
+    return BulkResult(affected=updated, not_found=missing)
+
+@router.post("/bulk/delete", response_model=BulkResult)
+async def bulk_delete_summaries(
+    data: SummaryBulkDelete,
+    user=Depends(get_current_user)
+):
+    """
+    Delete many summaries in one request.
+    """
+    oids = _parse_ids(data.summary_ids)
+    owned, missing = await _owned_ids(oids, user["email"])
+    deleted = 0
+    if owned:
+        res = await db.summaries.delete_many({"_id": {"$in": list(owned)}, "user_email": user["email"]})
+        deleted = res.deleted_count
+        await delete_blobs({"_id": {"$in": list(owned)}})
+        await remove_entries(list(owned))
+        changes = Counter()
+        changes.subtract(owned.values())
+        await adjust_counts(user["email"], changes)
+    return BulkResult(affected=deleted, not_found=missing)
+
 @router.put("/{summary_id}/folder", response_model=SummarizeOut)
 async def update_summary_folder(
     summary_id: str,
     data: SummaryFolderUpdate,
     user = Depends(get_current_user)
 ):
-    # 1) Fetch and validate ownership
-    rec = await db.summaries.find_one({
-        "_id": ObjectId(summary_id),
-        "user_email": user["email"]
-    })
-    if not rec:
-        raise HTTPException(404, "Summary not found")
-
     update = {}
-    # 2) If folder_id provided, validate that folder exists & you own it
+    # 1) If folder_id provided, validate that folder exists & you own it
     if data.folder_id is not None:
         try:
             fid = ObjectId(data.folder_id)
@@ -33,29 +116,44 @@ async def update_summary_folder(
         folder = await db.folders.find_one({
             "_id": fid,
             "user_email": user["email"]
-        })
+        }, {"_id": 1})
         if not folder:
             raise HTTPException(404, "Folder not found")
         update["folder_id"] = fid
     else:
         update["folder_id"] = None
 
-    # 3) Persist change
-    await db.summaries.update_one(
-        {"_id": ObjectId(summary_id)},
-        {"$set": update}
+    # 2) Persist change on a summary you own and get it back in one round
+    #    trip (as it was, so we know which folder it left)
+    before = await db.summaries.find_one_and_update(
+        {"_id": ObjectId(summary_id), "user_email": user["email"]},
+        {"$set": update},
+        return_document=ReturnDocument.BEFORE,
     )
+    if not before:
+        raise HTTPException(404, "Summary not found")
+
+    # 3) Folder counters
+    await adjust_counts(user["email"], moved(before.get("folder_id"), update["folder_id"]))
+    return (await summaries_out([{**before, **update}]))[0]
 
-    # 4) Return the updated summary
-    updated = await db.summaries.find_one({"_id": ObjectId(summary_id)})
-    return SummarizeOut(
-        id=str(updated["_id"]),
-        doc_id=str(updated["doc_id"]),
-        filename=updated["filename"],
-        mode=updated["mode"],
-        summary=updated["summary"],
-        created_at=updated["created_at"],
-        folder_id=str(updated.get("folder_id")) if updated.get("folder_id") else None,
+@router.get(
+    "/export.ndjson",
+    response_class=StreamingResponse,
+    responses={200: {
+        "content": {NDJSON_MEDIA_TYPE: {}},
+        "description": "One SummarizeOut per line",
+    }},
+)
+async def export_all_summaries(user=Depends(get_current_user)):
+    """
+    Streams all summaries of the current user (notes included), newest
+    first, as newline-delimited JSON. Rows are written as the database
+    returns them, so memory use does not grow with the number of summaries.
+    """
+    return ndjson_stream(
+        export_summaries({"user_email": user["email"]}),
+        headers={"Content-Disposition": 'attachment; filename="summaries.ndjson"'},
     )
 
 @router.get("/{summary_id}", response_model=SummarizeOut)
@@ -71,39 +169,29 @@ async def get_one_summary(summary_id: str, user=Depends(get_current_user)):
     if not rec:
         raise HTTPException(404, "Summary not found")
 
-    return SummarizeOut(
-        id=str(rec["_id"]),
-        doc_id=str(rec["doc_id"]),
-        filename=rec["filename"],
-        mode=rec["mode"],
-        summary=rec["summary"],
-        created_at=rec["created_at"],
-        folder_id=str(rec.get("folder_id")) if rec.get("folder_id") else None,
-        note=rec.get("note")
-    )
+    return (await summaries_out([rec]))[0]
 
 @router.get("/", response_model=list[SummarizeOut])
-async def list_all_summaries(user=Depends(get_current_user)):
+async def list_all_summaries(
+    limit: int | None = Query(None, ge=1, le=500, description="Page size (default: everything)"),
+    cursor: str | None = Query(None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"),
+    preview: bool = Query(False, description="Return only the first characters of each summary"),
+    user=Depends(get_current_user),
+):
     """
     Returns all summaries belonging to the current user,
-    sorted newest first.
-    """
-    out: list[SummarizeOut] = []
-    cursor = db.summaries.find(
-        {"user_email": user["email"]}
-    ).sort("created_at", -1)
-
-    async for s in cursor:
-        out.append(SummarizeOut(
-            id=str(s["_id"]),
-            doc_id=str(s["doc_id"]),
-            filename=s["filename"],
-            mode=s["mode"],
-            summary=s["summary"],
-            created_at=s["created_at"],
-            folder_id=str(s["folder_id"]) if s.get("folder_id") else None,
-        ))
-    return out
+    sorted newest first. With `limit`, returns one page and puts the
+    cursor for the next page in the X-Next-Cursor header.
+    """
+    rows, next_cursor = await fetch_page(
+        db.summaries,
+        {"user_email": user["email"]},
+        "created_at",
+        limit=limit,
+        cursor=cursor,
+        projection=summary_list_projection(preview),
+    )
+    return await summaries_response(rows, next_cursor)
 
 @router.put("/{summary_id}/note", response_model=SummarizeOut)
 async def update_summary_note(
@@ -115,29 +203,16 @@ async def update_summary_note(
     Add or overwrite the custom note on a summary.
     """
     oid = ObjectId(summary_id)
-    # ensure it exists & you own it
-    rec = await db.summaries.find_one({"_id": oid, "user_email": user["email"]})
-    if not rec:
-        raise HTTPException(404, "Summary not found")
-
-    # update the note field
-    await db.summaries.update_one(
-        {"_id": oid},
-        {"$set": {"note": data.note}}
-    )
-
-    # return the updated record
-    updated = await db.summaries.find_one({"_id": oid})
-    return SummarizeOut(
-        id=str(updated["_id"]),
-        doc_id=str(updated["doc_id"]),
-        filename=updated["filename"],
-        mode=updated["mode"],
-        summary=updated["summary"],
-        created_at=updated["created_at"],
-        folder_id=str(updated.get("folder_id")) if updated.get("folder_id") else None,
-        note=updated.get("note"),
+    # update the note on a summary you own and return the updated record
+    updated = await db.summaries.find_one_and_update(
+        {"_id": oid, "user_email": user["email"]},
+        {"$set": {"note": data.note}},
+        return_document=ReturnDocument.AFTER,
     )
+    if not updated:
+        raise HTTPException(404, "Summary not found")
+    await set_note(oid, data.note)
+    return (await summaries_out([updated]))[0]
 
 @router.delete("/{summary_id}", status_code=204)
 async def delete_summary(
@@ -148,10 +223,14 @@ async def delete_summary(
     Deletes exactly one summary.
     """
     oid = ObjectId(summary_id)
-    res = await db.summaries.delete_one({
+    rec = await db.summaries.find_one_and_delete({
         "_id": oid,
         "user_email": user["email"]
-    })
-    if res.deleted_count == 0:
+    }, projection={"summary_blob": 1, "folder_id": 1})
+    if not rec:
         raise HTTPException(status_code=404, detail="Summary not found")
+    if rec.get("summary_blob"):
+        await delete_blobs({"_id": oid})
+    await remove_entries([oid])
+    await adjust_counts(user["email"], moved(rec.get("folder_id"), None))
     return Response(status_code=204)
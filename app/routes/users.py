@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
+from pymongo import ReturnDocument
 from app.schemas.user import ProfileOut, ProfileUpdate
 from app.core.security import get_current_user
 from app.core.db import db
+from app.core.user_cache import invalidate_user
 
 router = APIRouter()
 
@@ -18,11 +20,12 @@ async def update_profile(
     data: ProfileUpdate,
     current_user=Depends(get_current_user),
 ):
-    await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"email": current_user["email"]},
-        {"$set": {"first_name": data.first_name, "last_name": data.last_name}}
+        {"$set": {"first_name": data.first_name, "last_name": data.last_name}},
+        return_document=ReturnDocument.AFTER,
     )
-    user = await db.users.find_one({"email": current_user["email"]})
+    invalidate_user(current_user["email"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return ProfileOut(
@@ -1,6 +1,6 @@
 # app/schemas/ai.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from enum import Enum
 from datetime import datetime
 
@@ -9,9 +9,36 @@ class SummaryMode(str, Enum):
     standard = "standard"
     detailed = "detailed"
 
+class PageRange(BaseModel):
+    # pages of a PDF or slides of a PPTX, 1-based and inclusive; no end
+    # means up to the last one
+    start: int = Field(1, ge=1)
+    end: int | None = Field(None, ge=1)
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if self.end is not None and self.end < self.start:
+            raise ValueError("end must not be before start")
+        return self
+
 class SummarizeIn(BaseModel):
     doc_id: str
     mode: SummaryMode = SummaryMode.standard
+    # summarize only part of a PDF / PPTX: a page range, or a section of
+    # GET /documents/{id}/outline by title (case-insensitive, exact match
+    # first, else the first title containing it)
+    pages: PageRange | None = None
+    section: str | None = Field(None, min_length=1, max_length=300)
+
+    @model_validator(mode="after")
+    def _one_selector(self):
+        if self.pages is not None and self.section is not None:
+            raise ValueError("give either pages or section, not both")
+        return self
+
+class BatchSummarizeIn(BaseModel):
+    doc_ids: list[str] = Field(..., min_length=1, max_length=50)
+    mode: SummaryMode = SummaryMode.standard
 
 class SummarizeOut(BaseModel):
     id: str            # drop alias
@@ -21,4 +48,30 @@ class SummarizeOut(BaseModel):
     summary: str
     created_at: datetime
     folder_id: str | None = None
-    note: str | None = None
\ No newline at end of file
+    note: str | None = None
+    # the part summarized, when not the whole document
+    pages: PageRange | None = None
+    section: str | None = None
+
+class BatchSummarizeItem(BaseModel):
+    doc_id: str
+    status_code: int
+    summary: SummarizeOut | None = None
+    error: str | None = None
+
+class JobStatus(str, Enum):
+    queued  = "queued"
+    running = "running"
+    done    = "done"
+    failed  = "failed"
+
+class JobOut(BaseModel):
+    id: str
+    status: JobStatus
+    doc_id: str
+    mode: SummaryMode
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
+    summary_id: str | None = None
+    error: str | None = None
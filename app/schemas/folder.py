@@ -10,3 +10,13 @@ class FolderOut(BaseModel):
     id: str            # no alias, just a plain string
     name: str
     created_at: datetime
+    # summaries in the folder, and when one last entered or left it
+    summary_count: int = 0
+    updated_at: datetime | None = None
+
+class FolderOverview(BaseModel):
+    folders: list[FolderOut]
+    # summaries filed in any folder
+    total_summaries: int
+    # newest updated_at of any folder
+    updated_at: datetime | None = None
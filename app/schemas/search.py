@@ -0,0 +1,20 @@
+# app/schemas/search.py
+
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+
+class SearchKind(str, Enum):
+    document = "document"
+    summary = "summary"
+
+class SearchHit(BaseModel):
+    kind: SearchKind
+    id: str            # document or summary id
+    doc_id: str
+    filename: str
+    score: float
+    snippet: str
+    # (start, end) offsets of the matched terms inside `snippet`
+    highlights: list[tuple[int, int]]
+    created_at: datetime
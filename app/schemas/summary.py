@@ -1,4 +1,16 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class SummaryFolderUpdate(BaseModel):
     folder_id: str | None  # assign to folder (or null to un‐assign)
+
+class SummaryBulkFolderUpdate(BaseModel):
+    summary_ids: list[str] = Field(..., min_length=1, max_length=1000)
+    folder_id: str | None  # assign to folder (or null to un‐assign)
+
+class SummaryBulkDelete(BaseModel):
+    summary_ids: list[str] = Field(..., min_length=1, max_length=1000)
+
+class BulkResult(BaseModel):
+    affected: int
+    # ids that do not exist or belong to someone else
+    not_found: list[str] = []
@@ -1,10 +1,12 @@
-from groq import Groq
+from typing import AsyncIterator
 from app.core.config import settings
+from app.services import llm_client
 
-# initialize once
-client = Groq(api_key=settings.groq_api_key)
 MODEL  = settings.groq_model
 
+# bump whenever PROMPTS change so cached summaries are not reused
+PROMPT_VERSION = 2
+
 # simple prompt templates
 PROMPTS = {
     "concise":  "Summarize in 30-40% of the volume of the original text:\n\n{text}\n\nSummary:",
@@ -12,10 +14,33 @@ PROMPTS = {
     "detailed": "Provide a detailed summary of this text:\n\n{text}\n\nDetailed Summary:",
 }
 
-def summarize_text(text: str, mode: str) -> str:
-    prompt = PROMPTS.get(mode, PROMPTS["standard"]).format(text=text)
-    resp = client.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-    )
-    return resp.choices[0].message.content.strip()
+# map-reduce templates for documents that do not fit in one prompt
+CHUNK_PROMPT = (
+    "This is part {index} of {total} of a longer document. "
+    "Summarize the key points of this part, keeping names, numbers and definitions:"
+    "\n\n{text}\n\nSummary:"
+)
+REDUCE_PROMPT = (
+    "Combine these summaries of consecutive parts of one document into a single "
+    "coherent summary without repeating points:\n\n{text}\n\nCombined Summary:"
+)
+
+async def complete(prompt: str, mode: str = "other") -> str:
+    # rate limiting, retries and the backend choice live in llm_client;
+    # mode only labels metrics
+    return await llm_client.complete(prompt, mode)
+
+def stream_complete(prompt: str, mode: str = "other") -> AsyncIterator[str]:
+    """
+    Yields completion text pieces as the model produces them.
+    """
+    return llm_client.stream(prompt, mode)
+
+def mode_prompt(text: str, mode: str) -> str:
+    return PROMPTS.get(mode, PROMPTS["standard"]).format(text=text)
+
+async def summarize_text(text: str, mode: str) -> str:
+    return await complete(mode_prompt(text, mode), mode)
+
+def stream_summarize_text(text: str, mode: str) -> AsyncIterator[str]:
+    return stream_complete(mode_prompt(text, mode), mode)
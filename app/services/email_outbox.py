@@ -0,0 +1,97 @@
+# app/services/email_outbox.py
+
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.db import db
+
+# Outgoing mail is queued in `email_outbox` and delivered by the senders in
+# app/workers/email_worker.py, so request handlers never wait on SMTP.
+# Claiming works like the job queue: an atomic find_one_and_update plus a
+# lease that lets another sender retry the message if this one dies.
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# claims take the oldest deliverable message first
+CLAIM_SORT = [("created_at", 1)]
+
+
+async def queue_email(to_email: str, subject: str, body: str) -> dict:
+    now = datetime.utcnow()
+    rec = {
+        "to": to_email,
+        "subject": subject,
+        "body": body,
+        "status": QUEUED,
+        "attempts": 0,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    result = await db.email_outbox.insert_one(rec)
+    rec["_id"] = result.inserted_id
+    return rec
+
+
+def claim_filter(now: datetime) -> dict:
+    """Deliverable messages: queued and due, or stuck in sending with an expired lease."""
+    return {"$or": [
+        {"status": QUEUED, "run_after": {"$lte": now}},
+        {"status": SENDING, "lease_until": {"$lt": now}},
+    ]}
+
+
+async def claim_batch(sender_id: str, size: int) -> list[dict]:
+    """
+    Take up to `size` deliverable messages, oldest first.
+    """
+    batch = []
+    while len(batch) < size:
+        now = datetime.utcnow()
+        msg = await db.email_outbox.find_one_and_update(
+            claim_filter(now),
+            {
+                "$set": {
+                    "status": SENDING,
+                    "sender_id": sender_id,
+                    "lease_until": now + timedelta(seconds=settings.email_lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=CLAIM_SORT,
+            return_document=ReturnDocument.AFTER,
+        )
+        if msg is None:
+            break
+        batch.append(msg)
+    return batch
+
+
+async def mark_sent(msg: dict, sender_id: str) -> None:
+    now = datetime.utcnow()
+    await db.email_outbox.update_one(
+        {"_id": msg["_id"], "sender_id": sender_id},
+        {"$set": {"status": SENT, "sent_at": now, "error": None, "updated_at": now}},
+    )
+
+
+async def mark_failed(msg: dict, sender_id: str, error: str, retry: bool = True) -> None:
+    """
+    Requeue with exponential backoff, or give up once out of attempts (or
+    the server rejected the message permanently).
+    """
+    now = datetime.utcnow()
+    if retry and msg["attempts"] < settings.email_max_attempts:
+        update = {
+            "status": QUEUED,
+            "run_after": now + timedelta(seconds=2 ** msg["attempts"]),
+        }
+    else:
+        update = {"status": FAILED, "failed_at": now}
+    update.update({"error": error, "updated_at": now})
+    await db.email_outbox.update_one({"_id": msg["_id"], "sender_id": sender_id}, {"$set": update})
@@ -0,0 +1,205 @@
+# app/services/extraction_service.py
+
+import asyncio
+import contextvars
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.metrics import EXTRACTION_BYTES, EXTRACTION_SECONDS
+from app.utils.file_utils import (
+    extract_pages, extract_pdf_range, extract_range, page_count, pdf_page_count, read_outline,
+)
+
+log = logging.getLogger(__name__)
+
+# PyMuPDF / python-docx / python-pptx parsing runs in a pool of worker
+# processes: it never blocks the event loop, scales with cores, and a
+# malformed file that hangs or eats memory only takes down a worker.
+
+_pool: ProcessPoolExecutor | None = None
+# parse tasks submitted and not finished yet (queue depth gauge)
+_in_flight = 0
+# parse tasks running per pool; a pool retired after a timeout is killed
+# once the last of them is done
+_pool_tasks: dict[ProcessPoolExecutor, int] = {}
+_retired: set[ProcessPoolExecutor] = set()
+# pools used by the current extraction call (see _with_retry)
+_call_pools: contextvars.ContextVar[set | None] = contextvars.ContextVar("_call_pools", default=None)
+
+
+class ExtractionError(Exception):
+    """The document could not be parsed (corrupt, or over the time/memory budget)."""
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    # cap the address space so a runaway parse fails with MemoryError
+    # instead of pushing the host into swap
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.extraction_workers or os.cpu_count() or 1,
+            # never fork the API process (event loop, Motor threads)
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.extraction_memory_limit_mb,),
+        )
+    return _pool
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    _retired.discard(pool)
+    _pool_tasks.pop(pool, None)
+    for proc in list(getattr(pool, "_processes", {}).values()):
+        proc.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _retire_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Send no more work to `pool`, whose worker is stuck on a parse that
+    timed out. It is killed once the parses of other requests still running
+    in it finish. Killing it right away would fail them all with
+    BrokenProcessPool.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    if _pool_tasks.get(pool):
+        _retired.add(pool)
+    else:
+        _kill_pool(pool)
+
+
+def _drop_broken_pool() -> None:
+    # several requests see the same crash; only the first replaces the pool
+    global _pool
+    if _pool is not None and getattr(_pool, "_broken", False):
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def shutdown_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+    for retired in list(_retired):
+        _kill_pool(retired)
+
+
+def tasks_in_flight() -> int:
+    return _in_flight
+
+
+async def _run(fn, *args):
+    global _in_flight
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    used = _call_pools.get()
+    if used is not None:
+        used.add(pool)
+    _in_flight += 1
+    _pool_tasks[pool] = _pool_tasks.get(pool, 0) + 1
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    finally:
+        _in_flight -= 1
+        _pool_tasks[pool] -= 1
+        if not _pool_tasks[pool]:
+            if pool in _retired:
+                _kill_pool(pool)
+            elif pool is not _pool:
+                _pool_tasks.pop(pool, None)
+
+
+async def _extract(path: Path) -> list[str]:
+    if path.suffix.lower() != ".pdf":
+        return await _run(extract_pages, path)
+
+    # split big PDFs into page ranges parsed in parallel
+    step = settings.extraction_pages_per_task
+    count = await _run(pdf_page_count, path)
+    ranges = await asyncio.gather(*(
+        _run(extract_pdf_range, path, start, start + step)
+        for start in range(0, count, step)
+    ))
+    return [page for r in ranges for page in r]
+
+
+async def extract_document(path: Path) -> list[str]:
+    """
+    Text of the file at `path`, one entry per page/slide (see extract_pages),
+    parsed in the worker pool within extraction_timeout_seconds.
+    Raises ExtractionError on timeout or worker crash.
+    """
+    ext = path.suffix.lower()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        pages = await _with_retry(path, lambda: _extract(path))
+        outcome = "ok"
+        return pages
+    finally:
+        EXTRACTION_SECONDS.labels(ext, outcome).observe(time.perf_counter() - start)
+        EXTRACTION_BYTES.labels(ext).inc(path.stat().st_size if path.exists() else 0)
+
+
+async def extract_page_range(path: Path, start: int, stop: int) -> list[str]:
+    """
+    Text of pages / slides [start, stop) of a PDF or PPTX, parsing only
+    those. Same limits and errors as extract_document.
+    """
+    return await _with_retry(path, lambda: _run(extract_range, path, start, stop))
+
+
+async def count_pages(path: Path) -> int:
+    """Pages / slides of a PDF or PPTX, without parsing their content."""
+    return await _with_retry(path, lambda: _run(page_count, path))
+
+
+async def extract_outline(path: Path) -> list[dict]:
+    """Named sections of a PDF or PPTX (see read_outline)."""
+    return await _with_retry(path, lambda: _run(read_outline, path))
+
+
+async def _with_retry(path: Path, work):
+    # `work` starts the pool call; it is called again for the retry
+    for attempt in range(2):
+        used = set()
+        token = _call_pools.set(used)
+        try:
+            return await asyncio.wait_for(work(), settings.extraction_timeout_seconds)
+        except asyncio.TimeoutError:
+            log.warning("extraction of %s timed out, replacing its pool", path)
+            for pool in used:
+                _retire_pool(pool)
+            raise ExtractionError("Document took too long to parse")
+        except MemoryError:
+            raise ExtractionError("Document needs too much memory to parse")
+        except BrokenProcessPool:
+            # a worker died (ours or another request's); start fresh and retry once
+            _drop_broken_pool()
+            if attempt:
+                raise ExtractionError("Document parser crashed")
+        except Exception as e:
+            # the parser rejected the file (corrupt, encrypted, wrong type)
+            raise ExtractionError("Document could not be parsed") from e
+        finally:
+            _call_pools.reset(token)
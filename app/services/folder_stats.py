@@ -0,0 +1,136 @@
+# app/services/folder_stats.py
+#
+# Every folder carries `summary_count` (summaries assigned to it) and
+# `updated_at` (when a summary last entered or left it), so listing folders
+# never reads `summaries`. Each write that moves, adds or deletes a summary
+# is followed by an atomic $inc here. The two writes are not one
+# transaction: a crash in between, or folders from before these fields,
+# leave counts off until the reconcile job recounts them:
+#
+#   python -m app.services.folder_stats --reconcile [--user EMAIL] [--settle SECONDS]
+
+import argparse
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.db import db
+
+log = logging.getLogger(__name__)
+
+# how long reconcile waits between counting and writing for the $inc of
+# a summary write it may have counted already; far longer than the gap
+# between a write and its adjust_counts
+SETTLE_SECONDS = 2.0
+
+
+def moved(old: ObjectId | None, new: ObjectId | None) -> Counter:
+    """Count changes for one summary moving from folder `old` to `new`."""
+    if old == new:
+        return Counter()
+    return Counter({old: -1, new: 1})
+
+
+async def adjust_counts(user_email: str, changes: Counter) -> None:
+    """
+    Apply per-folder count changes ({folder_id: delta}; None = no folder)
+    in one write. Folders this user does not own are left alone.
+    """
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"_id": fid, "user_email": user_email},
+            {"$inc": {"summary_count": delta}, "$set": {"updated_at": now}},
+        )
+        for fid, delta in changes.items()
+        if fid is not None and delta
+    ]
+    if ops:
+        await db.folders.bulk_write(ops, ordered=False)
+
+
+async def count_by_folder(query: dict) -> dict[ObjectId, dict]:
+    """
+    Summaries matching `query` per folder: {folder_id: {"count", "latest"}},
+    latest being the newest created_at.
+    """
+    pipeline = [
+        {"$match": {"folder_id": {"$ne": None}, **query}},
+        {"$group": {"_id": "$folder_id", "count": {"$sum": 1}, "latest": {"$max": "$created_at"}}},
+    ]
+    return {row["_id"]: row async for row in db.summaries.aggregate(pipeline)}
+
+
+async def _reconcile_batch(folders: list[dict], settle_seconds: float) -> int:
+    # Counted after the folders were read, and written only if the folder
+    # is unchanged since (adjust_counts always moves updated_at). The count
+    # can include a summary written just now whose $inc is still on its
+    # way; waiting before the write lets that $inc land and fail the guard,
+    # rather than land after a count that already has it.
+    counts = await count_by_folder({"folder_id": {"$in": [f["_id"] for f in folders]}})
+    ops = []
+    for f in folders:
+        actual = counts.get(f["_id"], {})
+        update = {}
+        if f.get("summary_count") != actual.get("count", 0):
+            update["summary_count"] = actual.get("count", 0)
+        if "updated_at" not in f:
+            update["updated_at"] = max(actual.get("latest") or f["created_at"], f["created_at"])
+        if update:
+            log.info("folder %s: %s", f["_id"], update)
+            ops.append(UpdateOne(
+                {"_id": f["_id"], "summary_count": f.get("summary_count"), "updated_at": f.get("updated_at")},
+                {"$set": update},
+            ))
+    if not ops:
+        return 0
+    await asyncio.sleep(settle_seconds)
+    return (await db.folders.bulk_write(ops, ordered=False)).modified_count
+
+
+async def reconcile(
+    user_email: str | None = None,
+    batch_size: int = 500,
+    settle_seconds: float = SETTLE_SECONDS,
+) -> int:
+    """
+    Recount the summaries of every folder (of one user, or everyone's) and
+    fix the folders whose stored count is wrong or missing. A folder a
+    summary enters or leaves meanwhile is left for the next run. Returns
+    the number of folders fixed.
+    """
+    query = {"user_email": user_email} if user_email else {}
+    fixed = 0
+    batch = []
+    async for f in db.folders.find(query, {"summary_count": 1, "updated_at": 1, "created_at": 1}):
+        batch.append(f)
+        if len(batch) >= batch_size:
+            fixed += await _reconcile_batch(batch, settle_seconds)
+            batch = []
+    if batch:
+        fixed += await _reconcile_batch(batch, settle_seconds)
+    return fixed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Folder summary counters.")
+    parser.add_argument("--reconcile", action="store_true", help="recount summaries per folder")
+    parser.add_argument("--user", help="only this user's folders")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="seconds to wait for in-flight count updates before writing")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        if args.reconcile:
+            print(f"{await reconcile(args.user, settle_seconds=args.settle)} folders fixed")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
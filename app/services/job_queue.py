@@ -0,0 +1,129 @@
+# app/services/job_queue.py
+
+from bson import ObjectId
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.db import db
+
+# Jobs live in the `jobs` collection. A worker claims one atomically with
+# find_one_and_update and holds a lease on it; if the worker dies the lease
+# runs out and another worker picks the job up again.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+KIND_SUMMARIZE = "summarize"
+
+# claims take the oldest runnable job first
+CLAIM_SORT = [("created_at", 1)]
+
+
+async def enqueue_summarize(
+    user_email: str,
+    doc_id: ObjectId,
+    mode: str,
+    folder_id: ObjectId | None = None,
+    selection=None,
+) -> dict:
+    """
+    Queue a summary of a document, or of the pages in `selection`
+    (a summary_service.PageSelection).
+    """
+    now = datetime.utcnow()
+    rec = {
+        "kind": KIND_SUMMARIZE,
+        "user_email": user_email,
+        "doc_id": doc_id,
+        "mode": mode,
+        "folder_id": folder_id,
+        "selection": selection._asdict() if selection else None,
+        "status": QUEUED,
+        "attempts": 0,
+        "run_after": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    result = await db.jobs.insert_one(rec)
+    rec["_id"] = result.inserted_id
+    return rec
+
+
+async def get_job(job_id: ObjectId, user_email: str) -> dict | None:
+    return await db.jobs.find_one({"_id": job_id, "user_email": user_email})
+
+
+def claim_filter(now: datetime) -> dict:
+    """Runnable jobs: queued and due, or running with an expired lease."""
+    return {"$or": [
+        {"status": QUEUED, "run_after": {"$lte": now}},
+        {"status": RUNNING, "lease_until": {"$lt": now}},
+    ]}
+
+
+async def claim_job(worker_id: str) -> dict | None:
+    """
+    Atomically take the oldest runnable job. Returns None when the queue
+    is empty.
+    """
+    now = datetime.utcnow()
+    return await db.jobs.find_one_and_update(
+        claim_filter(now),
+        {
+            "$set": {
+                "status": RUNNING,
+                "worker_id": worker_id,
+                "lease_until": now + timedelta(seconds=settings.job_lease_seconds),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=CLAIM_SORT,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def renew_lease(job_id: ObjectId, worker_id: str) -> bool:
+    now = datetime.utcnow()
+    res = await db.jobs.update_one(
+        {"_id": job_id, "worker_id": worker_id, "status": RUNNING},
+        {"$set": {
+            "lease_until": now + timedelta(seconds=settings.job_lease_seconds),
+            "updated_at": now,
+        }},
+    )
+    # matched, not modified: a renewal within the same millisecond as the
+    # claim changes nothing but the job is still ours
+    return res.matched_count == 1
+
+
+async def complete_job(job_id: ObjectId, worker_id: str, summary_id: ObjectId) -> None:
+    await db.jobs.update_one(
+        {"_id": job_id, "worker_id": worker_id},
+        {"$set": {
+            "status": DONE,
+            "summary_id": summary_id,
+            "error": None,
+            "updated_at": datetime.utcnow(),
+        }},
+    )
+
+
+async def fail_job(job: dict, worker_id: str, error: str, retry: bool = True) -> None:
+    """
+    Requeue the job with exponential backoff, or mark it failed once it
+    is out of attempts (or the error is not worth retrying).
+    """
+    now = datetime.utcnow()
+    if retry and job["attempts"] < settings.job_max_attempts:
+        update = {
+            "status": QUEUED,
+            "run_after": now + timedelta(seconds=2 ** job["attempts"]),
+        }
+    else:
+        update = {"status": FAILED}
+    update.update({"error": error, "updated_at": now})
+    await db.jobs.update_one({"_id": job["_id"], "worker_id": worker_id}, {"$set": update})
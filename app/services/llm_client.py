@@ -0,0 +1,322 @@
+# app/services/llm_client.py
+#
+# Async access to the LLM. One backend instance per process holds a pooled
+# HTTP client; every call goes through a concurrency cap and token buckets
+# sized to the provider quota (requests/min and tokens/min), and retries
+# rate limits and transient errors with jittered backoff, honouring
+# retry-after when the provider sends it.
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+import weakref
+from typing import AsyncIterator, NamedTuple, Protocol
+
+import groq
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import LLM_COMPLETION_TOKENS, LLM_ERRORS, LLM_PROMPT_TOKENS, LLM_SECONDS
+
+log = logging.getLogger(__name__)
+
+# Rough token estimate; close enough for Llama-family tokenizers on prose
+# and keeps us free of a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class RetryableLLMError(Exception):
+    """Rate limit or transient upstream failure; worth another attempt."""
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Completion(NamedTuple):
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class LLMBackend(Protocol):
+    async def complete(self, prompt: str) -> Completion: ...
+    def stream(self, prompt: str) -> AsyncIterator[str]: ...
+    async def aclose(self) -> None: ...
+
+
+def _retry_after(e: groq.APIStatusError) -> float | None:
+    try:
+        return float(e.response.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+class GroqBackend:
+    """
+    Groq (or any OpenAI-compatible server at settings.groq_base_url, e.g.
+    a local fake for tests) over one pooled httpx client.
+    """
+    def __init__(self):
+        self.client = groq.AsyncGroq(
+            api_key=settings.groq_api_key,
+            base_url=settings.groq_base_url or None,
+            timeout=settings.llm_timeout_seconds,
+            # retries are ours, so they share the rate limiter
+            max_retries=0,
+            http_client=groq.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_concurrency,
+                    max_keepalive_connections=settings.llm_max_concurrency,
+                ),
+            ),
+        )
+
+    def _translate(self, e: Exception) -> Exception:
+        if isinstance(e, groq.RateLimitError) or (
+            isinstance(e, groq.APIStatusError) and e.status_code >= 500
+        ):
+            return RetryableLLMError(str(e), _retry_after(e))
+        if isinstance(e, groq.APIConnectionError):  # includes timeouts
+            return RetryableLLMError(str(e))
+        return e
+
+    async def complete(self, prompt: str) -> Completion:
+        try:
+            resp = await self.client.chat.completions.create(
+                model=settings.groq_model,
+                messages=[{"role": "user", "content": prompt}],
+            )
+        except groq.GroqError as e:
+            raise self._translate(e) from e
+        text = resp.choices[0].message.content.strip()
+        if resp.usage is None:
+            return Completion(text, estimate_tokens(prompt), estimate_tokens(text))
+        return Completion(text, resp.usage.prompt_tokens, resp.usage.completion_tokens)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        try:
+            stream = await self.client.chat.completions.create(
+                model=settings.groq_model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+            )
+        except groq.GroqError as e:
+            raise self._translate(e) from e
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            # release the HTTP connection if the consumer stops early
+            await stream.close()
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class FakeBackend:
+    """
+    Deterministic stand-in for the LLM (LLM_BACKEND=fake): echoes the first
+    quarter of the prompt after settings.fake_llm_latency_ms.
+    """
+    def _answer(self, prompt: str) -> str:
+        words = prompt.split()
+        return " ".join(words[: max(1, len(words) // 4)])
+
+    async def complete(self, prompt: str) -> Completion:
+        await asyncio.sleep(settings.fake_llm_latency_ms / 1000)
+        text = self._answer(prompt)
+        return Completion(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(settings.fake_llm_latency_ms / 1000)
+        for word in self._answer(prompt).split(" "):
+            yield word + " "
+
+    async def aclose(self) -> None:
+        pass
+
+
+class TokenBucket:
+    """
+    Allows `per_minute` units a minute, refilled continuously, with bursts
+    up to one minute's worth. Waiters are served in arrival order. A rate
+    of 0 disables the limit.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        if self.capacity <= 0:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class _Limits:
+    """The concurrency cap and quota buckets of one event loop."""
+    def __init__(self):
+        self.requests = TokenBucket(settings.llm_requests_per_minute)
+        self.tokens = TokenBucket(settings.llm_tokens_per_minute)
+        self.slots = asyncio.Semaphore(settings.llm_max_concurrency)
+
+
+_backend: LLMBackend | None = None
+# asyncio locks belong to the loop that first waits on them, so each loop
+# (the app's, a worker's asyncio.run, a test's) gets its own set, made on
+# first use rather than at import
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Limits]" = weakref.WeakKeyDictionary()
+_in_flight = 0
+
+
+def _loop_limits() -> _Limits:
+    loop = asyncio.get_running_loop()
+    limits = _limits.get(loop)
+    if limits is None:
+        limits = _limits[loop] = _Limits()
+    return limits
+
+
+def calls_in_flight() -> int:
+    return _in_flight
+
+
+def affordable_concurrency(prompt_tokens: int, limit: int) -> int:
+    """
+    How many calls of `prompt_tokens` the tokens/min quota lets start at
+    once, at most `limit` and at least 1. Fanning out wider than that only
+    queues the extra calls on the token bucket, ahead of every other
+    caller's.
+    """
+    budget = settings.llm_tokens_per_minute
+    if settings.llm_backend == "fake" or budget <= 0:
+        return limit
+    per_call = prompt_tokens + settings.llm_reserved_output_tokens
+    return max(1, min(limit, budget // per_call))
+
+
+def model_name() -> str:
+    """The model answering calls; cached LLM output is keyed by it."""
+    return "fake" if settings.llm_backend == "fake" else settings.groq_model
+
+
+def get_backend() -> LLMBackend:
+    global _backend
+    if _backend is None:
+        _backend = FakeBackend() if settings.llm_backend == "fake" else GroqBackend()
+    return _backend
+
+
+async def close_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.aclose()
+        _backend = None
+
+
+async def _admit(prompt: str) -> None:
+    # the quota is the provider's; the in-process fake has none
+    if settings.llm_backend == "fake":
+        return
+    # completion length is unknown up front; reserve a typical answer
+    limits = _loop_limits()
+    await limits.requests.acquire()
+    await limits.tokens.acquire(estimate_tokens(prompt) + settings.llm_reserved_output_tokens)
+
+
+def _backoff(attempt: int, retry_after: float | None) -> float:
+    delay = retry_after if retry_after is not None else min(2 ** attempt, 30)
+    # jitter, so callers limited together do not retry together
+    return delay + random.uniform(0, delay / 2)
+
+
+@contextlib.asynccontextmanager
+async def _call(mode: str):
+    # holds a concurrency slot and records latency / errors of one attempt
+    global _in_flight
+    async with _loop_limits().slots:
+        _in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            # the provider's exception (RateLimitError, APITimeoutError, ...)
+            LLM_ERRORS.labels(model_name(), mode, type(e.__cause__ or e).__name__).inc()
+            raise
+        else:
+            LLM_SECONDS.labels(model_name(), mode).observe(time.perf_counter() - start)
+        finally:
+            _in_flight -= 1
+
+
+def _count_tokens(mode: str, prompt_tokens: int, completion_tokens: int) -> None:
+    LLM_PROMPT_TOKENS.labels(model_name(), mode).inc(prompt_tokens)
+    LLM_COMPLETION_TOKENS.labels(model_name(), mode).inc(completion_tokens)
+
+
+async def complete(prompt: str, mode: str = "other") -> str:
+    """
+    Completion text for `prompt`; `mode` labels the call in metrics.
+    """
+    attempts = settings.llm_max_retries + 1
+    for attempt in range(attempts):
+        await _admit(prompt)
+        try:
+            async with _call(mode):
+                result = await get_backend().complete(prompt)
+            _count_tokens(mode, result.prompt_tokens, result.completion_tokens)
+            return result.text
+        except RetryableLLMError as e:
+            if attempt == attempts - 1:
+                raise
+            delay = _backoff(attempt, e.retry_after)
+            log.warning("LLM call failed (%s), retrying in %.1fs", e, delay)
+            await asyncio.sleep(delay)
+
+
+async def stream(prompt: str, mode: str = "other") -> AsyncIterator[str]:
+    """
+    Completion text pieces as the model produces them. Failures before the
+    first piece are retried like complete(); later ones are raised.
+    Token counts of streamed calls are estimates.
+    """
+    attempts = settings.llm_max_retries + 1
+    for attempt in range(attempts):
+        await _admit(prompt)
+        started = False
+        chars = 0
+        try:
+            async with _call(mode), contextlib.aclosing(get_backend().stream(prompt)) as pieces:
+                async for piece in pieces:
+                    started = True
+                    chars += len(piece)
+                    yield piece
+            _count_tokens(mode, estimate_tokens(prompt), chars // CHARS_PER_TOKEN)
+            return
+        except RetryableLLMError as e:
+            if started or attempt == attempts - 1:
+                raise
+            delay = _backoff(attempt, e.retry_after)
+            log.warning("LLM stream failed (%s), retrying in %.1fs", e, delay)
+            await asyncio.sleep(delay)
@@ -0,0 +1,32 @@
+# app/services/registration_service.py
+
+from datetime import datetime, timedelta
+from app.core.db import db
+
+# Registrations waiting for their email code live in `pending_registrations`
+# (one per email, TTL index on expires_at), so /auth/verify works no matter
+# which worker or instance handled /auth/register.
+
+CODE_EXPIRY_MINUTES = 30
+
+async def store_pending_registration(email: str, code: str, hashed_password: str) -> None:
+    """
+    Save (or replace, on a repeated register) the pending registration.
+    """
+    await db.pending_registrations.replace_one(
+        {"_id": email},
+        {
+            "code": code,
+            "hashed_password": hashed_password,
+            "expires_at": datetime.utcnow() + timedelta(minutes=CODE_EXPIRY_MINUTES),
+        },
+        upsert=True,
+    )
+
+async def consume_pending_registration(email: str, code: str) -> dict | None:
+    """
+    Atomically take the pending registration if the code matches, so two
+    verify calls cannot both create the user. The caller still checks
+    expires_at: the TTL monitor only runs about once a minute.
+    """
+    return await db.pending_registrations.find_one_and_delete({"_id": email, "code": code})
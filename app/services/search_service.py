@@ -0,0 +1,214 @@
+# app/services/search_service.py
+#
+# Full-text search over a user's documents (extracted text), summaries and
+# notes. Every searchable item has one entry in `search_entries` with the
+# same _id as the document or summary it mirrors, covered by a text index
+# that starts with user_email, so a query only reads that user's postings.
+# Entries are written next to the records they mirror; to rebuild them all
+# (e.g. for data uploaded before search existed):
+#
+#   python -m app.services.search_service --reindex
+
+import argparse
+import asyncio
+import logging
+import re
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.core.db import db
+from app.services.text_service import load_text
+from app.services.text_store import load_texts
+from app.utils.file_utils import PAGE_BREAK
+
+log = logging.getLogger(__name__)
+
+DOCUMENT = "document"
+SUMMARY = "summary"
+
+SNIPPET_CHARS = 160
+# snippets are cut from the first SNIPPET_SOURCE_CHARS characters, kept on
+# each entry as `head`, so a page of hits never reads the indexed `text`;
+# a match further in gets a snippet from the start, without highlights
+SNIPPET_SOURCE_CHARS = 1000
+_WORD = re.compile(r"\w+")
+# excluded terms and phrases ("-word", '-"some phrase"') are not highlighted
+_NEGATED = re.compile(r'(?:^|\s)-(?:"[^"]*"|\S+)')
+
+_SEARCH_PROJECTION = {
+    "score": {"$meta": "textScore"},
+    "kind": 1, "doc_id": 1, "filename": 1, "note": 1, "created_at": 1,
+    # entries written before `head` existed: cut server-side
+    "head": {"$ifNull": ["$head", {"$substrCP": ["$text", 0, SNIPPET_SOURCE_CHARS]}]},
+}
+
+
+def _cap(text: str) -> str:
+    # very long documents are indexed by their first search_max_chars
+    # characters, which keeps entries small
+    return text.replace(PAGE_BREAK, "\n")[: settings.search_max_chars]
+
+
+def _text_fields(text: str) -> dict:
+    text = _cap(text)
+    return {"text": text, "head": text[:SNIPPET_SOURCE_CHARS]}
+
+
+def document_entry(doc: dict, text: str) -> dict:
+    return {
+        "_id": doc["_id"],
+        "user_email": doc["user_email"],
+        "kind": DOCUMENT,
+        "doc_id": doc["_id"],
+        "filename": doc["filename"],
+        **_text_fields(text),
+        "created_at": doc.get("upload_date") or datetime.utcnow(),
+    }
+
+
+def summary_entry(rec: dict) -> dict:
+    return {
+        "_id": rec["_id"],
+        "user_email": rec["user_email"],
+        "kind": SUMMARY,
+        "doc_id": rec["doc_id"],
+        "filename": rec["filename"],
+        **_text_fields(rec["summary"]),
+        "note": rec.get("note"),
+        "created_at": rec["created_at"],
+    }
+
+
+async def _write(ops: list) -> None:
+    # the records themselves are the source of truth: a failed index write
+    # is logged (and repaired by --reindex) instead of failing the request
+    if not ops:
+        return
+    try:
+        await db.search_entries.bulk_write(ops, ordered=False)
+    except PyMongoError as e:
+        log.warning("search index write failed: %s", e)
+
+
+async def index_document(doc: dict, text: str | None = None) -> None:
+    """
+    Index an uploaded document; its text comes from the text cache unless
+    given.
+    """
+    if text is None:
+        text = await load_text(doc["sha256"]) or ""
+    await _write([ReplaceOne({"_id": doc["_id"]}, document_entry(doc, text), upsert=True)])
+
+
+async def index_summaries(recs: list[dict]) -> None:
+    await _write([InsertOne(summary_entry(rec)) for rec in recs])
+
+
+async def set_note(summary_id: ObjectId, note: str | None) -> None:
+    await _write([UpdateOne({"_id": summary_id}, {"$set": {"note": note}})])
+
+
+async def remove_entries(ids: list[ObjectId]) -> None:
+    await _write([DeleteMany({"_id": {"$in": ids}})] if ids else [])
+
+
+async def remove_document(doc_id: ObjectId, user_email: str, with_summaries: bool) -> None:
+    ops = [DeleteOne({"_id": doc_id})]
+    if with_summaries:
+        ops.append(DeleteMany({"doc_id": doc_id, "user_email": user_email, "kind": SUMMARY}))
+    await _write(ops)
+
+
+def query_terms(q: str) -> list[str]:
+    return list(dict.fromkeys(w.lower() for w in _WORD.findall(_NEGATED.sub(" ", q))))
+
+
+def highlight(text: str, terms: list[str]) -> tuple[str, list[tuple[int, int]]]:
+    """
+    A window of `text` around the first matching term, and the (start, end)
+    offsets of every term match inside it.
+    """
+    if not terms:
+        return text[:SNIPPET_CHARS], []
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\b", re.IGNORECASE)
+    first = pattern.search(text)
+    start = 0
+    if first and first.start() > SNIPPET_CHARS // 3:
+        start = first.start() - SNIPPET_CHARS // 3
+        # begin on a word boundary
+        space = text.find(" ", start, first.start())
+        if space != -1:
+            start = space + 1
+    snippet = text[start:start + SNIPPET_CHARS]
+    return snippet, [(m.start(), m.end()) for m in pattern.finditer(snippet)]
+
+
+async def search(user_email: str, q: str, limit: int, offset: int = 0) -> tuple[list[dict], bool]:
+    """
+    One page of the user's entries matching `q` (MongoDB $text syntax:
+    words, "phrases", -excluded), best match first. Each hit gains
+    `snippet` and `highlights`. Returns (hits, more_pages).
+    """
+    rows = await (
+        db.search_entries.find(
+            {"user_email": user_email, "$text": {"$search": q}},
+            _SEARCH_PROJECTION,
+        )
+        .sort([("score", {"$meta": "textScore"}), ("_id", -1)])
+        .skip(offset)
+        .limit(limit + 1)
+        .to_list(length=None)
+    )
+    more = len(rows) > limit
+    terms = query_terms(q)
+    hits = []
+    for row in rows[:limit]:
+        # prefer the note when the match is in it
+        source = row["head"]
+        if row.get("note") and highlight(row["note"], terms)[1]:
+            source = row["note"]
+        row["snippet"], row["highlights"] = highlight(source, terms)
+        hits.append(row)
+    return hits, more
+
+
+async def reindex() -> int:
+    """
+    Rebuild every entry from `documents` and `summaries`, dropping entries
+    whose record is gone. Returns the number of entries written.
+    """
+    written = 0
+    emails = set(await db.documents.distinct("user_email")) | set(await db.summaries.distinct("user_email"))
+    for email in emails:
+        seen = []
+        async for doc in db.documents.find({"user_email": email, "sha256": {"$exists": True}}):
+            text = await load_text(doc["sha256"]) or ""
+            await _write([ReplaceOne({"_id": doc["_id"]}, document_entry(doc, text), upsert=True)])
+            seen.append(doc["_id"])
+        ops = []
+        recs = await db.summaries.find({"user_email": email}).to_list(None)
+        for rec in await load_texts(recs, "summary"):
+            ops.append(ReplaceOne({"_id": rec["_id"]}, summary_entry(rec), upsert=True))
+            seen.append(rec["_id"])
+        await _write(ops)
+        await _write([DeleteMany({"user_email": email, "_id": {"$nin": seen}})])
+        written += len(seen)
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the search index.")
+    parser.add_argument("--reindex", action="store_true",
+                        help="rebuild search entries for every document and summary")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.reindex:
+        print(f"{asyncio.run(reindex())} entries indexed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# app/services/similarity_service.py
+#
+# Near-duplicate documents (re-exports, a deck with one slide added) via
+# MinHash over word 5-grams plus LSH. Each document stores its signature
+# (`minhash`) and band keys (`lsh_bands`); an indexed $in on the band keys
+# finds candidates, which are then checked against the full signature.
+# Documents uploaded before signatures existed can be backfilled with:
+#
+#   python -m app.services.similarity_service --backfill
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import re
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.db import db
+from app.services.summary_cache import get_cached_summary
+from app.services.text_service import load_text
+
+log = logging.getLogger(__name__)
+
+NUM_HASHES = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity almost always share a band
+LSH_BANDS = 16
+SHINGLE_WORDS = 5
+MAX_CANDIDATES = 50
+
+_WORD = re.compile(r"\w+")
+_MASK = (1 << 63) - 1  # keeps values inside a BSON int64
+_BIN_SPAN = (_MASK + 1) // NUM_HASHES
+
+
+def _hash(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") & _MASK
+
+
+def minhash(text: str) -> list[int]:
+    """
+    One-permutation MinHash: every shingle is hashed once, the hash picks
+    one of NUM_HASHES bins and each bin keeps its minimum. Empty bins
+    borrow from the next filled bin (rotation densification). Returns []
+    for text without words.
+    """
+    words = _WORD.findall(text.lower())
+    if not words:
+        return []
+    n = max(1, len(words) - SHINGLE_WORDS + 1)
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(n)}
+
+    bins: list[int | None] = [None] * NUM_HASHES
+    for shingle in shingles:
+        h = _hash(shingle)
+        b, v = h % NUM_HASHES, h // NUM_HASHES
+        if bins[b] is None or v < bins[b]:
+            bins[b] = v
+
+    filled = [v for v in bins if v is not None]
+    if len(filled) < NUM_HASHES:
+        for i in range(NUM_HASHES):
+            if bins[i] is not None:
+                continue
+            step = 1
+            while bins[(i + step) % NUM_HASHES] is None:
+                step += 1
+            # the offset keeps borrowed values apart from real ones
+            bins[i] = bins[(i + step) % NUM_HASHES] % _BIN_SPAN + step * _BIN_SPAN
+    return bins
+
+
+def lsh_bands(sig: list[int]) -> list[str]:
+    if not sig:
+        return []
+    rows = NUM_HASHES // LSH_BANDS
+    return [
+        f"{i}:{_hash(','.join(map(str, sig[i * rows:(i + 1) * rows]))):x}"
+        for i in range(LSH_BANDS)
+    ]
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """
+    Estimated Jaccard similarity of the two documents' shingle sets.
+    """
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+async def signature(text: str) -> list[int]:
+    return await run_in_threadpool(minhash, text)
+
+
+async def find_near_duplicates(
+    sig: list[int],
+    exclude_sha256: str,
+    threshold: float,
+    user_email: str | None = None,
+) -> list[tuple[float, dict]]:
+    """
+    Documents whose estimated similarity to `sig` is at least `threshold`,
+    most similar first, one per distinct file. Limited to one user's
+    documents unless user_email is None.
+    """
+    bands = lsh_bands(sig)
+    if not bands:
+        return []
+    query = {"lsh_bands": {"$in": bands}, "sha256": {"$ne": exclude_sha256}}
+    if user_email:
+        query["user_email"] = user_email
+    candidates = db.documents.find(
+        query, {"filename": 1, "sha256": 1, "minhash": 1}
+    ).limit(MAX_CANDIDATES)
+
+    best: dict[str, tuple[float, dict]] = {}
+    async for cand in candidates:
+        score = similarity(sig, cand.get("minhash") or [])
+        if score >= threshold and score > best.get(cand["sha256"], (0.0,))[0]:
+            best[cand["sha256"]] = (score, cand)
+    return sorted(best.values(), key=lambda item: item[0], reverse=True)
+
+
+async def near_duplicate_summary(doc: dict, mode: str) -> str | None:
+    """
+    A cached summary, in this mode, of a document near-identical to `doc`
+    (settings.near_duplicate_reuse_*), or None. Never calls the LLM.
+    """
+    scope = settings.near_duplicate_reuse_scope
+    if scope == "off" or not doc.get("minhash"):
+        return None
+    matches = await find_near_duplicates(
+        doc["minhash"],
+        doc["sha256"],
+        settings.near_duplicate_reuse_threshold,
+        user_email=doc["user_email"] if scope == "user" else None,
+    )
+    for score, cand in matches:
+        summary = await get_cached_summary(cand["sha256"], mode)
+        if summary is not None:
+            log.info("reusing %s summary of %s for %s (similarity %.2f)",
+                     mode, cand["_id"], doc["_id"], score)
+            return summary
+    return None
+
+
+async def backfill() -> int:
+    """
+    Compute signatures for documents that have a cached text but no
+    signature. Returns the number of documents updated.
+    """
+    updated = 0
+    query = {"minhash": {"$exists": False}, "sha256": {"$exists": True}}
+    async for doc in db.documents.find(query, {"sha256": 1}):
+        text = await load_text(doc["sha256"])
+        if text is None:
+            continue
+        sig = await signature(text)
+        await db.documents.update_one(
+            {"_id": doc["_id"]},
+            {"$set": {"minhash": sig, "lsh_bands": lsh_bands(sig)}},
+        )
+        updated += 1
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Near-duplicate signatures.")
+    parser.add_argument("--backfill", action="store_true",
+                        help="compute signatures for documents uploaded without one")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.backfill:
+        print(f"{asyncio.run(backfill())} documents updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# app/services/storage.py
+#
+# Where document downloads are served from. Uploads are always written to
+# uploads/ first, since extraction reads them there. With
+# STORAGE_BACKEND=s3 each stored file is also copied to an S3-compatible
+# bucket (AWS, MinIO, ...). Downloads then redirect to a presigned URL, so
+# the bytes never pass through the app. Files uploaded before the bucket
+# was configured can be copied with:
+#
+#   STORAGE_BACKEND=s3 python -m app.services.storage --sync
+#
+# With settings.dedupe_uploads, documents with the same bytes share one
+# stored file. The `files` collection counts the documents using each file
+# (keyed by its path). An upload takes a reference with an atomic $inc,
+# which only succeeds while the count is above 0. The file is removed only
+# by the release that brings the count to 0, and it can no longer be
+# claimed after that.
+
+import argparse
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.db import db
+from app.core.user_cache import TTLCache
+from app.utils.file_utils import MEDIA_TYPES, content_disposition
+
+log = logging.getLogger(__name__)
+
+
+class LocalStorage:
+    """Files stay in uploads/ and the app (or nginx) sends them."""
+
+    async def put(self, path: Path, media_type: str) -> str | None:
+        return None
+
+    async def delete(self, key: str) -> None:
+        pass
+
+
+class RemoteStorage(ABC):
+    """
+    A bucket holding a copy of every stored file; downloads of copied
+    files redirect to it.
+    """
+
+    @abstractmethod
+    async def put(self, path: Path, media_type: str) -> str | None:
+        """Copy a file to the bucket; its key, or None if it stays local only."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def download_url(self, key: str, filename: str, media_type: str) -> tuple[str, int]:
+        """A URL the client can fetch `key` from, and its seconds to live."""
+
+
+class S3Storage(RemoteStorage):
+    """
+    A copy of every stored file in settings.s3_bucket, keyed by its name in
+    uploads/ so documents sharing a file share the object too.
+    """
+
+    def __init__(self):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs boto3: pip install boto3")
+        if not settings.s3_bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        self.bucket = settings.s3_bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.s3_endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+        )
+        # presigned URLs are reused for half their lifetime, so a repeat
+        # download gets the same URL and the browser's cached copy of it
+        self._urls = TTLCache(10000, settings.s3_presign_seconds / 2)
+
+    async def put(self, path: Path, media_type: str) -> str | None:
+        key = path.name
+        try:
+            await run_in_threadpool(
+                self.client.upload_file, str(path), self.bucket, key,
+                ExtraArgs={"ContentType": media_type},
+            )
+        except Exception:
+            # the local copy still serves downloads
+            log.exception("Could not copy %s to the bucket", key)
+            return None
+        return key
+
+    async def delete(self, key: str) -> None:
+        try:
+            await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+        except Exception:
+            log.exception("Could not delete %s from the bucket", key)
+
+    def download_url(self, key: str, filename: str, media_type: str) -> tuple[str, int]:
+        """
+        A presigned GET URL for `key`, and how many more seconds it is valid.
+        """
+        cached = self._urls.get(f"{key}\0{filename}")
+        if cached is None:
+            url = self.client.generate_presigned_url(
+                "get_object",
+                Params={
+                    "Bucket": self.bucket,
+                    "Key": key,
+                    "ResponseContentType": media_type,
+                    "ResponseContentDisposition": content_disposition(filename),
+                },
+                ExpiresIn=settings.s3_presign_seconds,
+            )
+            cached = (url, time.time() + settings.s3_presign_seconds)
+            self._urls.set(f"{key}\0{filename}", cached)
+        url, expires = cached
+        return url, max(0, int(expires - time.time()))
+
+
+_storage: LocalStorage | RemoteStorage | None = None
+
+
+def get_storage() -> LocalStorage | RemoteStorage:
+    global _storage
+    if _storage is None:
+        _storage = S3Storage() if settings.storage_backend == "s3" else LocalStorage()
+    return _storage
+
+
+async def register_file(path: Path, sha256: str, storage_key: str | None) -> None:
+    """Record a newly stored file, referenced by the document about to use it."""
+    await db.files.insert_one({
+        "_id": str(path), "sha256": sha256, "storage_key": storage_key, "refs": 1,
+    })
+
+
+async def claim_file(sha256: str) -> dict | None:
+    """
+    Take a reference on a stored file with these bytes, if one is still in
+    use. Returns its record (_id = path, storage_key), or None.
+    """
+    return await db.files.find_one_and_update(
+        {"sha256": sha256, "refs": {"$gt": 0}},
+        {"$inc": {"refs": 1}},
+        projection={"storage_key": 1},
+    )
+
+
+async def release_file(path: str, storage_key: str | None) -> None:
+    """
+    Drop one document's reference to a stored file. The last reference
+    deletes the file and its bucket copy.
+    """
+    rec = await db.files.find_one_and_update(
+        {"_id": path},
+        {"$inc": {"refs": -1}},
+        projection={"refs": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if rec is None:
+        # stored before reference counting (never shared with newer
+        # uploads): in use while any document names it
+        if await db.documents.find_one({"path": path}, {"_id": 1}):
+            return
+    elif rec["refs"] > 0:
+        return
+    else:
+        await db.files.delete_one({"_id": path, "refs": {"$lte": 0}})
+    Path(path).unlink(missing_ok=True)
+    if storage_key:
+        await get_storage().delete(storage_key)
+
+
+async def sync() -> int:
+    """
+    Copy stored files that are not in the bucket yet. Returns the number
+    of documents updated.
+    """
+    storage = get_storage()
+    if not isinstance(storage, RemoteStorage):
+        raise RuntimeError("--sync needs STORAGE_BACKEND=s3")
+    updated = 0
+    # documents sharing a file share one object
+    keys: dict[str, str | None] = {}
+    async for doc in db.documents.find({"storage_key": {"$exists": False}}, {"path": 1}):
+        path = Path(doc["path"])
+        if doc["path"] not in keys:
+            keys[doc["path"]] = (
+                await storage.put(path, MEDIA_TYPES.get(path.suffix.lower(), "application/octet-stream"))
+                if path.exists() else None
+            )
+        if keys[doc["path"]] is None:
+            continue
+        await db.documents.update_one(
+            {"_id": doc["_id"]}, {"$set": {"storage_key": keys[doc["path"]]}}
+        )
+        # later uploads sharing the file take the key from here
+        await db.files.update_one({"_id": doc["path"]}, {"$set": {"storage_key": keys[doc["path"]]}})
+        updated += 1
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Document storage.")
+    parser.add_argument("--sync", action="store_true",
+                        help="copy files uploaded before the bucket was configured")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.sync:
+        print(f"{asyncio.run(sync())} documents updated")
+
+
+if __name__ == "__main__":
+    main()
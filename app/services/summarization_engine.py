@@ -0,0 +1,199 @@
+# app/services/summarization_engine.py
+
+import asyncio
+import contextlib
+import hashlib
+import re
+from datetime import datetime
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.core.db import db
+from app.services.ai_service import (
+    complete, summarize_text, stream_summarize_text,
+    CHUNK_PROMPT, REDUCE_PROMPT, PROMPT_VERSION,
+)
+from app.services.llm_client import CHARS_PER_TOKEN, affordable_concurrency, estimate_tokens, model_name
+from app.utils.file_utils import PAGE_BREAK
+
+# first line of a unit that starts a new section: "# Intro", "2.1 Results",
+# "IV. Methods", "Chapter 3 ...", "Lecture 5: ..."
+_HEADING_RE = re.compile(
+    r"^\s*(#{1,6}\s+\S|(\d+(\.\d+)*\.?|[IVXLC]+\.)\s+[A-Z]|"
+    r"(chapter|section|lecture|part|topic)\s+\w+)",
+    re.IGNORECASE,
+)
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def _is_heading(unit: str) -> bool:
+    first_line = unit.lstrip().split("\n", 1)[0]
+    return len(first_line) <= 80 and bool(_HEADING_RE.match(first_line))
+
+
+def _split_units(text: str, max_chars: int) -> list[str]:
+    """
+    Break text into units of at most `max_chars`, preferring page, then
+    paragraph, then line boundaries, and hard-splitting only as a last resort.
+    """
+    units: list[str] = []
+    for page in text.split(PAGE_BREAK):
+        if len(page) <= max_chars:
+            units.append(page)
+            continue
+        for para in _PARAGRAPH_RE.split(page):
+            if len(para) <= max_chars:
+                units.append(para)
+                continue
+            for line in para.split("\n"):
+                while len(line) > max_chars:
+                    units.append(line[:max_chars])
+                    line = line[max_chars:]
+                units.append(line)
+    return [u for u in units if u.strip()]
+
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> list[str]:
+    """
+    Split `text` (pages separated by PAGE_BREAK) into chunks of roughly
+    `max_tokens`, starting a new chunk at a heading when the current one is
+    at least half full. Each chunk after the first is prefixed with the
+    last `overlap_tokens` of the previous one.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, max_chars // 4)
+    room = max_chars - overlap_chars
+
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for unit in _split_units(text, room):
+        full = size + len(unit) > room
+        new_section = _is_heading(unit) and size > room // 2
+        if current and (full or new_section):
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+
+    if overlap_chars:
+        for i in range(len(chunks) - 1, 0, -1):
+            tail = chunks[i - 1][-overlap_chars:]
+            # start the overlap on a word boundary
+            cut = tail.find(" ")
+            tail = tail[cut + 1:] if 0 <= cut < len(tail) // 2 else tail
+            chunks[i] = f"{tail}\n\n{chunks[i]}"
+    return chunks
+
+
+def _chunk_key(prompt: str) -> str:
+    raw = f"{model_name()}|v{PROMPT_VERSION}|{prompt}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def _summarize_chunk(prompt: str, sem: asyncio.Semaphore, step: str) -> str:
+    # chunk results are kept, so a retry of the whole document only
+    # re-runs the chunks that failed last time
+    key = _chunk_key(prompt)
+    rec = await db.summary_chunks.find_one({"_id": key}, {"summary": 1})
+    if rec:
+        return rec["summary"]
+
+    # llm_client retries rate limits and transient errors
+    async with sem:
+        summary = await complete(prompt, step)
+    await db.summary_chunks.update_one(
+        {"_id": key},
+        {"$setOnInsert": {"summary": summary, "model": model_name(), "created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    return summary
+
+
+async def _run_all(prompts: list[str], sem: asyncio.Semaphore, step: str) -> list[str]:
+    # let every chunk finish (and be stored) before surfacing a failure
+    results = await asyncio.gather(
+        *(_summarize_chunk(p, sem, step) for p in prompts),
+        return_exceptions=True,
+    )
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+    return results
+
+
+def _group(parts: list[str], max_chars: int) -> list[list[str]]:
+    # pack partial summaries into reduce groups; always at least two per
+    # group so every level of the tree shrinks
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for part in parts:
+        if len(current) >= 2 and size + len(part) > max_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(part)
+        size += len(part) + 2
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+async def map_reduce(text: str, max_tokens: int | None = None) -> str:
+    """
+    Condense `text` into partial summaries that together fit in one prompt
+    of `max_tokens`: chunks are summarized concurrently (map), then merged
+    level by level (reduce). Returns the joined result.
+    """
+    max_tokens = max_tokens or settings.summary_chunk_tokens
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    # a chunk prompt is about max_tokens; a small tokens/min quota admits
+    # fewer of those a minute than summary_max_concurrency
+    sem = asyncio.Semaphore(affordable_concurrency(max_tokens, settings.summary_max_concurrency))
+
+    # 1) map: chunks are mode-independent, so all modes share them
+    chunks = chunk_text(text, max_tokens, settings.summary_chunk_overlap_tokens)
+    parts = await _run_all(
+        [CHUNK_PROMPT.format(index=i + 1, total=len(chunks), text=c)
+         for i, c in enumerate(chunks)],
+        sem,
+        "map",
+    )
+
+    # 2) reduce until everything fits in a single prompt
+    while len(parts) > 1 and estimate_tokens("\n\n".join(parts)) > max_tokens:
+        parts = await _run_all(
+            [REDUCE_PROMPT.format(text="\n\n".join(g)) for g in _group(parts, max_chars)],
+            sem,
+            "reduce",
+        )
+    return "\n\n".join(parts)
+
+
+async def summarize_document(text: str, mode: str) -> str:
+    """
+    Summarize extracted text (pages separated by PAGE_BREAK) in the given
+    SummaryMode, going through map-reduce when it exceeds one prompt.
+    """
+    flat = text.replace(PAGE_BREAK, "\n")
+    if estimate_tokens(flat) > settings.summary_chunk_tokens:
+        flat = await map_reduce(text)
+    return await summarize_text(flat, mode)
+
+
+async def stream_document(text: str, mode: str) -> AsyncIterator[str]:
+    """
+    Like summarize_document, but yields the final completion piece by
+    piece. Map-reduce steps (if any) run to completion first.
+    """
+    flat = text.replace(PAGE_BREAK, "\n")
+    if estimate_tokens(flat) > settings.summary_chunk_tokens:
+        flat = await map_reduce(text)
+    async with contextlib.aclosing(stream_summarize_text(flat, mode)) as pieces:
+        async for piece in pieces:
+            yield piece
@@ -0,0 +1,147 @@
+# app/services/summary_cache.py
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from app.core.config import settings
+from app.core.db import db
+from app.services.ai_service import PROMPT_VERSION
+from app.services.llm_client import model_name
+from app.services.text_store import body_projection, load_texts, store_text
+
+
+class LRUCache:
+    """
+    Minimal in-process LRU; a maxsize of 0 disables it.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class _LeaderCancelled(Exception):
+    """The request generating a summary went away; waiters should retry."""
+
+
+_lru = LRUCache(settings.summary_cache_lru_size)
+# key -> future resolved by the one request currently producing that summary
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def cache_key(content_hash: str, mode: str, model: str | None = None) -> str:
+    # the fake backend's output must never be served as a real summary
+    model = model or model_name()
+    raw = f"{content_hash}|{mode}|{model}|v{PROMPT_VERSION}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def get_cached_summary(content_hash: str, mode: str) -> str | None:
+    """
+    Cached summary for this content and mode, or None. Never calls the LLM.
+    """
+    key = cache_key(content_hash, mode)
+    cached = _lru.get(key)
+    if cached is not None:
+        return cached
+    rec = await db.summary_cache.find_one({"_id": key}, body_projection("summary"))
+    if rec:
+        await load_texts([rec], "summary")
+        _lru.set(key, rec["summary"])
+        return rec["summary"]
+    return None
+
+
+async def store_summary(content_hash: str, mode: str, summary: str) -> None:
+    key = cache_key(content_hash, mode)
+    await db.summary_cache.update_one(
+        {"_id": key},
+        {"$setOnInsert": {
+            "content_hash": content_hash,
+            "mode": mode,
+            "model": model_name(),
+            "prompt_version": PROMPT_VERSION,
+            # compressed when large; cache entries are never spilled
+            **await store_text(key, "summary", summary, spill=False),
+            "created_at": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+    _lru.set(key, summary)
+
+
+async def _load_or_generate(
+    key: str,
+    content_hash: str,
+    mode: str,
+    generate: Callable[[], Awaitable[str]],
+) -> str:
+    rec = await db.summary_cache.find_one({"_id": key}, body_projection("summary"))
+    if rec:
+        await load_texts([rec], "summary")
+        return rec["summary"]
+
+    summary = await generate()
+    await store_summary(content_hash, mode, summary)
+    return summary
+
+
+async def get_or_create_summary(
+    content_hash: str,
+    mode: str,
+    generate: Callable[[], Awaitable[str]],
+) -> str:
+    """
+    Return the summary for (content, mode, model, prompt version), calling
+    `generate` only on a cache miss. Concurrent callers with the same key
+    share a single `generate` call.
+    """
+    key = cache_key(content_hash, mode)
+
+    # 1) in-process LRU
+    cached = _lru.get(key)
+    if cached is not None:
+        return cached
+
+    # 2) join a call already in flight for this key
+    while key in _inflight:
+        try:
+            return await asyncio.shield(_inflight[key])
+        except _LeaderCancelled:
+            continue
+
+    # 3) become the leader: Mongo cache, then the LLM
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        summary = await _load_or_generate(key, content_hash, mode, generate)
+    except asyncio.CancelledError:
+        fut.set_exception(_LeaderCancelled())
+        fut.exception()  # mark retrieved even if nobody was waiting
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()
+        raise
+    else:
+        _lru.set(key, summary)
+        fut.set_result(summary)
+        return summary
+    finally:
+        _inflight.pop(key, None)
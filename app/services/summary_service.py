@@ -0,0 +1,400 @@
+# app/services/summary_service.py
+#
+# Summary bodies are stored through app/services/text_store.py. Records
+# saved before that can be compressed in place, and collection sizes
+# compared before and after, with:
+#
+#   python -m app.services.summary_service --stats
+#   python -m app.services.summary_service --compress
+
+import argparse
+import asyncio
+import json
+import logging
+
+from bson import ObjectId
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, NamedTuple
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db import db
+from app.schemas.ai import PageRange, SummarizeOut
+from app.services.extraction_service import ExtractionError
+from app.services.folder_stats import adjust_counts, moved
+from app.services.text_service import (
+    get_document_hash, get_document_outline, get_document_pages, get_document_text, get_page_count,
+)
+from app.services.summary_cache import get_or_create_summary
+from app.services.summarization_engine import summarize_document
+from app.services.search_service import index_summaries
+from app.services.similarity_service import near_duplicate_summary
+from app.services.text_store import body_projection, delete_blobs, load_texts, store_text
+from app.utils.fast_json import FastJSONResponse
+from app.utils.file_utils import PAGE_BREAK, PAGED_EXTS
+from app.utils.pagination import NEXT_CURSOR_HEADER, sort_spec
+
+log = logging.getLogger(__name__)
+
+# listing rows carry only what SummarizeOut shows; preview mode swaps the
+# body for its first SUMMARY_PREVIEW_CHARS characters, cut server-side.
+# Compressed and spilled bodies keep those characters in summary_preview,
+# so previews never decompress or fetch a body.
+SUMMARY_PREVIEW_CHARS = 200
+_LIST_FIELDS = {
+    "doc_id": 1, "filename": 1, "mode": 1, "created_at": 1, "folder_id": 1, "pages": 1, "section": 1,
+}
+SUMMARY_LIST_PROJECTION = {**_LIST_FIELDS, **body_projection("summary")}
+SUMMARY_PREVIEW_PROJECTION = {
+    **_LIST_FIELDS,
+    "summary": {"$substrCP": [
+        {"$ifNull": ["$summary", "$summary_preview"]}, 0, SUMMARY_PREVIEW_CHARS,
+    ]},
+}
+
+
+def summary_list_projection(preview: bool) -> dict:
+    return SUMMARY_PREVIEW_PROJECTION if preview else SUMMARY_LIST_PROJECTION
+
+
+def summary_out(rec: dict) -> SummarizeOut:
+    # `rec` holds the plain body: built in memory, or passed through load_texts
+    return SummarizeOut(
+        id=str(rec["_id"]),
+        doc_id=str(rec["doc_id"]),
+        filename=rec["filename"],
+        mode=rec["mode"],
+        summary=rec["summary"],
+        created_at=rec["created_at"],
+        folder_id=str(rec["folder_id"]) if rec.get("folder_id") else None,
+        note=rec.get("note"),
+        pages=rec.get("pages"),
+        section=rec.get("section"),
+    )
+
+
+async def summaries_out(recs: list[dict]) -> list[SummarizeOut]:
+    """
+    summary_out for records read from `summaries`, bodies loaded first.
+    """
+    await load_texts(recs, "summary")
+    return [summary_out(rec) for rec in recs]
+
+
+def summary_row(rec: dict) -> dict:
+    """
+    summary_out as a JSON-ready dict (same fields and output), for list
+    responses too large to build a model per row.
+    """
+    return {
+        "id": str(rec["_id"]),
+        "doc_id": str(rec["doc_id"]),
+        "filename": rec["filename"],
+        "mode": rec["mode"],
+        "summary": rec["summary"],
+        "created_at": rec["created_at"],
+        "folder_id": str(rec["folder_id"]) if rec.get("folder_id") else None,
+        "note": rec.get("note"),
+        "pages": rec.get("pages"),
+        "section": rec.get("section"),
+    }
+
+
+async def summaries_response(recs: list[dict], next_cursor: str | None = None) -> FastJSONResponse:
+    """
+    A list[SummarizeOut] response for records read from `summaries`,
+    serialized straight from the rows.
+    """
+    await load_texts(recs, "summary")
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse([summary_row(rec) for rec in recs], headers=headers)
+
+
+async def export_summaries(query: dict):
+    """
+    Every summary matching `query`, newest first, as batches of JSON-ready
+    rows (notes included), read from one cursor.
+    """
+    size = settings.summary_export_batch_size
+    find = (
+        db.summaries.find(query, {**SUMMARY_LIST_PROJECTION, "note": 1})
+        .sort(sort_spec("created_at"))
+        .batch_size(size)
+    )
+    batch = []
+    async for rec in find:
+        batch.append(rec)
+        if len(batch) >= size:
+            await load_texts(batch, "summary")
+            yield [summary_row(rec) for rec in batch]
+            batch = []
+    if batch:
+        await load_texts(batch, "summary")
+        yield [summary_row(rec) for rec in batch]
+
+
+async def parsed(result: Awaitable):
+    """
+    Await text / pages / outline read from a document's file. A file the
+    parser cannot read is a 422, not a server error.
+    """
+    try:
+        return await result
+    except ExtractionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+class PageSelection(NamedTuple):
+    """Part of a document to summarize: 1-based inclusive pages / slides."""
+    start: int
+    end: int
+    # outline title it was chosen by, if any
+    section: str | None = None
+
+
+def _find_section(outline: list[dict], name: str) -> dict | None:
+    wanted = " ".join(name.split()).casefold()
+    for match in (lambda t: t == wanted, lambda t: wanted in t):
+        for section in outline:
+            if match(section["title"].casefold()):
+                return section
+    return None
+
+
+async def select_pages(
+    doc: dict, pages: PageRange | None, section: str | None
+) -> PageSelection | None:
+    """
+    Resolve a page range or outline section of SummarizeIn against a
+    document. None means the whole document.
+    """
+    if pages is None and section is None:
+        return None
+    if Path(doc["path"]).suffix.lower() not in PAGED_EXTS:
+        raise HTTPException(400, "Page ranges and sections need a PDF or PPTX")
+    if section is not None:
+        found = _find_section(await parsed(get_document_outline(doc)), section)
+        if found is None:
+            raise HTTPException(404, "Section not found")
+        return PageSelection(found["start"], found["end"], found["title"])
+    count = await parsed(get_page_count(doc))
+    if pages.start > count:
+        raise HTTPException(400, f"Document has {count} pages")
+    return PageSelection(pages.start, min(pages.end or count, count))
+
+
+def selection_hash(content_hash: str, selection: PageSelection | None) -> str:
+    # summaries of a part are cached apart from the whole document's
+    if selection is None:
+        return content_hash
+    return f"{content_hash}:{selection.start}-{selection.end}"
+
+
+async def selection_text(doc: dict, selection: PageSelection | None) -> str:
+    """
+    Text to summarize: the whole document (parsed once per unique file,
+    then cached), or only the selected pages.
+    """
+    if selection is None:
+        return await parsed(get_document_text(doc))
+    pages = await parsed(get_document_pages(doc, selection.start - 1, selection.end))
+    return PAGE_BREAK.join(pages)
+
+
+async def summarize_doc(
+    doc: dict, mode: str, selection: PageSelection | None = None
+) -> tuple[str, str]:
+    """
+    Summary text for an uploaded document, or the selected part of it,
+    via the caches. Returns (content_hash, summary).
+    """
+    # Reuse a cached summary of the same content, mode and model;
+    # concurrent identical requests share one LLM call
+    content_hash = await get_document_hash(doc)
+
+    async def generate() -> str:
+        # a near-identical document (re-export, one slide added) may
+        # already have a summary in this mode
+        if selection is None:
+            reused = await near_duplicate_summary(doc, mode)
+            if reused is not None:
+                return reused
+        text = await selection_text(doc, selection)
+        if not text.strip():
+            detail = "No extractable text in " + ("document" if selection is None else "the selected pages")
+            raise HTTPException(status_code=400, detail=detail)
+        # long documents are chunked and map-reduced behind the same API
+        return await summarize_document(text, mode)
+
+    summary = await get_or_create_summary(selection_hash(content_hash, selection), mode, generate)
+    return content_hash, summary
+
+
+async def create_summary(
+    user_email: str,
+    doc: dict,
+    mode: str,
+    folder_id: ObjectId | None = None,
+    selection: PageSelection | None = None,
+) -> dict:
+    """
+    Summarize an uploaded document (or the selected part) and insert the
+    `summaries` record. Shared by the HTTP route and the background job
+    workers.
+    """
+    content_hash, summary = await summarize_doc(doc, mode, selection)
+    return await insert_summary(user_email, doc, mode, content_hash, summary, folder_id, selection)
+
+
+def build_summary_record(
+    user_email: str,
+    doc: dict,
+    mode: str,
+    content_hash: str,
+    summary: str,
+    folder_id: ObjectId | None = None,
+    selection: PageSelection | None = None,
+) -> dict:
+    rec = {
+        "doc_id": doc["_id"],
+        "user_email": user_email,
+        "filename": doc["filename"],
+        "mode": mode,
+        "content_hash": content_hash,
+        "summary": summary,
+        "created_at": datetime.utcnow(),
+    }
+    if folder_id:
+        rec["folder_id"] = folder_id
+    if selection:
+        # the pages this summary covers
+        rec["pages"] = {"start": selection.start, "end": selection.end}
+        if selection.section:
+            rec["section"] = selection.section
+    return rec
+
+
+async def stored_summary(rec: dict) -> dict:
+    """
+    The `summaries` document for a record from build_summary_record: the
+    body stored as text_store decides (a spilled one is written here, so
+    the record gets its _id now). `rec` keeps the plain body.
+    """
+    rec.setdefault("_id", ObjectId())
+    stored = {k: v for k, v in rec.items() if k != "summary"}
+    body = await store_text(rec["_id"], "summary", rec["summary"], doc_id=rec["doc_id"])
+    if "summary" not in body:
+        stored["summary_preview"] = rec["summary"][:SUMMARY_PREVIEW_CHARS]
+    stored.update(body)
+    return stored
+
+
+async def insert_summary(
+    user_email: str,
+    doc: dict,
+    mode: str,
+    content_hash: str,
+    summary: str,
+    folder_id: ObjectId | None = None,
+    selection: PageSelection | None = None,
+) -> dict:
+    rec = build_summary_record(user_email, doc, mode, content_hash, summary, folder_id, selection)
+    await db.summaries.insert_one(await stored_summary(rec))
+    await index_summaries([rec])
+    if folder_id:
+        await adjust_counts(user_email, moved(None, folder_id))
+    return rec
+
+
+def _plain_and_large(field: str) -> dict:
+    # records whose body is still a plain string text_store would compress
+    return {field: {"$type": "string"}, "$expr": {
+        "$gte": [{"$strLenBytes": f"${field}"}, settings.text_compress_min_bytes],
+    }}
+
+
+async def _set_spilled(guard: dict, update: dict) -> int:
+    # compress_stored's update for a body already written to text_blobs
+    res = await db.summaries.update_one(guard, update)
+    if res.matched_count:
+        return res.modified_count
+    # the summary was deleted (or compressed by another run) after it was
+    # read; unless that run now points at the blob, nothing else does
+    if not await db.summaries.find_one({"_id": guard["_id"], "summary_blob": True}, {"_id": 1}):
+        await delete_blobs({"_id": guard["_id"]})
+    return 0
+
+
+async def compress_stored(batch_size: int = 500) -> int:
+    """
+    Store plain-string bodies of `summaries` and `summary_cache` the way new
+    ones are stored. Returns the number of records rewritten.
+    """
+    rewritten = 0
+    for name in ("summaries", "summary_cache"):
+        ops = []
+        async for rec in db[name].find(_plain_and_large("summary")):
+            if name == "summaries":
+                stored = await stored_summary(dict(rec))
+                body = {k: v for k, v in stored.items() if k not in rec}
+            else:
+                body = await store_text(rec["_id"], "summary", rec["summary"], spill=False)
+            # only if the body is still the one we compressed
+            guard = {"_id": rec["_id"], "summary": rec["summary"]}
+            update = {"$set": body, "$unset": {"summary": ""}}
+            if body.get("summary_blob"):
+                # the body is already in text_blobs: see whether it landed
+                rewritten += await _set_spilled(guard, update)
+                continue
+            ops.append(UpdateOne(guard, update))
+            if len(ops) >= batch_size:
+                rewritten += (await db[name].bulk_write(ops, ordered=False)).modified_count
+                ops = []
+        if ops:
+            rewritten += (await db[name].bulk_write(ops, ordered=False)).modified_count
+    return rewritten
+
+
+async def storage_stats() -> dict:
+    """
+    Size of the collections holding text: documents, bytes, average
+    document size (what a list query pulls into cache per row), on-disk
+    and index size.
+    """
+    stats = {}
+    for name in ("summaries", "summary_cache", "text_blobs", "extracted_texts"):
+        s = await db.command("collStats", name)
+        stats[name] = {
+            key: s.get(key, 0)
+            for key in ("count", "size", "avgObjSize", "storageSize", "totalIndexSize")
+        }
+    try:
+        cache = (await db.command("serverStatus"))["wiredTiger"]["cache"]
+        stats["wiredtiger_cache_bytes"] = cache["bytes currently in the cache"]
+    except Exception:
+        # not allowed on shared Atlas tiers
+        pass
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stored summaries.")
+    parser.add_argument("--stats", action="store_true", help="print collection sizes as JSON")
+    parser.add_argument("--compress", action="store_true",
+                        help="compress / spill bodies saved as plain strings")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def run():
+        if args.compress:
+            print(f"{await compress_stored()} records rewritten")
+        if args.stats:
+            print(json.dumps(await storage_stats(), indent=2))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
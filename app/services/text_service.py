@@ -0,0 +1,105 @@
+# app/services/text_service.py
+
+from datetime import datetime
+from pathlib import Path
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.db import db
+from app.utils.file_utils import hash_file, PAGE_BREAK
+from app.services.extraction_service import (
+    count_pages, extract_document, extract_outline, extract_page_range,
+)
+from app.services.text_store import compress, decompress
+
+# Extracted text lives in `extracted_texts`, keyed by the SHA-256 of the file
+# bytes, so each unique file is parsed once no matter how many documents
+# point at it or how often it is summarized.
+
+async def _extract_and_store(path: Path, sha256: str) -> str:
+    # parsing is CPU-bound, it runs in the extraction process pool
+    pages = await extract_document(path)
+    text = PAGE_BREAK.join(pages)
+    # two uploads of the same bytes may race here; $setOnInsert keeps the first
+    await db.extracted_texts.update_one(
+        {"_id": sha256},
+        {"$setOnInsert": {
+            "text": compress(text),
+            "page_count": len(pages),
+            "char_count": len(text),
+            "created_at": datetime.utcnow(),
+        }},
+        upsert=True,
+    )
+    return text
+
+async def ensure_extracted(path: Path, sha256: str) -> str | None:
+    """
+    Parse `path` into the text cache unless these bytes were seen before.
+    Returns the text when it was extracted now, None on a cache hit.
+    """
+    if await db.extracted_texts.find_one({"_id": sha256}, {"_id": 1}):
+        return None
+    return await _extract_and_store(path, sha256)
+
+async def load_text(sha256: str) -> str | None:
+    """
+    Cached text for a content hash, pages separated by PAGE_BREAK.
+    """
+    rec = await db.extracted_texts.find_one({"_id": sha256}, {"text": 1})
+    return decompress(rec["text"]) if rec else None
+
+async def get_document_hash(doc: dict) -> str:
+    """
+    SHA-256 of a document's bytes. Documents uploaded before hashing existed
+    are hashed once here and the hash is saved on the record.
+    """
+    if doc.get("sha256"):
+        return doc["sha256"]
+    sha256 = await run_in_threadpool(hash_file, Path(doc["path"]))
+    await db.documents.update_one({"_id": doc["_id"]}, {"$set": {"sha256": sha256}})
+    doc["sha256"] = sha256
+    return sha256
+
+async def get_document_text(doc: dict) -> str:
+    """
+    Extracted text of a `documents` record, served from the cache and
+    extracted on a miss. Pages are separated by PAGE_BREAK.
+    """
+    sha256 = await get_document_hash(doc)
+    text = await load_text(sha256)
+    if text is None:
+        text = await _extract_and_store(Path(doc["path"]), sha256)
+    return text
+
+async def get_page_count(doc: dict) -> int:
+    """
+    Pages / slides of a PDF or PPTX record, from the text cache when the
+    file was extracted already.
+    """
+    sha256 = await get_document_hash(doc)
+    rec = await db.extracted_texts.find_one({"_id": sha256}, {"page_count": 1})
+    if rec and "page_count" in rec:
+        return rec["page_count"]
+    return await count_pages(Path(doc["path"]))
+
+async def get_document_pages(doc: dict, start: int, stop: int) -> list[str]:
+    """
+    Text of pages / slides [start, stop) of a PDF or PPTX record: sliced
+    from the text cache when there is one, otherwise parsed for just
+    those pages.
+    """
+    sha256 = await get_document_hash(doc)
+    text = await load_text(sha256)
+    if text is not None:
+        return text.split(PAGE_BREAK)[start:stop]
+    return await extract_page_range(Path(doc["path"]), start, stop)
+
+async def get_document_outline(doc: dict) -> list[dict]:
+    """
+    Named sections of a PDF or PPTX record (see read_outline), read from
+    the file once and kept on the record.
+    """
+    if "outline" not in doc:
+        doc["outline"] = await extract_outline(Path(doc["path"]))
+        await db.documents.update_one({"_id": doc["_id"]}, {"$set": {"outline": doc["outline"]}})
+    return doc["outline"]
@@ -0,0 +1,78 @@
+# app/services/text_store.py
+#
+# Compact storage for large text fields. A body under
+# settings.text_compress_min_bytes stays a plain string in `<field>`. A
+# bigger one is zlib-compressed into `<field>_z`. One still over
+# settings.text_spill_bytes once compressed moves to the `text_blobs`
+# collection under the owning record's _id (one spilled field per record),
+# and `<field>_blob` marks it. Queries that do not project these fields
+# never read the bodies.
+
+import logging
+import zlib
+
+from bson import Binary
+
+from app.core.config import settings
+from app.core.db import db
+
+log = logging.getLogger(__name__)
+
+
+def compress(text: str) -> Binary:
+    return Binary(zlib.compress(text.encode("utf-8"), 6))
+
+
+def decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def body_projection(field: str) -> dict:
+    """Projection of every form `field` may be stored in."""
+    return {field: 1, f"{field}_z": 1, f"{field}_blob": 1}
+
+
+async def store_text(owner_id, field: str, text: str, spill: bool = True, **blob_fields) -> dict:
+    """
+    Fields to save on the record `owner_id` so it holds `text` in `field`.
+    A spilled body is written to `text_blobs` here, with `blob_fields`
+    (e.g. a parent id to delete it by).
+    """
+    data = text.encode("utf-8")
+    if len(data) < settings.text_compress_min_bytes:
+        return {field: text}
+    packed = Binary(zlib.compress(data, 6))
+    if not spill or len(packed) <= settings.text_spill_bytes:
+        return {f"{field}_z": packed}
+    await db.text_blobs.replace_one(
+        {"_id": owner_id},
+        {"field": field, "data": packed, **blob_fields},
+        upsert=True,
+    )
+    return {f"{field}_blob": True}
+
+
+async def load_texts(recs: list[dict], field: str) -> list[dict]:
+    """
+    Put the plain text of `field` back on every record (in place), with
+    one query for all spilled bodies. Returns `recs`.
+    """
+    spilled = {}
+    for rec in recs:
+        packed = rec.pop(f"{field}_z", None)
+        if packed is not None:
+            rec[field] = decompress(packed)
+        if rec.pop(f"{field}_blob", False):
+            spilled[rec["_id"]] = rec
+    if spilled:
+        async for blob in db.text_blobs.find({"_id": {"$in": list(spilled)}}, {"data": 1}):
+            spilled.pop(blob["_id"])[field] = decompress(blob["data"])
+        for owner_id, rec in spilled.items():
+            log.warning("%s of %s is missing from text_blobs", field, owner_id)
+            rec[field] = ""
+    return recs
+
+
+async def delete_blobs(query: dict) -> None:
+    """Drop the spilled bodies matching `query` (by _id or blob field)."""
+    await db.text_blobs.delete_many(query)
@@ -1,16 +1,73 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
 
-def send_verification_email(to_email: str, code: str) -> None:
+def verification_email(code: str) -> tuple[str, str]:
     subject = "Your verification code"
     body = f"Your verification code is: {code}\n\nIt expires in 10 minutes."
+    return subject, body
+
+def build_message(to_email: str, subject: str, body: str) -> str:
     message = MIMEText(body)
     message["Subject"] = subject
     message["From"] = settings.mail_username
     message["To"] = to_email
+    return message.as_string()
 
-    # Connect via SSL on port settings.mail_port (465)
-    with smtplib.SMTP_SSL(settings.mail_host, settings.mail_port) as server:
+def _connect() -> smtplib.SMTP:
+    # SSL on settings.mail_port (465), or plain SMTP for a local server
+    if settings.mail_use_ssl:
+        server = smtplib.SMTP_SSL(settings.mail_host, settings.mail_port, timeout=30)
+    else:
+        server = smtplib.SMTP(settings.mail_host, settings.mail_port, timeout=30)
+    if settings.mail_login:
         server.login(settings.mail_username, settings.mail_password)
-        server.sendmail(settings.mail_username, [to_email], message.as_string())
+    return server
+
+def _close(server: smtplib.SMTP) -> None:
+    try:
+        server.close()
+    except Exception:
+        pass
+
+
+class SMTPPool:
+    """
+    Keeps up to `size` authenticated SMTP connections open between sends,
+    so TLS setup and login happen once per connection, not per email.
+    Connections idle for longer than settings.email_smtp_idle_seconds are
+    dropped (servers hang up on them anyway).
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._idle: list[tuple[float, smtplib.SMTP]] = []
+
+    async def acquire(self) -> smtplib.SMTP:
+        while self._idle:
+            last_used, server = self._idle.pop()
+            if time.monotonic() - last_used < settings.email_smtp_idle_seconds:
+                return server
+            _close(server)
+        return await run_in_threadpool(_connect)
+
+    def release(self, server: smtplib.SMTP) -> None:
+        if len(self._idle) < self.size:
+            self._idle.append((time.monotonic(), server))
+        else:
+            _close(server)
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        # after an error the connection state is unknown
+        _close(server)
+
+    def close(self) -> None:
+        while self._idle:
+            _close(self._idle.pop()[1])
+
+    async def send(self, server: smtplib.SMTP, to_email: str, message: str) -> None:
+        await run_in_threadpool(server.sendmail, settings.mail_username, [to_email], message)
+
+
+smtp_pool = SMTPPool(settings.email_smtp_pool_size)
@@ -0,0 +1,52 @@
+# app/utils/fast_json.py
+#
+# JSON for large list responses without building a Pydantic model per row:
+# routes hand plain dicts (already shaped like their response_model, which
+# still documents them in OpenAPI) to FastJSONResponse or ndjson_stream.
+# Uses orjson when it is installed, the json module otherwise.
+
+import json
+from datetime import datetime
+from typing import AsyncIterator
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse for content that is already JSON-ready (no encoder pass)."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_stream(batches: AsyncIterator[list[dict]], **kwargs) -> StreamingResponse:
+    """
+    One JSON document per line, each batch written as one chunk as soon as
+    `batches` yields it, so only one batch is ever held in memory.
+    """
+
+    async def chunks():
+        async for rows in batches:
+            yield b"".join(dumps(row) + b"\n" for row in rows)
+
+    return StreamingResponse(chunks(), media_type=NDJSON_MEDIA_TYPE, **kwargs)
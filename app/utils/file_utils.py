@@ -1,9 +1,20 @@
+import os
 import uuid
+import hashlib
+import posixpath
+import zipfile
 from pathlib import Path
+from typing import NamedTuple
 import pymupdf        # PyMuPDF
 import docx        # python-docx
 import pptx        # python-pptx
+from lxml import etree
+from urllib.parse import quote
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
 
 # where to save uploads
 UPLOAD_DIR = Path("uploads")
@@ -12,31 +23,241 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # only allow these extensions
 ALLOWED_EXTS = {".pdf", ".docx", ".pptx"}
 
-def save_upload(upload_file) -> Path:
+# served Content-Type per extension (not every mimetypes table knows OOXML)
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# separates pages / slides in cached text so page boundaries survive
+PAGE_BREAK = "\f"
+
+# what the first bytes / zip members of each type must look like
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+OOXML_MAIN_PART = {
+    ".docx": "word/document.xml",
+    ".pptx": "ppt/presentation.xml",
+}
+
+# file types that can be read by page / slide range and have an outline
+PAGED_EXTS = {".pdf", ".pptx"}
+
+# for reading single slides straight from the PPTX zip
+_PPTX_NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+class SavedUpload(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+
+def _check_magic(ext: str, head: bytes) -> bool:
+    if ext == ".pdf":
+        # the header may be preceded by junk, readers accept it in the first 1 KB
+        return PDF_MAGIC in head[:1024]
+    return head.startswith(ZIP_MAGIC)
+
+def _check_ooxml(path: Path, ext: str) -> bool:
+    try:
+        with zipfile.ZipFile(path) as z:
+            return OOXML_MAIN_PART[ext] in z.namelist()
+    except zipfile.BadZipFile:
+        return False
+
+async def save_upload(upload_file) -> SavedUpload:
     """
-    Validate extension, save file, and return Path to saved file.
-    Raises HTTPException(400) if unsupported.
+    Validate extension and content, stream the upload to disk in chunks while
+    hashing it, and return where it landed. The file is written to a temp
+    name and renamed into place only once complete.
+    Raises HTTPException(400) if unsupported, 413 if too large.
     """
     ext = Path(upload_file.filename).suffix.lower()
     if ext not in ALLOWED_EXTS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
+    max_bytes = settings.max_upload_mb * 1024 * 1024
     unique_name = f"{uuid.uuid4()}{ext}"
     out_path = UPLOAD_DIR / unique_name
-    with out_path.open("wb") as f:
-        f.write(upload_file.file.read())
-    return out_path
+    tmp_path = UPLOAD_DIR / f".{unique_name}.part"
+    h = hashlib.sha256()
+    size = 0
 
-def extract_text(path: Path) -> str:
+    f = await run_in_threadpool(tmp_path.open, "wb")
+    try:
+        try:
+            while chunk := await upload_file.read(settings.upload_chunk_size):
+                if size == 0 and not _check_magic(ext, chunk):
+                    raise HTTPException(status_code=400, detail=f"File content is not a valid {ext}")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds {settings.max_upload_mb} MB",
+                    )
+                h.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+        if ext in OOXML_MAIN_PART and not await run_in_threadpool(_check_ooxml, tmp_path, ext):
+            raise HTTPException(status_code=400, detail=f"File content is not a valid {ext}")
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return SavedUpload(out_path, h.hexdigest(), size)
+
+def content_disposition(filename: str) -> str:
     """
-    Extracts and returns all text from the file at `path`.
-    Supports PDF, DOCX (including tables), PPTX.
+    Content-Disposition for downloading `filename`, as FileResponse builds it.
+    """
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+class DocumentFileResponse(FileResponse):
+    """
+    FileResponse reading 1 MiB chunks instead of 64 KiB: every chunk costs a
+    thread hop and an ASGI send, and uvicorn has no zero-copy send.
+    """
+    chunk_size = 1024 * 1024
+
+def hash_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Returns the hex SHA-256 of the file at `path`, read in chunks.
+    """
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def pdf_page_count(path: Path) -> int:
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+def extract_pdf_range(path: Path, start: int, stop: int) -> list[str]:
+    """
+    Extracts text of PDF pages [start, stop), one entry per page.
+    """
+    with pymupdf.open(path) as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, doc.page_count))]
+
+def _pptx_slide_parts(z: zipfile.ZipFile) -> list[str]:
+    # slide part names in presentation order
+    pres = etree.fromstring(z.read("ppt/presentation.xml"), _XML_PARSER)
+    rels = etree.fromstring(z.read("ppt/_rels/presentation.xml.rels"), _XML_PARSER)
+    targets = {r.get("Id"): r.get("Target") for r in rels.iterfind("rel:Relationship", _PPTX_NS)}
+    parts = []
+    for sld in pres.iterfind("p:sldIdLst/p:sldId", _PPTX_NS):
+        target = targets[sld.get(_R_ID)]
+        parts.append(target.lstrip("/") if target.startswith("/")
+                     else posixpath.normpath(posixpath.join("ppt", target)))
+    return parts
+
+def _pptx_paragraph(p) -> str:
+    # what python-pptx's paragraph.text returns
+    parts = []
+    for el in p:
+        tag = etree.QName(el).localname
+        if tag in ("r", "fld"):
+            t = el.find("a:t", _PPTX_NS)
+            parts.append(t.text or "" if t is not None else "")
+        elif tag == "br":
+            parts.append("\v")
+    return "".join(parts)
+
+def _pptx_slide(z: zipfile.ZipFile, part: str) -> tuple[str | None, str]:
+    """
+    (title, text) of one slide; the text is what extract_pages gives for it.
+    """
+    root = etree.fromstring(z.read(part), _XML_PARSER)
+    title, texts = None, []
+    for sp in root.iterfind("p:cSld/p:spTree/p:sp", _PPTX_NS):
+        body = sp.find("p:txBody", _PPTX_NS)
+        if body is None:
+            continue
+        text = "\n".join(_pptx_paragraph(p) for p in body.iterfind("a:p", _PPTX_NS))
+        texts.append(text)
+        ph = sp.find("p:nvSpPr/p:nvPr/p:ph", _PPTX_NS)
+        if title is None and ph is not None and ph.get("type") in ("title", "ctrTitle"):
+            title = " ".join(text.split()) or None
+    return title, "\n".join(texts)
+
+def page_count(path: Path) -> int:
+    """
+    Number of pages (PDF) or slides (PPTX), without reading their content.
+    """
+    if path.suffix.lower() == ".pdf":
+        return pdf_page_count(path)
+    with zipfile.ZipFile(path) as z:
+        return len(_pptx_slide_parts(z))
+
+def extract_range(path: Path, start: int, stop: int) -> list[str]:
+    """
+    Extracts text of pages / slides [start, stop) of a PDF or PPTX, one
+    entry each, parsing only those pages / slides.
+    """
+    if path.suffix.lower() == ".pdf":
+        return extract_pdf_range(path, start, stop)
+    with zipfile.ZipFile(path) as z:
+        return [_pptx_slide(z, part)[1] for part in _pptx_slide_parts(z)[start:stop]]
+
+def read_outline(path: Path) -> list[dict]:
+    """
+    Named sections of a PDF (its outline / bookmarks) or PPTX (runs of
+    slides under the same title, untitled slides joining the one before) as
+    {"title", "level", "start", "end"} with 1-based inclusive pages.
+    Other types, and PDFs without an outline, have none.
+    """
+    ext = path.suffix.lower()
+    sections = []
+    if ext == ".pdf":
+        with pymupdf.open(path) as doc:
+            count = doc.page_count
+            entries = [
+                (level, " ".join(title.split()), page)
+                for level, title, page in doc.get_toc(simple=True)
+                if page >= 1 and title.strip()
+            ]
+        for i, (level, title, page) in enumerate(entries):
+            # runs until the next entry at the same or a higher level
+            end = count
+            for next_level, _, next_page in entries[i + 1:]:
+                if next_level <= level:
+                    end = max(page, next_page - 1)
+                    break
+            sections.append({"title": title, "level": level, "start": page, "end": end})
+    elif ext == ".pptx":
+        with zipfile.ZipFile(path) as z:
+            for i, part in enumerate(_pptx_slide_parts(z), 1):
+                title, _ = _pptx_slide(z, part)
+                if title and (not sections or sections[-1]["title"] != title):
+                    sections.append({"title": title, "level": 1, "start": i, "end": i})
+                elif sections:
+                    sections[-1]["end"] = i
+    return sections
+
+def extract_pages(path: Path) -> list[str]:
+    """
+    Extracts text from the file at `path` as a list with one entry per
+    PDF page or PPTX slide. DOCX (including tables) comes back as a single entry.
     """
     ext = path.suffix.lower()
 
     if ext == ".pdf":
-        doc = pymupdf.open(path)
-        return "\n".join(page.get_text() for page in doc)
+        with pymupdf.open(path) as doc:
+            return [page.get_text() for page in doc]
 
     if ext == ".docx":
         d = docx.Document(path)
@@ -49,16 +270,25 @@ def extract_text(path: Path) -> str:
                 for cell in row.cells:
                     # cell.text returns full text of a cell
                     parts.append(cell.text)
-        return "\n".join(parts)
+        return ["\n".join(parts)]
 
     if ext == ".pptx":
         prs = pptx.Presentation(path)
-        texts = []
+        slides = []
         for slide in prs.slides:
+            texts = []
             for shape in slide.shapes:
                 if hasattr(shape, "text"):
                     texts.append(shape.text)
-        return "\n".join(texts)
+            slides.append("\n".join(texts))
+        return slides
 
     # Should never happen if ALLOWED_EXTS is enforced
-    return ""
+    return []
+
+def extract_text(path: Path) -> str:
+    """
+    Extracts and returns all text from the file at `path`.
+    Supports PDF, DOCX (including tables), PPTX.
+    """
+    return "\n".join(extract_pages(path))
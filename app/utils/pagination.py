@@ -0,0 +1,66 @@
+# app/utils/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+# Keyset pagination, newest first, on (<sort field>, _id). The cursor is an
+# opaque base64 token holding the last row's sort value and _id.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: datetime, oid: ObjectId) -> str:
+    raw = json.dumps({"t": value.isoformat(), "id": str(oid)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def sort_spec(field: str) -> list[tuple[str, int]]:
+    return [(field, -1), ("_id", -1)]
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort_field: str,
+    limit: int | None = None,
+    cursor: str | None = None,
+    projection: dict | None = None,
+) -> tuple[list[dict], str | None]:
+    """
+    One page of `query` sorted by (sort_field, _id) descending, starting
+    after `cursor`. Returns the rows and the cursor for the next page
+    (None on the last page). Without a limit, everything after the cursor
+    is returned.
+    """
+    if cursor:
+        value, oid = decode_cursor(cursor)
+        query = {**query, "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": oid}},
+        ]}
+
+    find = collection.find(query, projection).sort(sort_spec(sort_field))
+    if limit:
+        # one extra row tells us whether another page exists
+        find = find.limit(limit + 1)
+    rows = await find.to_list(length=None)
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[sort_field], last["_id"])
+    return rows, next_cursor
@@ -0,0 +1,101 @@
+# app/workers/email_worker.py
+#
+# Email outbox senders. Run in-process (see settings.email_senders_in_process)
+# or standalone:
+#
+#   python -m app.workers.email_worker --senders 2
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import smtplib
+
+from app.core.config import settings
+from app.services import email_outbox
+from app.utils.email_utils import build_message, smtp_pool
+from app.workers.pool import BackgroundPool, run_until_signalled
+
+log = logging.getLogger(__name__)
+
+
+def _permanent(e: Exception) -> bool:
+    # 5xx replies and refused recipients will not get better on retry
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+
+
+async def send_batch(batch: list[dict], sender_id: str) -> None:
+    """
+    Deliver a claimed batch over one pooled connection, reconnecting if
+    the server drops it midway.
+    """
+    server = None
+    for msg in batch:
+        if msg["attempts"] > settings.email_max_attempts:
+            # lease ran out on the last attempt (sender crash or hang)
+            await email_outbox.mark_failed(msg, sender_id, "Lease expired", retry=False)
+            continue
+        message = build_message(msg["to"], msg["subject"], msg["body"])
+        # a pooled connection the server closed while it sat idle is
+        # replaced and the message resent once right away, without
+        # spending one of its attempts
+        for resend in (False, True):
+            try:
+                if server is None:
+                    server = await smtp_pool.acquire()
+                await smtp_pool.send(server, msg["to"], message)
+            except (smtplib.SMTPException, OSError) as e:
+                # a refused recipient leaves the connection usable
+                if server is not None and not isinstance(e, smtplib.SMTPRecipientsRefused):
+                    smtp_pool.discard(server)
+                    server = None
+                if isinstance(e, smtplib.SMTPServerDisconnected) and not resend:
+                    log.info("SMTP connection dropped, resending mail %s", msg["_id"])
+                    continue
+                log.warning("sending mail %s failed: %r", msg["_id"], e)
+                await email_outbox.mark_failed(msg, sender_id, repr(e), retry=not _permanent(e))
+            else:
+                await email_outbox.mark_sent(msg, sender_id)
+            break
+    if server is not None:
+        smtp_pool.release(server)
+
+
+async def run_sender(sender_id: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            batch = await email_outbox.claim_batch(sender_id, settings.email_batch_size)
+        except Exception:
+            log.exception("sender %s could not claim mail", sender_id)
+            batch = []
+        if not batch:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), settings.email_poll_interval_seconds)
+            continue
+        await send_batch(batch, sender_id)
+
+
+class SenderPool(BackgroundPool):
+    """
+    A fixed number of sender loops sharing one event loop and SMTP pool.
+    """
+    def __init__(self, size: int):
+        super().__init__(run_sender, size)
+
+    async def stop(self) -> None:
+        await super().stop()
+        smtp_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Send queued email.")
+    parser.add_argument("--senders", type=int, default=2, help="concurrent senders in this process")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_until_signalled(SenderPool(args.senders), "email senders"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# app/workers/pool.py
+#
+# What the background workers share: a fixed number of copies of one loop
+# on the running event loop, and running a pool standalone until SIGINT or
+# SIGTERM.
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+# run(loop_id, stop): loops until `stop` is set
+LoopFn = Callable[[str, asyncio.Event], Awaitable[None]]
+
+
+class BackgroundPool:
+    """
+    `size` copies of `run` sharing one event loop. Each copy gets an id
+    that is unique across hosts and processes (it is what leases record).
+    """
+    def __init__(self, run: LoopFn, size: int):
+        self.size = size
+        self._run = run
+        self._stop = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def start(self) -> None:
+        for i in range(self.size):
+            self._tasks.append(asyncio.create_task(self._run(f"{self._prefix}:{i}", self._stop)))
+
+    async def stop(self) -> None:
+        # let the work in hand finish; anything unfinished is picked up
+        # again elsewhere once its lease expires
+        self._stop.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+async def run_until_signalled(pool: BackgroundPool, what: str) -> None:
+    """Run `pool` in this process until SIGINT or SIGTERM."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    pool.start()
+    log.info("started %d %s", pool.size, what)
+    await stop.wait()
+    await pool.stop()
@@ -0,0 +1,91 @@
+# app/workers/summarize_worker.py
+#
+# Background summarization workers. Run in-process (see
+# settings.job_workers_in_process) or standalone:
+#
+#   python -m app.workers.summarize_worker --workers 4
+
+import argparse
+import asyncio
+import contextlib
+import logging
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.db import db
+from app.services import job_queue
+from app.services.summary_service import PageSelection, create_summary
+from app.workers.pool import BackgroundPool, run_until_signalled
+
+log = logging.getLogger(__name__)
+
+
+async def _keep_lease(job_id, worker_id: str) -> None:
+    # renew well before the lease runs out
+    while True:
+        await asyncio.sleep(settings.job_lease_seconds / 3)
+        if not await job_queue.renew_lease(job_id, worker_id):
+            return
+
+
+async def process_job(job: dict, worker_id: str) -> None:
+    if job["attempts"] > settings.job_max_attempts:
+        # lease ran out on the last attempt (worker crash or hang)
+        await job_queue.fail_job(job, worker_id, "Lease expired", retry=False)
+        return
+
+    lease = asyncio.create_task(_keep_lease(job["_id"], worker_id))
+    try:
+        doc = await db.documents.find_one({
+            "_id": job["doc_id"],
+            "user_email": job["user_email"],
+        })
+        if not doc:
+            await job_queue.fail_job(job, worker_id, "Document not found", retry=False)
+            return
+        selection = PageSelection(**job["selection"]) if job.get("selection") else None
+        rec = await create_summary(job["user_email"], doc, job["mode"], job.get("folder_id"), selection)
+        await job_queue.complete_job(job["_id"], worker_id, rec["_id"])
+    except HTTPException as e:
+        # problems with the input, retrying will not help
+        await job_queue.fail_job(job, worker_id, str(e.detail), retry=False)
+    except Exception as e:
+        log.exception("job %s failed", job["_id"])
+        await job_queue.fail_job(job, worker_id, repr(e))
+    finally:
+        lease.cancel()
+
+
+async def run_worker(worker_id: str, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            job = await job_queue.claim_job(worker_id)
+        except Exception:
+            log.exception("worker %s could not claim a job", worker_id)
+            job = None
+        if job is None:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), settings.job_poll_interval_seconds)
+            continue
+        await process_job(job, worker_id)
+
+
+class WorkerPool(BackgroundPool):
+    """
+    A fixed number of worker loops sharing one event loop.
+    """
+    def __init__(self, size: int):
+        super().__init__(run_worker, size)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background summarization workers.")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent jobs in this process")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_until_signalled(WorkerPool(args.workers), "summarize workers"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# benchmarks/bench_api.py
+#
+# End-to-end API throughput: N virtual users concurrently run the common
+# flow (upload -> summarize -> list summaries -> create folder -> move the
+# summary into it -> list the folder) against the app in-process, with the
+# fake LLM standing in for Groq so runs are repeatable.
+#
+#   python -m benchmarks.bench_api --mongo-uri mongodb://localhost:27017 --users 20
+#   python -m benchmarks.bench_api --in-memory --users 5 --llm-latency-ms 500
+#
+# --in-memory needs mongomock-motor (pip install mongomock-motor); it is
+# good for smoke-testing the script, not for comparing numbers with Mongo.
+
+import argparse
+import asyncio
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.common import emit, latency_summary, report
+from benchmarks.corpus import build_corpus
+
+STEPS = ["upload", "summarize", "list_summaries", "create_folder", "move_to_folder", "list_folder"]
+
+MIME = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+def _use_in_memory_mongo() -> None:
+    try:
+        import mongomock.collection
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--in-memory needs mongomock-motor: pip install mongomock-motor")
+
+    import app.core.db
+    app.core.db.AsyncIOMotorClient = AsyncMongoMockClient
+
+    # mongomock does not know the `sort` argument pymongo 4.x passes to
+    # bulk replace/update/delete operations
+    for name in ("add_replace", "add_update", "add_delete"):
+        original = getattr(mongomock.collection.BulkOperationBuilder, name, None)
+        if original is not None:
+            def without_sort(self, *args, _original=original, **kwargs):
+                kwargs.pop("sort", None)
+                return _original(self, *args, **kwargs)
+            setattr(mongomock.collection.BulkOperationBuilder, name, without_sort)
+
+
+async def _seed_users(count: int, run: str) -> list[str]:
+    from app.core.db import db
+    from app.core.security import create_access_token, get_password_hash
+
+    hashed = get_password_hash("bench-password")
+    emails = [f"bench-{run}-{i}@example.com" for i in range(count)]
+    await db.users.insert_many([
+        {"email": e, "hashed_password": hashed, "is_verified": True,
+         "first_name": "Bench", "last_name": str(i)}
+        for i, e in enumerate(emails)
+    ])
+    return [create_access_token(e) for e in emails]
+
+
+async def _cleanup(run: str, started: datetime) -> None:
+    from app.core.db import db
+    from app.services.llm_client import model_name
+    from app.services.storage import release_file
+
+    owner = {"$regex": f"^bench-{run}-"}
+    docs = await db.documents.find(
+        {"user_email": owner}, {"path": 1, "sha256": 1, "storage_key": 1}
+    ).to_list(None)
+    # uploads may share a stored file with each other or with kept data
+    for doc in docs:
+        await release_file(doc["path"], doc.get("storage_key"))
+    await db.users.delete_many({"email": owner})
+    for name in ("documents", "summaries", "folders", "search_entries"):
+        await db[name].delete_many({"user_email": owner})
+
+    # what the run cached about its files: spilled summary bodies, summaries
+    # by the fake model, and extracted text no remaining document uses
+    hashes = list({doc["sha256"] for doc in docs if doc.get("sha256")})
+    await db.text_blobs.delete_many({"doc_id": {"$in": [doc["_id"] for doc in docs]}})
+    await db.summary_cache.delete_many({"content_hash": {"$in": hashes}, "model": model_name()})
+    # chunks are keyed by prompt alone: the fake model's, from this run
+    await db.summary_chunks.delete_many({"model": model_name(), "created_at": {"$gte": started}})
+    in_use = set(await db.documents.distinct("sha256", {"sha256": {"$in": hashes}}))
+    await db.extracted_texts.delete_many({"_id": {"$in": [h for h in hashes if h not in in_use]}})
+
+
+async def _scenario(client, token: str, upload: Path, timings: dict, errors: dict) -> bool:
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def step(name, method, url, **kwargs):
+        start = time.perf_counter()
+        resp = await client.request(method, url, headers=headers, **kwargs)
+        timings[name].append(time.perf_counter() - start)
+        if resp.status_code >= 400:
+            errors[name] += 1
+            return None
+        return resp.json()
+
+    # 1) Upload and summarize
+    with open(upload, "rb") as f:
+        files = {"file": (upload.name, f.read(), MIME[upload.suffix.lower()])}
+    doc = await step("upload", "POST", "/documents/", files=files)
+    if doc is None:
+        return False
+    summary = await step("summarize", "POST", "/ai/summarize", json={"doc_id": doc["id"]})
+    if summary is None:
+        return False
+    if await step("list_summaries", "GET", "/summaries/") is None:
+        return False
+
+    # 2) File the summary into a new folder and read it back
+    folder = await step("create_folder", "POST", "/folders/", json={"name": "Bench"})
+    if folder is None:
+        return False
+    moved = await step("move_to_folder", "PUT", f"/summaries/{summary['id']}/folder",
+                       json={"folder_id": folder["id"]})
+    if moved is None:
+        return False
+    return await step("list_folder", "GET", f"/folders/{folder['id']}/summaries") is not None
+
+
+async def _run(args, upload: Path) -> dict:
+    import httpx
+    from app.main import app
+
+    run = f"{os.getpid()}-{int(time.time())}"
+    started = datetime.utcnow()
+    timings: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+
+    async with app.router.lifespan_context(app):
+        tokens = await _seed_users(args.users, run)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     timeout=None) as client:
+            async def virtual_user(token):
+                done = 0
+                for _ in range(args.iterations):
+                    if await _scenario(client, token, upload, timings, errors):
+                        done += 1
+                return done
+
+            start = time.perf_counter()
+            completed = await asyncio.gather(*(virtual_user(t) for t in tokens))
+            elapsed = time.perf_counter() - start
+        if not args.keep_data:
+            await _cleanup(run, started)
+
+    scenarios = sum(completed)
+    requests = sum(len(v) for v in timings.values())
+    return {
+        "elapsed_sec": round(elapsed, 3),
+        "scenarios_completed": scenarios,
+        "scenarios_per_sec": round(scenarios / elapsed, 2),
+        "requests_per_sec": round(requests / elapsed, 2),
+        "steps": {
+            name: {**latency_summary(timings[name]), "errors": errors[name]}
+            for name in STEPS
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark.")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="scenarios per user")
+    parser.add_argument("--file", help="document to upload (default: generated small.pdf)")
+    parser.add_argument("--corpus-dir", default="bench_corpus")
+    parser.add_argument("--llm-latency-ms", type=int, default=200)
+    parser.add_argument("--mongo-uri", help="database to run against (default: MONGO_URI)")
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock instead of Mongo")
+    parser.add_argument("--keep-data", action="store_true", help="leave the seeded users and data")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    # settings are read at import time, so set them before importing the app
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    if args.in_memory:
+        # change streams, index creation and SMTP are not available here
+        os.environ["USER_CACHE_WATCH"] = "false"
+        os.environ["CREATE_INDEXES_ON_STARTUP"] = "false"
+        os.environ["EMAIL_SENDERS_IN_PROCESS"] = "0"
+        _use_in_memory_mongo()
+
+    upload = Path(args.file) if args.file else build_corpus(Path(args.corpus_dir))[0]
+
+    from app.core.config import settings
+    from app.services.extraction_service import shutdown_pool
+
+    try:
+        results = asyncio.run(_run(args, upload))
+    finally:
+        shutdown_pool()
+
+    emit(report("api", {
+        "users": args.users,
+        "iterations": args.iterations,
+        "file": upload.name,
+        "file_bytes": upload.stat().st_size,
+        "llm_latency_ms": args.llm_latency_ms,
+        "database": "mongomock" if args.in_memory else "mongodb",
+        "llm_max_concurrency": settings.llm_max_concurrency,
+        "extraction_workers": settings.extraction_workers,
+    }, results), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_extract.py
+#
+# Text extraction speed per file type and size: extract_text in-process,
+# and optionally extract_document through the extraction process pool
+# (which also splits big PDFs into page ranges). No database needed:
+#
+#   python -m benchmarks.bench_extract --repeat 5 --pool --out extract.json
+
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.common import emit, latency_summary, report
+from benchmarks.corpus import build_corpus
+
+from app.core.config import settings  # noqa: E402
+from app.services.extraction_service import extract_document, shutdown_pool  # noqa: E402
+from app.utils.file_utils import PAGE_BREAK, extract_text  # noqa: E402
+
+
+def _row(path: Path, timings: list[float], text: str, pages: int | None) -> dict:
+    size = path.stat().st_size
+    median = statistics.median(timings)
+    row = {
+        "file": path.name,
+        "ext": path.suffix.lower(),
+        "bytes": size,
+        "chars": len(text),
+        **latency_summary(timings),
+        "mb_per_sec": round(size / median / 1e6, 2) if median else None,
+    }
+    if pages is not None:
+        row["pages"] = pages
+    return row
+
+
+def bench_inline(files: list[Path], repeat: int) -> list[dict]:
+    rows = []
+    for path in files:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = extract_text(path)
+            timings.append(time.perf_counter() - start)
+        rows.append(_row(path, timings, text, None))
+    return rows
+
+
+async def bench_pool(files: list[Path], repeat: int) -> list[dict]:
+    # one throwaway call so process start-up is not measured
+    await extract_document(files[0])
+    rows = []
+    for path in files:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pages = await extract_document(path)
+            timings.append(time.perf_counter() - start)
+        rows.append(_row(path, timings, PAGE_BREAK.join(pages), len(pages)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Text extraction benchmark.")
+    parser.add_argument("--dir", default="bench_corpus", help="corpus directory (built if missing)")
+    parser.add_argument("--from-uploads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--pool", action="store_true", help="also time the extraction process pool")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    files = build_corpus(Path(args.dir), from_uploads=args.from_uploads)
+    results = {"extract_text": bench_inline(files, args.repeat)}
+    if args.pool:
+        try:
+            results["extract_document"] = asyncio.run(bench_pool(files, args.repeat))
+        finally:
+            shutdown_pool()
+
+    emit(report("extract", {
+        "repeat": args.repeat,
+        "extraction_workers": settings.extraction_workers,
+        "extraction_pages_per_task": settings.extraction_pages_per_task,
+    }, results), args.out)
+
+
+if __name__ == "__main__":
+    main()
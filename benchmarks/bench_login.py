@@ -0,0 +1,94 @@
+# benchmarks/bench_login.py
+#
+# Login throughput and event-loop latency with bcrypt verification run
+# inline in the handler (old behaviour) versus in the bounded KDF pool.
+# No database needed:
+#
+#   python -m benchmarks.bench_login --logins 200 --concurrency 50 --out login.json
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.common import emit, percentile, report
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import check_password, get_password_hash, verify_password  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+async def _probe(stop: asyncio.Event, lags: list[float], interval: float = 0.01):
+    # how late does a 10 ms timer fire? stands in for "any other request"
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def _run(mode: str, hashed: str, logins: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with sem:
+            if mode == "inline":
+                assert verify_password(PASSWORD, hashed)
+            else:
+                try:
+                    ok, _ = await check_password(PASSWORD, hashed)
+                    assert ok
+                except HTTPException:
+                    rejected += 1
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "concurrency": concurrency,
+        "rejected_503": rejected,
+        "seconds": round(elapsed, 3),
+        "logins_per_sec": round((logins - rejected) / elapsed, 1),
+        "loop_lag_ms": {
+            "p50": round(statistics.median(lags), 2) if lags else 0.0,
+            "p99": round(percentile(lags, 99), 2),
+            "max": round(max(lags), 2) if lags else 0.0,
+        },
+    }
+
+
+async def main_async(args) -> dict:
+    hashed = get_password_hash(PASSWORD)
+    results = [await _run(mode, hashed, args.logins, args.concurrency)
+               for mode in ("inline", "executor")]
+    return report("login", {
+        "bcrypt_rounds": settings.bcrypt_rounds,
+        "kdf_max_workers": settings.kdf_max_workers,
+        "kdf_max_queue": settings.kdf_max_queue,
+    }, results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Login throughput benchmark.")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    emit(asyncio.run(main_async(args)), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/bench_serialize.py
+#
+# Summary listing serialization at 1k / 10k / 100k rows, database left
+# out: the same rows (shaped like Motor returns them) go through
+#
+#   models  - a SummarizeOut per row, then response_model validation and
+#             encoding (how list routes worked before FastJSONResponse)
+#   fast    - summaries_response: rows straight to JSON
+#   ndjson  - export_summaries' output format, streamed in batches
+#
+# each behind a real FastAPI route, called over ASGI with the body
+# discarded as it is sent. --memory adds the peak memory allocated while
+# answering one request (tracemalloc; slow).
+#
+#   python -m benchmarks.bench_serialize --rows 1000 10000 100000 --out serialize.json
+
+import argparse
+import asyncio
+import gc
+import random
+import string
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import emit, latency_summary, report
+
+from bson import ObjectId  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.schemas.ai import SummarizeOut  # noqa: E402
+from app.services.summary_service import summaries_out, summaries_response, summary_row  # noqa: E402
+from app.utils import fast_json  # noqa: E402
+from app.utils.fast_json import ndjson_stream  # noqa: E402
+
+NDJSON_BATCH = 500
+
+
+def make_rows(count: int, summary_chars: int, seed: int = 0) -> list[dict]:
+    rnd = random.Random(seed)
+    words = ["".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(2, 9))) for _ in range(500)]
+    now = datetime(2025, 1, 1)
+    folders = [ObjectId() for _ in range(5)]
+    rows = []
+    for i in range(count):
+        text = ""
+        while len(text) < summary_chars:
+            text += rnd.choice(words) + " "
+        row = {
+            "_id": ObjectId(),
+            "doc_id": ObjectId(),
+            "filename": f"document-{i}.pdf",
+            "mode": rnd.choice(["concise", "standard", "detailed"]),
+            "summary": text[:summary_chars],
+            "created_at": now - timedelta(seconds=i, milliseconds=rnd.randint(0, 999)),
+        }
+        if i % 3 == 0:
+            row["folder_id"] = rnd.choice(folders)
+        if i % 10 == 0:
+            row["pages"] = {"start": 1, "end": rnd.randint(1, 40)}
+        rows.append(row)
+    return rows
+
+
+def build_app(rows: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/models", response_model=list[SummarizeOut])
+    async def models():
+        return await summaries_out(rows)
+
+    @app.get("/fast", response_model=list[SummarizeOut])
+    async def fast():
+        return await summaries_response(rows)
+
+    @app.get("/ndjson")
+    async def ndjson():
+        async def batches():
+            for i in range(0, len(rows), NDJSON_BATCH):
+                yield [summary_row(rec) for rec in rows[i:i + NDJSON_BATCH]]
+        return ndjson_stream(batches())
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> int:
+    """GET `path` straight over ASGI; returns the body size (not kept)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    size = 0
+    status = None
+    requested = False
+    finished = asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # streaming responses listen for a disconnect until they are done
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal size, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    finished.set()
+    if status != 200:
+        raise RuntimeError(f"{path} answered {status}")
+    return size
+
+
+async def bench_size(count: int, summary_chars: int, repeat: int, memory: bool) -> dict:
+    rows = make_rows(count, summary_chars)
+    app = build_app(rows)
+    results = {}
+    for path in ("/models", "/fast", "/ndjson"):
+        # warm-up, and the response size
+        size = await call(app, path)
+        wall, cpu = [], []
+        for _ in range(repeat):
+            gc.collect()
+            w, c = time.perf_counter(), time.process_time()
+            await call(app, path)
+            cpu.append(time.process_time() - c)
+            wall.append(time.perf_counter() - w)
+        result = {
+            "response_bytes": size,
+            "wall": latency_summary(wall),
+            "cpu": latency_summary(cpu),
+            "rows_per_cpu_sec": round(count / (sum(cpu) / len(cpu))) if sum(cpu) else None,
+        }
+        if memory:
+            gc.collect()
+            tracemalloc.start()
+            await call(app, path)
+            result["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+            tracemalloc.stop()
+        results[path.lstrip("/")] = result
+    speedup = results["models"]["cpu"]["p50_ms"] / max(results["fast"]["cpu"]["p50_ms"], 1e-9)
+    return {"rows": count, "fast_cpu_speedup": round(speedup, 1), "paths": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summary listing serialization benchmark.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--summary-chars", type=int, default=800,
+                        help="length of each summary body (preview listings send 200)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--memory", action="store_true", help="also measure peak allocations")
+    parser.add_argument("--out", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    async def run():
+        return [
+            await bench_size(count, args.summary_chars, args.repeat, args.memory)
+            for count in args.rows
+        ]
+
+    params = {
+        "rows": args.rows,
+        "summary_chars": args.summary_chars,
+        "repeat": args.repeat,
+        "json_library": "orjson" if fast_json.orjson is not None else "json",
+    }
+    emit(report("serialize", params, asyncio.run(run())), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/common.py
+#
+# Shared by the benchmark scripts: settings needed to import app modules,
+# percentile helpers and the JSON report envelope.
+
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+# settings needed to import app modules; nothing connects anywhere unless a
+# benchmark asks for it
+for key, value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "JWT_SECRET_KEY": "bench",
+    "MAIL_HOST": "localhost",
+    "MAIL_PORT": "465",
+    "MAIL_USERNAME": "bench@example.com",
+    "MAIL_PASSWORD": "bench",
+    "GROQ_API_KEY": "bench",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def latency_summary(seconds: list[float]) -> dict:
+    """
+    count / p50 / p95 / p99 / max of a list of durations, in milliseconds.
+    """
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def report(benchmark: str, params: dict, results) -> dict:
+    """
+    The envelope every benchmark emits, so runs can be compared over time.
+    """
+    return {
+        "benchmark": benchmark,
+        "git_rev": _git_rev(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+
+
+def emit(data: dict, out: str | None) -> None:
+    text = json.dumps(data, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
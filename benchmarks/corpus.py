@@ -0,0 +1,109 @@
+# benchmarks/corpus.py
+#
+# A reproducible corpus of PDF / DOCX / PPTX files in graded sizes, filled
+# with seeded pseudo-text, optionally topped up with real files:
+#
+#   python -m benchmarks.corpus --dir bench_corpus
+#   python -m benchmarks.corpus --dir bench_corpus --from-uploads 5
+
+import argparse
+import random
+import shutil
+from pathlib import Path
+
+import docx
+import pptx
+import pymupdf
+
+# pages (PDF), paragraph pages (DOCX) or slides (PPTX) per size
+SIZES = {"small": 2, "medium": 20, "large": 200}
+WORDS_PER_PAGE = 350
+
+_VOCAB = (
+    "lecture theorem proof data model system network memory process thread "
+    "algorithm complexity graph tree search sort matrix vector function "
+    "integral derivative limit series probability variable sample estimate "
+    "database index query transaction schema protocol packet layer security "
+    "energy force mass velocity reaction molecule cell gene evolution market"
+).split()
+
+
+def _page_text(rng: random.Random, words: int) -> list[str]:
+    # paragraphs of 40-80 words
+    paras = []
+    while words > 0:
+        n = min(words, rng.randint(40, 80))
+        paras.append(" ".join(rng.choice(_VOCAB) for _ in range(n)).capitalize() + ".")
+        words -= n
+    return paras
+
+
+def make_pdf(path: Path, pages: int, rng: random.Random) -> None:
+    doc = pymupdf.open()
+    for i in range(pages):
+        page = doc.new_page()
+        text = f"Section {i + 1}\n\n" + "\n\n".join(_page_text(rng, WORDS_PER_PAGE))
+        page.insert_textbox(pymupdf.Rect(50, 50, 545, 792), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def make_docx(path: Path, pages: int, rng: random.Random) -> None:
+    d = docx.Document()
+    for i in range(pages):
+        d.add_heading(f"Section {i + 1}", level=1)
+        for para in _page_text(rng, WORDS_PER_PAGE):
+            d.add_paragraph(para)
+    d.save(path)
+
+
+def make_pptx(path: Path, slides: int, rng: random.Random) -> None:
+    p = pptx.Presentation()
+    layout = p.slide_layouts[1]  # title and content
+    for i in range(slides):
+        slide = p.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i + 1}"
+        slide.placeholders[1].text = "\n".join(_page_text(rng, WORDS_PER_PAGE // 4))
+    p.save(path)
+
+
+MAKERS = {".pdf": make_pdf, ".docx": make_docx, ".pptx": make_pptx}
+
+
+def build_corpus(directory: Path, seed: int = 0, from_uploads: int = 0) -> list[Path]:
+    """
+    Generate (or reuse, if already there) every type x size file in
+    `directory`, plus up to `from_uploads` files copied from uploads/.
+    Returns the paths, generated ones first.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for ext, make in MAKERS.items():
+        for size, pages in SIZES.items():
+            path = directory / f"{size}{ext}"
+            if not path.exists():
+                make(path, pages, random.Random(f"{seed}:{size}{ext}"))
+            files.append(path)
+
+    uploads = sorted(p for p in Path("uploads").glob("*") if p.suffix.lower() in MAKERS)
+    for src in uploads[:from_uploads]:
+        dst = directory / f"upload-{src.name}"
+        if not dst.exists():
+            shutil.copyfile(src, dst)
+        files.append(dst)
+    return files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the benchmark corpus.")
+    parser.add_argument("--dir", default="bench_corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--from-uploads", type=int, default=0,
+                        help="also copy this many real files from uploads/")
+    args = parser.parse_args()
+    for path in build_corpus(Path(args.dir), args.seed, args.from_uploads):
+        print(f"{path.stat().st_size:>12,}  {path}")
+
+
+if __name__ == "__main__":
+    main()
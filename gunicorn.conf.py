@@ -0,0 +1,41 @@
+# gunicorn.conf.py
+#
+# Multi-worker run: gunicorn app.main:app -c gunicorn.conf.py
+#
+# Every worker is a separate process with its own Motor client, caches,
+# extraction pool and in-process job / email workers; anything that must be
+# shared between workers lives in MongoDB.
+
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# the app is imported in each worker after the fork, so no Mongo client or
+# process pool is ever inherited from the master
+preload_app = False
+
+# summaries of long documents can keep a request busy for a while
+timeout = 180
+graceful_timeout = 30
+keepalive = 5
+
+# Prometheus multiprocess mode: workers write samples to files here so a
+# scrape of any worker reports all of them. Must be set before the app (and
+# prometheus_client) is imported, i.e. in the master.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/diploma-prometheus")
+
+
+def on_starting(server):
+    # samples of a previous run would be summed into this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,218 @@
+# tests/conftest.py
+#
+# The app against an in-memory MongoDB (mongomock), no server needed:
+#
+#   pip install -r requirements-dev.txt
+#   python -m pytest tests
+#
+# Each test gets one mongomock database and loads the app from scratch on
+# it (its own module state, caches and client), so `make_app()` twice
+# gives two instances sharing one database, as two workers would.
+
+import importlib
+import itertools
+import os
+import sys
+from types import SimpleNamespace
+
+for key, value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "JWT_SECRET_KEY": "test-secret",
+    "MAIL_HOST": "localhost",
+    "MAIL_PORT": "465",
+    "MAIL_USERNAME": "noreply@example.com",
+    "MAIL_PASSWORD": "x",
+    "GROQ_API_KEY": "x",
+    "LLM_BACKEND": "fake",
+    "BCRYPT_ROUNDS": "4",
+    # X-DB-Ops on every response
+    "DEBUG": "true",
+    # mongomock has no change streams; nothing is sent from tests
+    "USER_CACHE_WATCH": "false",
+    "EMAIL_SENDERS_IN_PROCESS": "0",
+    "METRICS_ENABLED": "false",
+}.items():
+    os.environ.setdefault(key, value)
+
+import mongomock
+import mongomock.collection
+import mongomock_motor
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+# pymongo passes `sort` to bulk update / replace operations; mongomock's
+# builder does not take it (the tests never rely on it)
+for _name in ("add_update", "add_replace", "add_delete"):
+    def _without_sort(self, *args, _orig=getattr(mongomock.collection.BulkOperationBuilder, _name), **kwargs):
+        kwargs.pop("sort", None)
+        return _orig(self, *args, **kwargs)
+    setattr(mongomock.collection.BulkOperationBuilder, _name, _without_sort)
+
+
+# mongomock never talks to pymongo's command listeners, which is what
+# app.core.db_stats counts. The mock collections below tell them about one
+# command per call the way a server round trip would: one per write, one
+# per bulk write and kind of operation in it, and one when a cursor first
+# fetches (results here always fit the first batch).
+
+_request_ids = itertools.count(1)
+
+_COMMANDS = {
+    "find_one": "find",
+    "count_documents": "aggregate",
+    "estimated_document_count": "count",
+    "distinct": "distinct",
+    "insert_one": "insert",
+    "insert_many": "insert",
+    "update_one": "update",
+    "update_many": "update",
+    "replace_one": "update",
+    "delete_one": "delete",
+    "delete_many": "delete",
+    "find_one_and_update": "findAndModify",
+    "find_one_and_replace": "findAndModify",
+    "find_one_and_delete": "findAndModify",
+    "create_indexes": "createIndexes",
+    "drop_index": "dropIndexes",
+}
+
+_BULK_COMMANDS = {
+    "InsertOne": "insert",
+    "UpdateOne": "update",
+    "UpdateMany": "update",
+    "ReplaceOne": "update",
+    "DeleteOne": "delete",
+    "DeleteMany": "delete",
+}
+
+
+def _publish(collection, command: str) -> None:
+    client = collection.database.client
+    event = SimpleNamespace(
+        command_name=command,
+        command={command: collection.name},
+        request_id=next(_request_ids),
+        duration_micros=0,
+    )
+    # a plain AsyncMongoMockClient has none (and would read the attribute
+    # as a database name)
+    for listener in vars(client).get("event_listeners", ()):
+        listener.started(event)
+        listener.succeeded(event)
+
+
+def _counted(method, command: str):
+    async def wrapper(self, *args, **kwargs):
+        _publish(self, command)
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+async def _bulk_write(self, requests, *args, _orig=mongomock_motor.AsyncMongoMockCollection.bulk_write, **kwargs):
+    for command in dict.fromkeys(_BULK_COMMANDS[type(r).__name__] for r in requests):
+        _publish(self, command)
+    return await _orig(self, requests, *args, **kwargs)
+
+
+def _cursor_factory(method, command: str):
+    def wrapper(self, *args, **kwargs):
+        cursor = method(self, *args, **kwargs)
+        cursor.__dict__["_first_fetch"] = lambda: _publish(self, command)
+        return cursor
+    return wrapper
+
+
+def _fetching(method):
+    async def wrapper(self, *args, **kwargs):
+        first_fetch = self.__dict__.pop("_first_fetch", None)
+        if first_fetch:
+            first_fetch()
+        return await method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name, _command in _COMMANDS.items():
+    setattr(
+        mongomock_motor.AsyncMongoMockCollection, _name,
+        _counted(getattr(mongomock_motor.AsyncMongoMockCollection, _name), _command),
+    )
+mongomock_motor.AsyncMongoMockCollection.bulk_write = _bulk_write
+mongomock_motor.AsyncMongoMockCollection.find = _cursor_factory(mongomock_motor.AsyncMongoMockCollection.find, "find")
+mongomock_motor.AsyncMongoMockCollection.aggregate = _cursor_factory(
+    mongomock_motor.AsyncMongoMockCollection.aggregate, "aggregate"
+)
+for _cls in (mongomock_motor.AsyncCursor, mongomock_motor.AsyncLatentCommandCursor):
+    _cls.next = _cls.__anext__ = _fetching(_cls.next)
+    _cls.to_list = _fetching(_cls.to_list)
+
+
+class MockMotorClient(AsyncMongoMockClient):
+    """An AsyncMongoMockClient that keeps the command listeners it is given."""
+
+    def __init__(self, *args, event_listeners=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.event_listeners = list(event_listeners)
+
+
+# shared by every instance: prometheus metrics can only be registered once
+_SHARED_MODULES = {"app.core.metrics"}
+
+
+def _app_modules() -> list[str]:
+    return [
+        name for name in sys.modules
+        if (name == "app" or name.startswith("app.")) and name not in _SHARED_MODULES
+    ]
+
+
+def load_app(mongo: mongomock.MongoClient):
+    """
+    Import a fresh copy of the app whose Motor client uses `mongo`. Its
+    modules replace the ones imported before in sys.modules (the
+    extraction pool pickles functions by module name).
+    """
+    for name in _app_modules():
+        del sys.modules[name]
+    main = importlib.import_module("app.main")
+    db_module = sys.modules["app.core.db"]
+    db_stats = sys.modules["app.core.db_stats"]
+    db_module._client = MockMotorClient(
+        mock_mongo_client=mongo, event_listeners=[db_stats.DbOpCounter()]
+    )
+    db_module._client_pid = os.getpid()
+    return main.app
+
+
+@pytest.fixture
+def anyio_backend():
+    # async tests (pytest.mark.anyio) run on asyncio, like the app
+    return "asyncio"
+
+
+@pytest.fixture
+def mongo():
+    """One in-memory MongoDB for the test."""
+    return mongomock.MongoClient()
+
+
+@pytest.fixture
+def make_app(mongo):
+    """Load another app instance on the test's database."""
+    return lambda: load_app(mongo)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def modules(make_app):
+    """
+    Import app modules from a fresh instance on the test's database, e.g.
+    modules("app.services.job_queue"). Modules imported at the top of a
+    test file belong to an earlier instance; only use those for code that
+    never touches the database.
+    """
+    make_app()
+    return importlib.import_module
@@ -0,0 +1,88 @@
+# tests/test_chunking.py
+
+import random
+import string
+
+from app.services.summarization_engine import _group, chunk_text
+from app.utils.file_utils import PAGE_BREAK
+
+# chunk_text works in characters: CHARS_PER_TOKEN (4) per token
+MAX_TOKENS = 50
+MAX_CHARS = 200
+
+
+def _words(count: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    return " ".join(
+        "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 8))) for _ in range(count)
+    )
+
+
+def _paragraph(chars: int, seed: int = 0) -> str:
+    return _words(chars, seed)[:chars].strip()
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("A short page.", MAX_TOKENS) == ["A short page."]
+
+
+def test_chunks_fit_and_keep_all_text():
+    text = "\n\n".join(_paragraph(70, seed) for seed in range(20))
+    chunks = chunk_text(text, MAX_TOKENS)
+    assert len(chunks) > 1
+    assert all(len(c) <= MAX_CHARS for c in chunks)
+    assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+
+def test_pages_that_fit_are_never_split():
+    pages = [_paragraph(90, seed) for seed in range(6)]
+    chunks = chunk_text(PAGE_BREAK.join(pages), MAX_TOKENS)
+    for page in pages:
+        assert any(page in chunk for chunk in chunks)
+
+
+def test_overlong_line_is_hard_split():
+    line = "x" * (MAX_CHARS * 3)
+    chunks = chunk_text(line, MAX_TOKENS)
+    assert all(len(c) <= MAX_CHARS for c in chunks)
+    assert "".join(chunks) == line
+
+
+def test_heading_starts_a_chunk_once_the_current_one_is_half_full():
+    intro = [_paragraph(60, 1), _paragraph(60, 2)]
+    methods = "2. Methods of the study\n" + _paragraph(40, 3)
+    text = "\n\n".join([*intro, methods, _paragraph(60, 4)])
+    chunks = chunk_text(text, MAX_TOKENS)
+    assert chunks[0] == "\n\n".join(intro)
+    assert chunks[1].startswith("2. Methods")
+
+
+def test_heading_in_a_nearly_empty_chunk_does_not_split():
+    text = "\n\n".join([_paragraph(40, 1), "# Results\n" + _paragraph(60, 2), _paragraph(60, 3)])
+    chunks = chunk_text(text, MAX_TOKENS)
+    assert "# Results" in chunks[0]
+    assert not chunks[0].startswith("# Results")
+
+
+def test_each_chunk_starts_with_the_end_of_the_previous_one():
+    text = "\n\n".join(_paragraph(70, seed) for seed in range(12))
+    chunks = chunk_text(text, MAX_TOKENS, overlap_tokens=10)
+    assert len(chunks) > 2
+    for previous, chunk in zip(chunks, chunks[1:]):
+        overlap = chunk.split("\n\n", 1)[0]
+        assert 0 < len(overlap) <= 40
+        assert previous.endswith(overlap)
+        # on a word boundary
+        assert previous[-len(overlap) - 1] in " \n"
+
+
+def test_overlap_is_capped_at_a_quarter_of_the_chunk():
+    text = "\n\n".join(_paragraph(70, seed) for seed in range(12))
+    for chunk in chunk_text(text, MAX_TOKENS, overlap_tokens=1000)[1:]:
+        assert len(chunk.split("\n\n", 1)[0]) <= MAX_CHARS // 4
+
+
+def test_reduce_groups_always_shrink():
+    groups = _group(["x" * 150] * 5, max_chars=100)
+    assert all(len(g) >= 2 for g in groups)
+    assert sum(len(g) for g in groups) == 5
@@ -0,0 +1,139 @@
+# tests/test_db_budgets.py
+#
+# Every route in ROUTE_DB_BUDGETS, called once on a cold app (nothing
+# cached) with data that takes its most expensive path: summaries in
+# folders, one with a spilled body, a document whose outline was never
+# read. The app reports its Mongo round trips in X-DB-Ops (debug mode).
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.core.db import DB_NAME
+from app.core.db_stats import ROUTE_DB_BUDGETS
+from app.core.security import create_access_token
+from app.services.text_store import compress
+
+EMAIL = "budget@example.com"
+
+# route -> (query string, JSON body); ids in the path and body are filled
+# from the seeded records
+REQUESTS = {
+    ("GET", "/users/me"): ("", None),
+    ("PUT", "/users/me"): ("", {"first_name": "Ada", "last_name": "Lovelace"}),
+    ("GET", "/documents/"): ("", None),
+    ("GET", "/documents/{doc_id}/content"): ("", None),
+    ("GET", "/documents/{doc_id}/outline"): ("", None),
+    ("GET", "/documents/{doc_id}/summaries"): ("", None),
+    ("DELETE", "/documents/{doc_id}"): ("?cascade=true", None),
+    ("GET", "/summaries/"): ("", None),
+    ("GET", "/summaries/{summary_id}"): ("", None),
+    ("PUT", "/summaries/{summary_id}/folder"): ("", {"folder_id": "{other_folder_id}"}),
+    ("PUT", "/summaries/{summary_id}/note"): ("", {"note": "remember this"}),
+    ("DELETE", "/summaries/{summary_id}"): ("", None),
+    ("POST", "/summaries/bulk/folder"): (
+        "", {"summary_ids": ["{summary_id}", "{plain_summary_id}"], "folder_id": "{other_folder_id}"},
+    ),
+    ("POST", "/summaries/bulk/delete"): ("", {"summary_ids": ["{summary_id}", "{plain_summary_id}"]}),
+    ("GET", "/folders/"): ("", None),
+    ("GET", "/folders/overview"): ("", None),
+    ("POST", "/folders/"): ("", {"name": "New folder"}),
+    ("PUT", "/folders/{folder_id}"): ("", {"name": "Renamed"}),
+    ("DELETE", "/folders/{folder_id}"): ("", None),
+    ("GET", "/folders/{folder_id}/summaries"): ("", None),
+    ("DELETE", "/folders/{folder_id}/summaries/{summary_id}"): ("", None),
+    ("GET", "/ai/jobs/{job_id}"): ("", None),
+    ("GET", "/search"): ("?q=budget", None),
+}
+
+# mongomock cannot run these routes' queries
+UNSUPPORTED = {
+    ("GET", "/search"): "mongomock has no $text",
+}
+
+
+def _fill(value, ids: dict):
+    if isinstance(value, str):
+        return value.format(**ids)
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    return value
+
+
+@pytest.fixture
+def seeded(mongo, tmp_path) -> dict:
+    """Records for every route to find; returns their ids as strings."""
+    database = mongo[DB_NAME]
+    now = datetime.utcnow()
+    ids = {
+        "doc_id": ObjectId(),
+        "folder_id": ObjectId(),
+        "other_folder_id": ObjectId(),
+        "summary_id": ObjectId(),
+        "plain_summary_id": ObjectId(),
+        "job_id": ObjectId(),
+    }
+    path = tmp_path / "notes.txt"
+    path.write_text("budget " * 100)
+    sha256 = "0" * 64
+
+    database.users.insert_one({
+        "email": EMAIL, "hashed_password": "x", "is_verified": True,
+        "first_name": "User", "last_name": "User",
+    })
+    database.folders.insert_many([
+        {"_id": ids["folder_id"], "user_email": EMAIL, "name": "Reading",
+         "created_at": now, "summary_count": 2, "updated_at": now},
+        {"_id": ids["other_folder_id"], "user_email": EMAIL, "name": "Archive",
+         "created_at": now, "summary_count": 0, "updated_at": now},
+    ])
+    database.documents.insert_one({
+        "_id": ids["doc_id"], "user_email": EMAIL, "filename": "notes.txt",
+        "path": str(path), "sha256": sha256, "size": path.stat().st_size, "upload_date": now,
+    })
+    database.files.insert_one({"_id": str(path), "sha256": sha256, "refs": 1})
+    summary = {
+        "user_email": EMAIL, "doc_id": ids["doc_id"], "filename": "notes.txt",
+        "mode": "standard", "folder_id": ids["folder_id"],
+    }
+    database.summaries.insert_many([
+        # spilled body: one more query to read or delete it
+        {**summary, "_id": ids["summary_id"], "summary_blob": True, "created_at": now},
+        {**summary, "_id": ids["plain_summary_id"], "summary": "Short.",
+         "created_at": now - timedelta(seconds=1)},
+    ])
+    database.text_blobs.insert_one({
+        "_id": ids["summary_id"], "field": "summary", "doc_id": ids["doc_id"],
+        "data": compress("A long summary. " * 5000),
+    })
+    database.jobs.insert_one({
+        "_id": ids["job_id"], "kind": "summarize", "user_email": EMAIL, "doc_id": ids["doc_id"],
+        "mode": "standard", "status": "queued", "attempts": 0,
+        "run_after": now, "created_at": now, "updated_at": now,
+    })
+    return {name: str(oid) for name, oid in ids.items()}
+
+
+def test_every_budget_is_exercised():
+    assert set(REQUESTS) == set(ROUTE_DB_BUDGETS)
+
+
+@pytest.mark.parametrize("route", list(ROUTE_DB_BUDGETS), ids=" ".join)
+def test_route_within_budget(route, app, seeded):
+    if route in UNSUPPORTED:
+        pytest.skip(UNSUPPORTED[route])
+    method, template = route
+    query, body = REQUESTS[route]
+    headers = {"Authorization": f"Bearer {create_access_token(EMAIL)}"}
+
+    with TestClient(app) as client:
+        response = client.request(
+            method, _fill(template, seeded) + query, json=_fill(body, seeded), headers=headers,
+        )
+
+    assert response.status_code < 400, response.text
+    assert int(response.headers["X-DB-Ops"]) <= ROUTE_DB_BUDGETS[route]
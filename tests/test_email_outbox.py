@@ -0,0 +1,194 @@
+# tests/test_email_outbox.py
+#
+# The email outbox and its senders on mongomock, with a fake SMTP pool in
+# place of app.utils.email_utils.smtp_pool: each send raises the next
+# scripted error, or succeeds once there are none left.
+
+import asyncio
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.db import DB_NAME
+
+pytestmark = pytest.mark.anyio
+
+TO = "reader@example.com"
+
+
+class FakeSMTPPool:
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.sent: list[tuple[str, str]] = []
+        self.opened = self.discarded = self.released = 0
+
+    async def acquire(self):
+        self.opened += 1
+        return f"connection {self.opened}"
+
+    async def send(self, server, to_email: str, message: str) -> None:
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((to_email, message))
+
+    def discard(self, server) -> None:
+        self.discarded += 1
+
+    def release(self, server) -> None:
+        self.released += 1
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def outbox(modules):
+    return modules("app.services.email_outbox")
+
+
+@pytest.fixture
+def worker(modules):
+    return modules("app.workers.email_worker")
+
+
+@pytest.fixture
+def mails(mongo):
+    return mongo[DB_NAME].email_outbox
+
+
+@pytest.fixture
+def smtp(worker, monkeypatch):
+    """Install a FakeSMTPPool scripted with the given errors."""
+    def install(*errors: Exception) -> FakeSMTPPool:
+        pool = FakeSMTPPool(*errors)
+        monkeypatch.setattr(worker, "smtp_pool", pool)
+        return pool
+    return install
+
+
+async def _deliver(outbox, worker, sender_id: str = "s1") -> list[dict]:
+    batch = await outbox.claim_batch(sender_id, 10)
+    await worker.send_batch(batch, sender_id)
+    return batch
+
+
+def _make_due(mails, mail_id):
+    mails.update_one({"_id": mail_id}, {"$set": {"run_after": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+async def test_claim_and_mark_sent(outbox, worker, mails, smtp):
+    pool = smtp()
+    first = await outbox.queue_email(TO, "Hello", "First")
+    second = await outbox.queue_email(TO, "Hello", "Second")
+
+    batch = await outbox.claim_batch("s1", 10)
+    assert [m["_id"] for m in batch] == [first["_id"], second["_id"]]
+    assert {(m["status"], m["sender_id"], m["attempts"]) for m in batch} == {(outbox.SENDING, "s1", 1)}
+    assert await outbox.claim_batch("s2", 10) == []
+
+    await worker.send_batch(batch, "s1")
+    for mail in mails.find():
+        assert mail["status"] == outbox.SENT
+        assert mail["sent_at"] is not None
+    assert [to for to, _ in pool.sent] == [TO, TO]
+    # one pooled connection for the whole batch
+    assert (pool.opened, pool.released, pool.discarded) == (1, 1, 0)
+
+
+async def test_claim_batch_respects_size(outbox):
+    for i in range(3):
+        await outbox.queue_email(TO, "Hello", str(i))
+
+    assert len(await outbox.claim_batch("s1", 2)) == 2
+    assert len(await outbox.claim_batch("s2", 2)) == 1
+
+
+async def test_dropped_connection_resends_once(outbox, worker, mails, smtp):
+    pool = smtp(smtplib.SMTPServerDisconnected("idle timeout"))
+    queued = await outbox.queue_email(TO, "Hello", "Body")
+
+    await _deliver(outbox, worker)
+
+    mail = mails.find_one({"_id": queued["_id"]})
+    assert (mail["status"], mail["attempts"]) == (outbox.SENT, 1)
+    assert len(pool.sent) == 1
+    assert (pool.opened, pool.discarded, pool.released) == (2, 1, 1)
+
+
+async def test_second_drop_counts_as_a_failure(outbox, worker, mails, smtp):
+    pool = smtp(smtplib.SMTPServerDisconnected("gone"), smtplib.SMTPServerDisconnected("gone again"))
+    queued = await outbox.queue_email(TO, "Hello", "Body")
+
+    await _deliver(outbox, worker)
+
+    mail = mails.find_one({"_id": queued["_id"]})
+    assert mail["status"] == outbox.QUEUED
+    assert "gone again" in mail["error"]
+    assert mail["run_after"] > datetime.utcnow()
+    assert pool.sent == []
+    assert await outbox.claim_batch("s1", 10) == []
+
+
+async def test_fails_after_max_attempts(outbox, worker, mails, smtp, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "email_max_attempts", 3)
+    smtp(*[smtplib.SMTPConnectError(421, "try later")] * 3)
+    queued = await outbox.queue_email(TO, "Hello", "Body")
+
+    for attempt in range(1, 4):
+        batch = await _deliver(outbox, worker)
+        assert [m["attempts"] for m in batch] == [attempt]
+        _make_due(mails, queued["_id"])
+
+    mail = mails.find_one({"_id": queued["_id"]})
+    assert (mail["status"], mail["attempts"]) == (outbox.FAILED, 3)
+    assert mail["failed_at"] is not None
+    assert "try later" in mail["error"]
+    assert await outbox.claim_batch("s1", 10) == []
+
+
+async def test_permanent_rejection_is_not_retried(outbox, worker, mails, smtp):
+    pool = smtp(smtplib.SMTPRecipientsRefused({TO: (550, b"mailbox unavailable")}))
+    queued = await outbox.queue_email(TO, "Hello", "Body")
+
+    await _deliver(outbox, worker)
+
+    mail = mails.find_one({"_id": queued["_id"]})
+    assert (mail["status"], mail["attempts"]) == (outbox.FAILED, 1)
+    # the connection survives a refused recipient
+    assert (pool.discarded, pool.released) == (0, 1)
+
+
+async def test_expired_lease_is_reclaimed_then_given_up(outbox, worker, mails, smtp, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "email_max_attempts", 1)
+    pool = smtp()
+    queued = await outbox.queue_email(TO, "Hello", "Body")
+    await outbox.claim_batch("s1", 10)
+    # s1 died holding the message
+    mails.update_one({"_id": queued["_id"]}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+    await _deliver(outbox, worker, "s2")
+
+    mail = mails.find_one({"_id": queued["_id"]})
+    assert (mail["status"], mail["sender_id"], mail["error"]) == (outbox.FAILED, "s2", "Lease expired")
+    assert pool.sent == []
+
+
+async def test_sender_pool_delivers_then_stops(outbox, worker, mails, smtp, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "email_poll_interval_seconds", 0.01)
+    pool = smtp()
+    await outbox.queue_email(TO, "Hello", "Body")
+    senders = worker.SenderPool(2)
+
+    senders.start()
+    for _ in range(100):
+        if pool.sent:
+            break
+        await asyncio.sleep(0.01)
+    await senders.stop()
+
+    mail = mails.find_one()
+    assert mail["status"] == outbox.SENT
+    # ids are unique per loop and tell where the loop ran
+    assert mail["sender_id"].endswith((":0", ":1"))
+    assert senders._tasks == []
@@ -0,0 +1,106 @@
+# tests/test_folder_stats.py
+#
+# Per-folder summary counters: adjust_counts after each summary write, and
+# the reconcile job recounting them, including a write racing it.
+
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.core.db import DB_NAME
+from app.services.folder_stats import moved
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "folders@example.com"
+LONG_AGO = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def folder_stats(modules):
+    return modules("app.services.folder_stats")
+
+
+@pytest.fixture
+def folders(mongo):
+    return mongo[DB_NAME].folders
+
+
+def _folder(folders, count: int | None = 0, user_email: str = EMAIL, **fields) -> ObjectId:
+    rec = {"user_email": user_email, "name": "F", "created_at": LONG_AGO, **fields}
+    if count is not None:
+        rec.update(summary_count=count, updated_at=LONG_AGO)
+    return folders.insert_one(rec).inserted_id
+
+
+def _summaries(mongo, folder_id, n: int, created_at: datetime = LONG_AGO) -> None:
+    for _ in range(n):
+        mongo[DB_NAME].summaries.insert_one({
+            "user_email": EMAIL, "folder_id": folder_id, "created_at": created_at,
+        })
+
+
+def test_moved():
+    a, b = ObjectId(), ObjectId()
+
+    assert moved(a, a) == Counter()
+    assert moved(None, b) == Counter({None: -1, b: 1})
+    assert moved(a, b) == Counter({a: -1, b: 1})
+
+
+async def test_adjust_counts(folder_stats, folders):
+    a, b = _folder(folders, 2), _folder(folders, 0)
+    theirs = _folder(folders, 5, user_email="other@example.com")
+
+    await folder_stats.adjust_counts(EMAIL, Counter({a: -1, b: 2, theirs: 1, None: 3}))
+
+    assert folders.find_one({"_id": a})["summary_count"] == 1
+    assert folders.find_one({"_id": b})["summary_count"] == 2
+    assert folders.find_one({"_id": b})["updated_at"] > LONG_AGO
+    assert folders.find_one({"_id": theirs})["summary_count"] == 5
+
+
+async def test_reconcile_fixes_wrong_and_missing_counts(folder_stats, folders, mongo):
+    right, wrong, empty = _folder(folders, 2), _folder(folders, 7), _folder(folders, 0)
+    legacy = _folder(folders, None)  # from before the counters
+    latest = LONG_AGO + timedelta(days=3)
+    _summaries(mongo, right, 2)
+    _summaries(mongo, wrong, 3)
+    _summaries(mongo, legacy, 1, created_at=latest)
+
+    assert await folder_stats.reconcile(settle_seconds=0) == 2
+
+    assert folders.find_one({"_id": right})["summary_count"] == 2
+    assert folders.find_one({"_id": wrong})["summary_count"] == 3
+    assert folders.find_one({"_id": legacy})["summary_count"] == 1
+    assert folders.find_one({"_id": legacy})["updated_at"] == latest
+    assert folders.find_one({"_id": empty})["summary_count"] == 0
+    assert await folder_stats.reconcile(settle_seconds=0) == 0
+
+
+async def test_reconcile_one_user(folder_stats, folders):
+    mine, theirs = _folder(folders, 4), _folder(folders, 4, user_email="other@example.com")
+
+    assert await folder_stats.reconcile(EMAIL, settle_seconds=0) == 1
+
+    assert folders.find_one({"_id": mine})["summary_count"] == 0
+    assert folders.find_one({"_id": theirs})["summary_count"] == 4
+
+
+async def test_reconcile_leaves_a_folder_written_meanwhile(folder_stats, folders, mongo):
+    fid = _folder(folders, 1)
+    _summaries(mongo, fid, 1)
+    # a summary saved just before reconcile counts, its $inc still to come
+    _summaries(mongo, fid, 1)
+
+    async def late_increment():
+        await asyncio.sleep(0.05)
+        await folder_stats.adjust_counts(EMAIL, moved(None, fid))
+
+    fixed, _ = await asyncio.gather(folder_stats.reconcile(settle_seconds=0.2), late_increment())
+
+    assert fixed == 0
+    assert folders.find_one({"_id": fid})["summary_count"] == 2
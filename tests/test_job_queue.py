@@ -0,0 +1,138 @@
+# tests/test_job_queue.py
+#
+# The summarization job queue and its workers on mongomock, with the fake
+# LLM backend answering.
+
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.core.db import DB_NAME
+from app.services.text_store import compress
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "jobs@example.com"
+
+
+@pytest.fixture
+def job_queue(modules):
+    return modules("app.services.job_queue")
+
+
+@pytest.fixture
+def worker(modules):
+    return modules("app.workers.summarize_worker")
+
+
+@pytest.fixture
+def jobs(mongo):
+    return mongo[DB_NAME].jobs
+
+
+@pytest.fixture
+def document(mongo) -> dict:
+    """An uploaded document whose text is already extracted."""
+    database = mongo[DB_NAME]
+    doc = {
+        "_id": ObjectId(), "user_email": EMAIL, "filename": "notes.pdf",
+        "path": "uploads/missing.pdf", "sha256": "1" * 64, "upload_date": datetime.utcnow(),
+    }
+    database.documents.insert_one(doc)
+    text = "Queues decouple producers from consumers. " * 20
+    database.extracted_texts.insert_one({
+        "_id": doc["sha256"], "text": compress(text), "page_count": 1, "char_count": len(text),
+    })
+    return doc
+
+
+def _expire_lease(jobs, job_id):
+    jobs.update_one({"_id": job_id}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+async def test_enqueue_claim_complete(job_queue, worker, jobs, document, mongo):
+    queued = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+    assert jobs.find_one({"_id": queued["_id"]})["status"] == job_queue.QUEUED
+
+    job = await job_queue.claim_job("w1")
+    assert job["_id"] == queued["_id"]
+    assert (job["status"], job["worker_id"], job["attempts"]) == (job_queue.RUNNING, "w1", 1)
+    assert await job_queue.claim_job("w2") is None
+
+    await worker.process_job(job, "w1")
+    done = jobs.find_one({"_id": job["_id"]})
+    assert done["status"] == job_queue.DONE
+    summary = mongo[DB_NAME].summaries.find_one({"_id": done["summary_id"]})
+    assert (summary["doc_id"], summary["mode"]) == (document["_id"], "concise")
+    assert (await job_queue.get_job(job["_id"], EMAIL))["status"] == job_queue.DONE
+    assert await job_queue.get_job(job["_id"], "someone@else.com") is None
+
+
+async def test_claims_oldest_first(job_queue, document):
+    first = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+    await job_queue.enqueue_summarize(EMAIL, document["_id"], "detailed")
+    assert (await job_queue.claim_job("w1"))["_id"] == first["_id"]
+
+
+async def test_expired_lease_is_reclaimed(job_queue, jobs, document):
+    queued = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+    await job_queue.claim_job("w1")
+    _expire_lease(jobs, queued["_id"])
+
+    job = await job_queue.claim_job("w2")
+    assert job["_id"] == queued["_id"]
+    assert (job["worker_id"], job["attempts"]) == ("w2", 2)
+    # the first worker finishing late does not overwrite the new owner's job
+    await job_queue.complete_job(job["_id"], "w1", ObjectId())
+    assert jobs.find_one({"_id": job["_id"]})["status"] == job_queue.RUNNING
+
+
+async def test_renew_lease_fails_once_the_job_was_reclaimed(job_queue, jobs, document):
+    queued = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+    await job_queue.claim_job("w1")
+    assert await job_queue.renew_lease(queued["_id"], "w1")
+
+    _expire_lease(jobs, queued["_id"])
+    await job_queue.claim_job("w2")
+    assert not await job_queue.renew_lease(queued["_id"], "w1")
+    assert await job_queue.renew_lease(queued["_id"], "w2")
+
+
+async def test_failed_job_is_retried_with_backoff_then_given_up(
+    job_queue, worker, jobs, document, monkeypatch,
+):
+    async def broken(*args, **kwargs):
+        raise RuntimeError("LLM unavailable")
+    monkeypatch.setattr(worker, "create_summary", broken)
+    queued = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+
+    for attempt in range(1, job_queue.settings.job_max_attempts + 1):
+        job = await job_queue.claim_job("w1")
+        assert job["attempts"] == attempt
+        await worker.process_job(job, "w1")
+        rec = jobs.find_one({"_id": queued["_id"]})
+        assert "LLM unavailable" in rec["error"]
+        if attempt < job_queue.settings.job_max_attempts:
+            assert rec["status"] == job_queue.QUEUED
+            assert rec["run_after"] > datetime.utcnow()
+            # not due yet
+            assert await job_queue.claim_job("w1") is None
+            jobs.update_one({"_id": queued["_id"]}, {"$set": {"run_after": datetime.utcnow()}})
+    assert jobs.find_one({"_id": queued["_id"]})["status"] == job_queue.FAILED
+
+
+async def test_missing_document_fails_without_retry(job_queue, worker, jobs):
+    queued = await job_queue.enqueue_summarize(EMAIL, ObjectId(), "concise")
+    await worker.process_job(await job_queue.claim_job("w1"), "w1")
+    rec = jobs.find_one({"_id": queued["_id"]})
+    assert (rec["status"], rec["error"]) == (job_queue.FAILED, "Document not found")
+
+
+async def test_job_whose_last_lease_expired_is_failed(job_queue, worker, jobs, document):
+    queued = await job_queue.enqueue_summarize(EMAIL, document["_id"], "concise")
+    jobs.update_one({"_id": queued["_id"]}, {"$set": {"attempts": job_queue.settings.job_max_attempts}})
+    job = await job_queue.claim_job("w1")
+    await worker.process_job(job, "w1")
+    rec = jobs.find_one({"_id": queued["_id"]})
+    assert (rec["status"], rec["error"]) == (job_queue.FAILED, "Lease expired")
@@ -0,0 +1,48 @@
+# tests/test_llm_client.py
+#
+# The LLM client's limits, with the fake backend answering.
+
+import asyncio
+
+import pytest
+
+from app.services import llm_client
+
+
+async def _contend(calls: int) -> list[str]:
+    return await asyncio.gather(*(llm_client.complete(f"prompt {i}") for i in range(calls)))
+
+
+def test_limits_work_on_every_event_loop(monkeypatch):
+    # one call more than there are slots, each answered slowly: the last
+    # one waits on the semaphore, which binds it to that loop
+    monkeypatch.setattr(llm_client.settings, "fake_llm_latency_ms", 5)
+    calls = llm_client.settings.llm_max_concurrency + 1
+
+    for _ in range(2):
+        assert len(asyncio.run(_contend(calls))) == calls
+
+
+def test_token_bucket_paces_after_the_burst():
+    async def run() -> float:
+        bucket = llm_client.TokenBucket(per_minute=600)  # 10 a second
+        await bucket.acquire(600)
+        start = asyncio.get_running_loop().time()
+        await bucket.acquire(2)
+        return asyncio.get_running_loop().time() - start
+
+    assert asyncio.run(run()) == pytest.approx(0.2, abs=0.1)
+
+
+@pytest.mark.parametrize("tokens_per_minute, expected", [
+    (12000, 1),     # the free tier: one 6000-token chunk at a time
+    (30000, 4),
+    (300000, 8),
+    (0, 8),         # unlimited
+])
+def test_fan_out_fits_the_token_quota(monkeypatch, tokens_per_minute, expected):
+    monkeypatch.setattr(llm_client.settings, "llm_backend", "groq")
+    monkeypatch.setattr(llm_client.settings, "llm_tokens_per_minute", tokens_per_minute)
+    monkeypatch.setattr(llm_client.settings, "llm_reserved_output_tokens", 500)
+
+    assert llm_client.affordable_concurrency(6000, 8) == expected
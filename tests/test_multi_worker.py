@@ -0,0 +1,44 @@
+# tests/test_multi_worker.py
+#
+# Two app instances on one database, as two workers behind a load
+# balancer: nothing a request leaves behind may live only in the process
+# that handled it.
+
+import re
+
+from fastapi.testclient import TestClient
+
+from app.core.db import DB_NAME
+
+EMAIL = "new.user@example.com"
+PASSWORD = "correct horse"
+
+
+def test_register_on_one_instance_verify_on_another(mongo, make_app):
+    first, second = make_app(), make_app()
+    with TestClient(first) as one, TestClient(second) as two:
+        response = one.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+        assert response.status_code == 201, response.text
+
+        # the code as the user receives it, from the queued email
+        mail = mongo[DB_NAME].email_outbox.find_one({"to": EMAIL})
+        code = re.search(r"\b\d{6}\b", mail["body"]).group()
+
+        response = two.post("/auth/verify", json={"email": EMAIL, "code": code})
+        assert response.status_code == 200, response.text
+
+        # and the account works on both
+        response = one.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        assert two.get("/users/me", headers=headers).json()["email"] == EMAIL
+
+
+def test_code_is_single_use_across_instances(mongo, make_app):
+    first, second = make_app(), make_app()
+    with TestClient(first) as one, TestClient(second) as two:
+        one.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+        code = mongo[DB_NAME].pending_registrations.find_one({"_id": EMAIL})["code"]
+
+        assert one.post("/auth/verify", json={"email": EMAIL, "code": code}).status_code == 200
+        assert two.post("/auth/verify", json={"email": EMAIL, "code": code}).status_code == 400
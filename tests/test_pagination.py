@@ -0,0 +1,108 @@
+# tests/test_pagination.py
+#
+# Keyset cursors: the token round trip, what a tampered token gets back,
+# and fetch_page walking a collection with ties on the sort field.
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from app.utils.pagination import decode_cursor, encode_cursor, fetch_page
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2024, 5, 1, 12, 0, 0, 123000)
+
+
+def _token(data) -> str:
+    raw = data if isinstance(data, bytes) else json.dumps(data).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    cursor = encode_cursor(T0, oid)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (T0, oid)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    _token(b"not json"),
+    _token(["a", "list"]),
+    _token({"t": T0.isoformat()}),
+    _token({"id": str(ObjectId())}),
+    _token({"t": "yesterday", "id": str(ObjectId())}),
+    _token({"t": T0.isoformat(), "id": "not-an-object-id"}),
+    _token({"t": 12, "id": str(ObjectId())}),
+], ids=["base64", "json", "shape", "no id", "no time", "bad time", "bad id", "time type"])
+def test_tampered_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        decode_cursor(cursor)
+
+    assert e.value.status_code == 400
+    assert e.value.detail == "Invalid cursor"
+
+
+@pytest.fixture
+def collection():
+    client = AsyncMongoMockClient(mock_mongo_client=mongomock.MongoClient())
+    return client["pagination"]["rows"]
+
+
+@pytest.fixture
+async def rows(collection) -> list[dict]:
+    """Seven rows for one user, three sharing a created_at; newest first."""
+    times = [T0, T0, T0, T0 - timedelta(seconds=1), T0 - timedelta(seconds=2),
+             T0 - timedelta(seconds=3), T0 - timedelta(seconds=4)]
+    docs = [{"_id": ObjectId(), "user": "a", "created_at": t} for t in times]
+    await collection.insert_many(docs)
+    await collection.insert_one({"_id": ObjectId(), "user": "b", "created_at": T0})
+    return sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True)
+
+
+async def test_pages_cover_every_row_once(collection, rows):
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = await fetch_page(collection, {"user": "a"}, "created_at", limit=2, cursor=cursor)
+        seen += [r["_id"] for r in page]
+        pages += 1
+        if cursor is None:
+            break
+
+    assert seen == [r["_id"] for r in rows]
+    assert pages == 4
+
+
+async def test_exact_last_page_has_no_cursor(collection, rows):
+    page, cursor = await fetch_page(collection, {"user": "a"}, "created_at", limit=len(rows))
+
+    assert len(page) == len(rows)
+    assert cursor is None
+
+
+async def test_no_limit_returns_everything_after_the_cursor(collection, rows):
+    cursor = encode_cursor(rows[1]["created_at"], rows[1]["_id"])
+
+    page, next_cursor = await fetch_page(collection, {"user": "a"}, "created_at", cursor=cursor)
+
+    assert [r["_id"] for r in page] == [r["_id"] for r in rows[2:]]
+    assert next_cursor is None
+
+
+async def test_forged_cursor_stays_inside_the_query(collection, rows):
+    # a well-formed cursor can only move the starting point, never widen
+    # the query it is applied to
+    cursor = encode_cursor(T0 + timedelta(days=1), ObjectId())
+
+    page, _ = await fetch_page(collection, {"user": "a"}, "created_at", limit=100, cursor=cursor)
+
+    assert {r["user"] for r in page} == {"a"}
+    assert len(page) == len(rows)
@@ -0,0 +1,44 @@
+# tests/test_query_plans.py
+#
+# `python -m app.core.indexes --check` as a test: every query in
+# indexes.QUERIES must be answered from an index on a real MongoDB
+# (mongomock has no planner). Skipped when no server is reachable:
+#
+#   TEST_MONGO_URI=mongodb://localhost:27017 python -m pytest tests/test_query_plans.py
+
+import os
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+pytestmark = pytest.mark.anyio
+
+MONGO_URI = os.environ.get("TEST_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "diploma_app_plan_check"
+
+
+@pytest.fixture
+async def server(modules, monkeypatch):
+    """The app's db module pointed at a scratch database on a real server."""
+    client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no MongoDB at {MONGO_URI}")
+    db_module = modules("app.core.db")
+    monkeypatch.setattr(db_module, "_client", client)
+    monkeypatch.setattr(db_module, "_client_pid", os.getpid())
+    monkeypatch.setattr(db_module, "DB_NAME", DB_NAME)
+    await client.drop_database(DB_NAME)
+    yield
+    await client.drop_database(DB_NAME)
+    client.close()
+
+
+async def test_every_query_uses_an_index(server, modules):
+    indexes = modules("app.core.indexes")
+    await indexes.ensure_indexes()
+
+    assert await indexes.check_query_plans() == []
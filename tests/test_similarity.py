@@ -0,0 +1,148 @@
+# tests/test_similarity.py
+#
+# MinHash/LSH near-duplicate detection: the estimate against the true
+# Jaccard similarity of the 5-gram sets, which pairs LSH turns up as
+# candidates, and the thresholds find_near_duplicates applies. Texts are
+# random words from fixed seeds, so every number here is reproducible.
+
+import random
+
+import pytest
+from bson import ObjectId
+
+from app.core.db import DB_NAME
+from app.services.similarity_service import (
+    LSH_BANDS, NUM_HASHES, SHINGLE_WORDS, lsh_bands, minhash, similarity,
+)
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "owner@example.com"
+
+
+def _words(seed: int, n: int = 3000) -> list[str]:
+    rng = random.Random(seed)
+    return [f"w{rng.randrange(10**9)}" for _ in range(n)]
+
+
+def _edited(words: list[str], k: int) -> list[str]:
+    """`words` with k of them, spread at random, replaced."""
+    rng = random.Random(k)
+    out = list(words)
+    for i in rng.sample(range(len(out)), k):
+        out[i] = f"x{rng.randrange(10**9)}"
+    return out
+
+
+def _jaccard(a: list[str], b: list[str]) -> float:
+    def shingles(w):
+        return {" ".join(w[i:i + SHINGLE_WORDS]) for i in range(len(w) - SHINGLE_WORDS + 1)}
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def _shared_bands(a: list[str], b: list[str]) -> int:
+    return len(set(lsh_bands(minhash(" ".join(a)))) & set(lsh_bands(minhash(" ".join(b)))))
+
+
+BASE = _words(7)
+
+
+def test_identical_text_matches_everywhere():
+    sig = minhash(" ".join(BASE))
+
+    assert len(sig) == NUM_HASHES
+    assert similarity(sig, minhash(" ".join(BASE))) == 1.0
+    assert len(lsh_bands(sig)) == LSH_BANDS
+
+
+def test_case_and_punctuation_do_not_matter():
+    assert minhash("The quick, brown fox jumps over the lazy dog!") == \
+        minhash("the quick brown fox jumps over the lazy dog")
+
+
+def test_no_words_no_signature():
+    assert minhash("") == []
+    assert minhash(" .,;! ") == []
+    assert lsh_bands([]) == []
+    assert similarity([], []) == 0.0
+
+
+def test_short_text_fills_every_bin():
+    # far fewer shingles than bins: the empty ones are densified
+    sig = minhash("one two three four five six seven")
+
+    assert len(sig) == NUM_HASHES
+    assert all(v is not None for v in sig)
+    assert similarity(sig, minhash("one two three four five six seven")) == 1.0
+
+
+@pytest.mark.parametrize("edits", [15, 30, 60, 150, 400, 1000])
+def test_estimate_tracks_jaccard(edits):
+    other = _edited(BASE, edits)
+
+    estimate = similarity(minhash(" ".join(BASE)), minhash(" ".join(other)))
+
+    assert estimate == pytest.approx(_jaccard(BASE, other), abs=0.1)
+
+
+@pytest.mark.parametrize("edits", [15, 30])
+def test_close_copies_share_a_band(edits):
+    other = _edited(BASE, edits)
+    assert _jaccard(BASE, other) >= 0.9
+
+    assert _shared_bands(BASE, other) >= 1
+
+
+@pytest.mark.parametrize("edits", [150, 400, 1000])
+def test_distant_texts_share_no_band(edits):
+    other = _edited(BASE, edits)
+    assert _jaccard(BASE, other) <= 0.65
+
+    assert _shared_bands(BASE, other) == 0
+
+
+@pytest.fixture
+def documents(mongo) -> dict:
+    """Documents at known distances from BASE; returns their ids by name."""
+    texts = {
+        "close": _edited(BASE, 15),       # ~0.95
+        "near": _edited(BASE, 60),        # ~0.8
+        "far": _edited(BASE, 400),        # ~0.3
+        "unrelated": _words(8),
+        "theirs": _edited(BASE, 15),
+    }
+    ids = {}
+    for name, words in texts.items():
+        sig = minhash(" ".join(words))
+        ids[name] = mongo[DB_NAME].documents.insert_one({
+            "user_email": "other@example.com" if name == "theirs" else EMAIL,
+            "filename": f"{name}.txt", "sha256": name, "minhash": sig, "lsh_bands": lsh_bands(sig),
+        }).inserted_id
+    # a second upload of one file is reported once
+    again = mongo[DB_NAME].documents.find_one({"_id": ids["close"]})
+    mongo[DB_NAME].documents.insert_one({**again, "_id": ObjectId(), "filename": "close-again.txt"})
+    return ids
+
+
+async def test_threshold_filters_candidates(modules, documents):
+    similarity_service = modules("app.services.similarity_service")
+    sig = minhash(" ".join(BASE))
+
+    strict = await similarity_service.find_near_duplicates(sig, "base", 0.9, user_email=EMAIL)
+    loose = await similarity_service.find_near_duplicates(sig, "base", 0.7, user_email=EMAIL)
+
+    assert [cand["sha256"] for _, cand in strict] == ["close"]
+    assert [cand["sha256"] for _, cand in loose] == ["close", "near"]
+    assert all(score >= 0.7 for score, _ in loose)
+
+
+async def test_scope_and_self_exclusion(modules, documents):
+    similarity_service = modules("app.services.similarity_service")
+    sig = minhash(" ".join(BASE))
+
+    everyone = await similarity_service.find_near_duplicates(sig, "base", 0.9)
+    not_close = await similarity_service.find_near_duplicates(sig, "close", 0.9)
+
+    assert sorted(cand["sha256"] for _, cand in everyone) == ["close", "theirs"]
+    assert [cand["sha256"] for _, cand in not_close] == ["theirs"]
@@ -0,0 +1,109 @@
+# tests/test_summary_cache.py
+
+import asyncio
+
+import pytest
+
+from app.services.summary_cache import LRUCache
+
+pytestmark = pytest.mark.anyio
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(2)
+    lru.set("a", "1")
+    lru.set("b", "2")
+    assert lru.get("a") == "1"  # "b" is now the oldest
+    lru.set("c", "3")
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == ("1", "3")
+
+
+def test_lru_of_size_zero_keeps_nothing():
+    lru = LRUCache(0)
+    lru.set("a", "1")
+    assert lru.get("a") is None
+
+
+@pytest.fixture
+def cache(modules):
+    return modules("app.services.summary_cache")
+
+
+def _generator(result: str, release: asyncio.Event | None = None):
+    calls = []
+
+    async def generate():
+        calls.append(result)
+        if release:
+            await release.wait()
+        return result
+    return generate, calls
+
+
+async def test_concurrent_callers_share_one_generation(cache, mongo):
+    release = asyncio.Event()
+    generate, calls = _generator("the summary", release)
+    callers = [
+        asyncio.create_task(cache.get_or_create_summary("hash", "standard", generate))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*callers) == ["the summary"] * 5
+    assert len(calls) == 1
+    assert mongo["diploma_app"].summary_cache.count_documents({"content_hash": "hash"}) == 1
+
+
+async def test_stored_summary_is_served_without_generating(cache):
+    generate, calls = _generator("first")
+    await cache.get_or_create_summary("hash", "standard", generate)
+    # past the in-process LRU, from the summary_cache collection
+    cache._lru = cache.LRUCache(0)
+    assert await cache.get_or_create_summary("hash", "standard", generate) == "first"
+    assert await cache.get_cached_summary("hash", "standard") == "first"
+    assert len(calls) == 1
+
+
+async def test_cache_is_per_mode(cache):
+    await cache.get_or_create_summary("hash", "concise", _generator("short")[0])
+    generate, calls = _generator("long")
+    assert await cache.get_or_create_summary("hash", "detailed", generate) == "long"
+    assert calls == ["long"]
+
+
+async def test_waiter_takes_over_when_the_leader_is_cancelled(cache):
+    never = asyncio.Event()
+    leader_generate, leader_calls = _generator("from leader", never)
+    waiter_generate, waiter_calls = _generator("from waiter")
+
+    leader = asyncio.create_task(cache.get_or_create_summary("hash", "standard", leader_generate))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_create_summary("hash", "standard", waiter_generate))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "from waiter"
+    assert leader_calls == ["from leader"] and waiter_calls == ["from waiter"]
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    assert not cache._inflight
+
+
+async def test_generation_errors_reach_every_waiter(cache):
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("LLM down")
+
+    callers = [
+        asyncio.create_task(cache.get_or_create_summary("hash", "standard", failing))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # nothing cached: the next call generates again
+    assert await cache.get_or_create_summary("hash", "standard", _generator("ok")[0]) == "ok"
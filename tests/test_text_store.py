@@ -0,0 +1,148 @@
+# tests/test_text_store.py
+#
+# Large text fields: plain, compressed and spilled storage read back
+# through load_texts, and compress_stored rewriting old plain bodies.
+
+import random
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.core.db import DB_NAME
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "store@example.com"
+
+
+def _text(n_bytes: int, seed: int = 1) -> str:
+    """Random words: compresses to about half, unlike repeated text."""
+    rng = random.Random(seed)
+    words = []
+    while sum(len(w) + 1 for w in words) < n_bytes:
+        words.append(f"{rng.getrandbits(32):x}")
+    return " ".join(words)
+
+
+@pytest.fixture
+def text_store(modules, monkeypatch):
+    module = modules("app.services.text_store")
+    # small enough to spill without megabyte fixtures
+    monkeypatch.setattr(module.settings, "text_spill_bytes", 4096)
+    return module
+
+
+@pytest.fixture
+def summary_service(text_store, modules, monkeypatch):
+    module = modules("app.services.summary_service")
+    # mongomock has no $strLenBytes; the same selection for ASCII bodies
+    monkeypatch.setattr(module, "_plain_and_large", lambda field: {
+        field: {"$regex": f"^[\\s\\S]{{{module.settings.text_compress_min_bytes},}}"},
+    })
+    return module
+
+
+@pytest.mark.parametrize("size, form", [
+    (100, "summary"),
+    (2000, "summary_z"),
+    (20000, "summary_blob"),
+])
+async def test_store_and_load_round_trip(text_store, mongo, size, form):
+    owner = ObjectId()
+    text = _text(size)
+
+    fields = await text_store.store_text(owner, "summary", text, doc_id="d1")
+    assert list(fields) == [form]
+    blob = mongo[DB_NAME].text_blobs.find_one({"_id": owner})
+    if form == "summary_blob":
+        assert (blob["field"], blob["doc_id"]) == ("summary", "d1")
+    else:
+        assert blob is None
+
+    [rec] = await text_store.load_texts([{"_id": owner, **fields}], "summary")
+    assert rec == {"_id": owner, "summary": text}
+
+
+async def test_no_spill_keeps_a_large_body_on_the_record(text_store, mongo):
+    fields = await text_store.store_text(ObjectId(), "summary", _text(20000), spill=False)
+
+    assert list(fields) == ["summary_z"]
+    assert mongo[DB_NAME].text_blobs.count_documents({}) == 0
+
+
+async def test_missing_blob_loads_empty(text_store):
+    [rec] = await text_store.load_texts([{"_id": ObjectId(), "summary_blob": True}], "summary")
+
+    assert rec["summary"] == ""
+
+
+async def test_delete_blobs_by_parent(text_store, mongo):
+    for doc_id in ("d1", "d1", "d2"):
+        await text_store.store_text(ObjectId(), "summary", _text(20000), doc_id=doc_id)
+
+    await text_store.delete_blobs({"doc_id": "d1"})
+
+    assert [b["doc_id"] for b in mongo[DB_NAME].text_blobs.find()] == ["d2"]
+
+
+def _seed_plain(mongo, bodies: dict[str, str]) -> dict[str, ObjectId]:
+    ids = {}
+    for name, body in bodies.items():
+        ids[name] = mongo[DB_NAME].summaries.insert_one({
+            "user_email": EMAIL, "doc_id": ObjectId(), "mode": "standard",
+            "summary": body, "created_at": datetime.utcnow(),
+        }).inserted_id
+    return ids
+
+
+async def test_compress_stored_rewrites_plain_bodies(summary_service, text_store, mongo):
+    bodies = {"short": _text(100), "medium": _text(2000, 2), "long": _text(20000, 3)}
+    ids = _seed_plain(mongo, bodies)
+    mongo[DB_NAME].summary_cache.insert_one({"_id": "k", "summary": bodies["long"]})
+
+    assert await summary_service.compress_stored(batch_size=1) == 3
+
+    summaries = mongo[DB_NAME].summaries
+    assert "summary" in summaries.find_one({"_id": ids["short"]})
+    assert "summary_z" in summaries.find_one({"_id": ids["medium"]})
+    long = summaries.find_one({"_id": ids["long"]})
+    assert long["summary_blob"] is True
+    assert long["summary_preview"] == bodies["long"][:summary_service.SUMMARY_PREVIEW_CHARS]
+    # the cache never spills
+    assert list(mongo[DB_NAME].summary_cache.find_one({"_id": "k"})) == ["_id", "summary_z"]
+
+    recs = await text_store.load_texts(list(summaries.find({}, {"summary_preview": 0})), "summary")
+    assert {rec["_id"]: rec["summary"] for rec in recs} == {ids[n]: b for n, b in bodies.items()}
+    # nothing left to do
+    assert await summary_service.compress_stored() == 0
+
+
+async def test_compress_stored_drops_the_blob_of_a_deleted_summary(summary_service, mongo, monkeypatch):
+    ids = _seed_plain(mongo, {"long": _text(20000)})
+    stored_summary = summary_service.stored_summary
+
+    async def deleted_meanwhile(rec):
+        stored = await stored_summary(rec)
+        mongo[DB_NAME].summaries.delete_one({"_id": rec["_id"]})
+        return stored
+    monkeypatch.setattr(summary_service, "stored_summary", deleted_meanwhile)
+
+    assert await summary_service.compress_stored() == 0
+    assert mongo[DB_NAME].text_blobs.find_one({"_id": ids["long"]}) is None
+
+
+async def test_compress_stored_keeps_the_blob_another_run_set(summary_service, mongo, monkeypatch):
+    ids = _seed_plain(mongo, {"long": _text(20000)})
+    stored_summary = summary_service.stored_summary
+
+    async def compressed_meanwhile(rec):
+        stored = await stored_summary(rec)
+        mongo[DB_NAME].summaries.update_one(
+            {"_id": rec["_id"]}, {"$set": {"summary_blob": True}, "$unset": {"summary": ""}},
+        )
+        return stored
+    monkeypatch.setattr(summary_service, "stored_summary", compressed_meanwhile)
+
+    assert await summary_service.compress_stored() == 0
+    assert mongo[DB_NAME].text_blobs.find_one({"_id": ids["long"]}) is not None